@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén persistente de páginas descargadas, direccionado por contenido.
+
+fetch_text (web_fetch) guarda aquí el texto visible ya extraído de cada página,
+así que una URL que otra corrida u otro executor ya leyó no se vuelve a
+descargar ni a parsear mientras esté vigente. Los textos se guardan
+comprimidos con zlib y con el hash SHA-256 del contenido como nombre
+(objetos/ab/abcd….z); el índice URL -> hash es un archivo de registros de
+tamaño fijo mapeado a memoria (np.memmap), que comparten varios procesos sin
+cargarlo en RAM. Cada registro lleva además el SimHash de 64 bits del texto:
+una página nueva de otra URL con la misma firma que una ya guardada (espejos,
+copias sindicadas de la misma página) se registra apuntando al contenido
+existente en vez de guardar otra copia. Una URL nunca se agrupa con sus propios
+registros: al volver a descargarla se guarda siempre su texto nuevo.
+
+En memoria, cada instancia mantiene un diccionario URL -> última fila y las
+firmas agrupadas por banda del SimHash, así que buscar una URL o un casi
+duplicado no recorre el índice. Se construyen al abrir y se ponen al día con
+las filas que agregue esta u otra instancia (el contador del encabezado dice
+cuántas hay).
+
+Las escrituras al índice se serializan entre procesos con un archivo de
+bloqueo (fcntl en Unix, msvcrt en Windows); las lecturas no bloquean.
+"""
+import hashlib, os, re, threading, time, zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from cache_agentes import DIRECTORIO_CACHE
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+VIGENCIA = 24 * 3600          # segundos que se sirve una página sin volver a descargarla
+# Bits distintos de SimHash para tratar como un mismo texto las páginas de dos
+# URLs. 0 (firma idéntica): con unos pocos bits de margen ya se juntan páginas de
+# plantilla (programas distintos con el mismo formato)
+DISTANCIA_DUPLICADO = 0
+MIN_CHARS_DUPLICADO = 200     # textos más cortos (errores, avisos) no se agrupan como duplicados
+# SimHash partido en DISTANCIA_DUPLICADO + 1 bandas: dos firmas a esa distancia o
+# menos coinciden al menos en una banda completa (palomar)
+BANDAS = DISTANCIA_DUPLICADO + 1
+CAPACIDAD_INICIAL = 1024
+TAM_ENCABEZADO = 64           # int64: [versión, registros usados, ...]
+VERSION = 1
+
+REGISTRO = np.dtype([
+    ("url", "<u8", (2,)),         # primeros 16 bytes del SHA-256 de la URL
+    ("contenido", "u1", (32,)),   # SHA-256 del texto
+    ("simhash", "<u8"),
+    ("creado", "<f8"),
+    ("chars", "<i8"),             # max_chars con que se extrajo el texto
+    ("largo", "<u4"),             # caracteres del texto guardado
+    ("completa", "u1"),           # 1 si el texto es el de la página entera
+    ("_relleno", "u1", (3,)),
+])
+
+
+def _clave_url(url: str) -> np.ndarray:
+    return np.frombuffer(hashlib.sha256(url.encode("utf-8")).digest()[:16], dtype="<u8")
+
+
+def simhash(texto: str) -> int:
+    """SimHash de 64 bits sobre tejas de 3 palabras (o palabras sueltas si el texto es corto)."""
+    palabras = re.findall(r"\w+", texto.casefold())
+    tejas = [" ".join(palabras[i:i + 3]) for i in range(len(palabras) - 2)] or palabras
+    if not tejas:
+        return 0
+    hashes = np.fromiter((int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "little")
+                          for t in tejas), dtype=np.uint64, count=len(tejas))
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votos = 2 * bits.sum(axis=0, dtype=np.int64) - len(tejas)
+    return int(np.sum(np.uint64(1) << np.arange(64, dtype=np.uint64)[votos > 0], dtype=np.uint64))
+
+
+def _bandas(firma: int) -> List[int]:
+    ancho = 64 // BANDAS
+    return [(firma >> (ancho * i)) & ((1 << ancho) - 1) for i in range(BANDAS)]
+
+
+class BloqueoArchivo:
+    """Bloqueo exclusivo entre procesos (y entre hilos del mismo proceso) sobre un archivo."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._hilos = threading.Lock()
+        self._archivo = None
+
+    def __enter__(self):
+        self._hilos.acquire()
+        self._archivo = open(self.ruta, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._archivo.fileno(), fcntl.LOCK_EX)
+        else:
+            self._archivo.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._archivo.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:   # LK_LOCK se rinde tras ~10 s; se sigue esperando
+                    pass
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._archivo.fileno(), fcntl.LOCK_UN)
+            else:
+                self._archivo.seek(0)
+                msvcrt.locking(self._archivo.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._archivo.close()
+            self._hilos.release()
+
+
+class AlmacenPaginas:
+    """
+    Textos de páginas por hash de contenido más un índice URL -> contenido
+    mapeado a memoria. Una URL guardada varias veces conserva su registro más
+    reciente (el índice solo crece; se compacta borrando el directorio).
+    """
+
+    def __init__(self, directorio: Optional[str] = None, vigencia: float = VIGENCIA):
+        self.directorio = directorio or os.path.join(DIRECTORIO_CACHE, "paginas")
+        self.vigencia = vigencia
+        os.makedirs(os.path.join(self.directorio, "objetos"), exist_ok=True)
+        self._ruta_indice = os.path.join(self.directorio, "indice.bin")
+        self._bloqueo = BloqueoArchivo(os.path.join(self.directorio, "indice.lock"))
+        self._lock = threading.Lock()
+        self.capacidad = 0
+        self._indexadas = 0
+        self._por_url: Dict[bytes, int] = {}
+        self._por_banda: List[Dict[int, List[int]]] = [{} for _ in range(BANDAS)]
+        self.aciertos = 0
+        self.fallos = 0
+        self.guardadas = 0
+        self.duplicadas = 0
+        with self._bloqueo:
+            if not os.path.exists(self._ruta_indice) or os.path.getsize(self._ruta_indice) < TAM_ENCABEZADO:
+                with open(self._ruta_indice, "wb") as f:
+                    f.write(np.array([VERSION, 0], dtype="<i8").tobytes().ljust(TAM_ENCABEZADO, b"\0"))
+                    f.truncate(TAM_ENCABEZADO + CAPACIDAD_INICIAL * REGISTRO.itemsize)
+        with self._lock:
+            self._mapear()
+            self._usados()
+
+    # --- índice ---------------------------------------------------------------
+    # Las vistas de los mapas no salen de estos métodos (se devuelven copias):
+    # en Windows no se puede cambiar el tamaño de un archivo mientras esté mapeado
+
+    def _mapear(self):
+        """(Re)mapea encabezado y registros si el archivo cambió de tamaño. Llamar con self._lock."""
+        capacidad = (os.path.getsize(self._ruta_indice) - TAM_ENCABEZADO) // REGISTRO.itemsize
+        if capacidad != self.capacidad:
+            self._desmapear()
+            self._encabezado = np.memmap(self._ruta_indice, dtype="<i8", mode="r+", shape=(TAM_ENCABEZADO // 8,))
+            self.registros = np.memmap(self._ruta_indice, dtype=REGISTRO, mode="r+",
+                                       offset=TAM_ENCABEZADO, shape=(capacidad,))
+            self.capacidad = capacidad
+
+    def _desmapear(self):
+        if self.capacidad:
+            self.registros.flush()
+            self._encabezado.flush()
+            del self.registros
+            del self._encabezado
+            self.capacidad = 0
+
+    def _usados(self) -> int:
+        """
+        Registros escritos hasta ahora (otro proceso pudo agregar y agrandar el
+        archivo); agrega a los diccionarios en memoria los que falten. Llamar con self._lock.
+        """
+        n = int(self._encabezado[1])
+        if n > self.capacidad:
+            self._mapear()
+        if n > self._indexadas:
+            nuevos = self.registros[self._indexadas:n]
+            claves = nuevos["url"].tobytes()
+            firmas = nuevos["simhash"].tolist()
+            largos = nuevos["largo"].tolist()
+            for i, fila in enumerate(range(self._indexadas, n)):
+                self._por_url[claves[16 * i:16 * i + 16]] = fila
+                if largos[i] >= MIN_CHARS_DUPLICADO:
+                    for banda, grupo in zip(_bandas(firmas[i]), self._por_banda):
+                        grupo.setdefault(banda, []).append(fila)
+            self._indexadas = n
+        return n
+
+    def _buscar(self, url: str) -> Optional[np.void]:
+        clave = _clave_url(url).tobytes()
+        with self._lock:
+            self._usados()
+            fila = self._por_url.get(clave)
+            return self.registros[fila].copy() if fila is not None else None
+
+    def _duplicado(self, firma: int, url: str) -> Optional[np.void]:
+        """
+        Registro más reciente de otra URL cuyo texto está a DISTANCIA_DUPLICADO
+        bits o menos de `firma`.
+        """
+        clave = _clave_url(url)
+        with self._lock:
+            self._usados()
+            candidatas = set()
+            for banda, grupo in zip(_bandas(firma), self._por_banda):
+                candidatas.update(grupo.get(banda, ()))
+            if not candidatas:
+                return None
+            filas = np.fromiter(sorted(candidatas), dtype=np.int64, count=len(candidatas))
+            distancias = np.bitwise_count(self.registros["simhash"][filas] ^ np.uint64(firma))
+            # Los registros viejos de la misma URL no cuentan: una nueva descarga con
+            # un cambio pequeño (una fecha, un precio) volvería al texto vencido
+            otra_url = (self.registros["url"][filas] != clave).any(axis=1)
+            filas = filas[(distancias <= DISTANCIA_DUPLICADO) & otra_url]
+            return self.registros[filas[-1]].copy() if len(filas) else None
+
+    def _agregar(self, registro: np.ndarray):
+        with self._bloqueo, self._lock:
+            n = int(self._encabezado[1])
+            if n >= self.capacidad:
+                self._mapear()
+            if n >= self.capacidad:
+                # Se suelta el mapa antes de agrandar el archivo, y se agranda
+                # escribiendo su último byte en vez de truncate (SetEndOfFile en
+                # Windows falla si algún proceso tiene el archivo mapeado)
+                tamano = TAM_ENCABEZADO + 2 * max(self.capacidad, CAPACIDAD_INICIAL) * REGISTRO.itemsize
+                self._desmapear()
+                with open(self._ruta_indice, "r+b") as f:
+                    f.seek(tamano - 1)
+                    f.write(b"\0")
+                self._mapear()
+            # El registro se escribe antes de publicarlo en el contador
+            self.registros[n] = registro
+            self.registros.flush()
+            self._encabezado[1] = n + 1
+            self._encabezado.flush()
+            self._usados()
+
+    # --- contenido ------------------------------------------------------------
+
+    def _ruta_objeto(self, contenido: str) -> str:
+        return os.path.join(self.directorio, "objetos", contenido[:2], contenido + ".z")
+
+    def _escribir_objeto(self, contenido: str, texto: str):
+        ruta = self._ruta_objeto(contenido)
+        if os.path.exists(ruta):
+            return
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(zlib.compress(texto.encode("utf-8"), 6))
+        os.replace(temporal, ruta)
+
+    def _leer_objeto(self, contenido: str) -> Optional[str]:
+        try:
+            with open(self._ruta_objeto(contenido), "rb") as f:
+                return zlib.decompress(f.read()).decode("utf-8")
+        except (OSError, zlib.error):
+            return None
+
+    # --- API ------------------------------------------------------------------
+
+    def obtener(self, url: str, max_chars: int) -> Optional[str]:
+        """
+        Texto guardado de `url` recortado a max_chars, si está vigente y se
+        extrajo con al menos max_chars (o es la página completa).
+        """
+        registro = self._buscar(url)
+        texto = None
+        if (registro is not None and time.time() - registro["creado"] < self.vigencia
+                and (registro["completa"] or registro["chars"] >= max_chars)):
+            texto = self._leer_objeto(bytes(registro["contenido"]).hex())
+        if texto is None:
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        return texto[:max_chars]
+
+    def guardar(self, url: str, texto: str, max_chars: int, completa: bool) -> str:
+        """
+        Registra el texto extraído de `url`. Si otra URL ya tiene un texto igual
+        (y extraído con al menos el mismo alcance), la URL apunta a ese contenido.
+        Devuelve el hash del contenido al que quedó asociada la URL.
+        """
+        firma = simhash(texto)
+        registro = np.zeros((), dtype=REGISTRO)
+        registro["url"] = _clave_url(url)
+        registro["creado"] = time.time()
+        original = self._duplicado(firma, url) if len(texto) >= MIN_CHARS_DUPLICADO else None
+        if original is not None and (original["completa"] or (not completa and original["chars"] >= max_chars)):
+            self.duplicadas += 1
+            for campo in ("contenido", "simhash", "chars", "largo", "completa"):
+                registro[campo] = original[campo]
+        else:
+            self.guardadas += 1
+            contenido = hashlib.sha256(texto.encode("utf-8")).digest()
+            self._escribir_objeto(contenido.hex(), texto)
+            registro["contenido"] = np.frombuffer(contenido, dtype="u1")
+            registro["simhash"] = firma
+            registro["chars"] = max_chars
+            registro["largo"] = len(texto)
+            registro["completa"] = completa
+        self._agregar(registro)
+        return bytes(registro["contenido"]).hex()
+
+    def _registrados(self) -> int:
+        with self._lock:
+            return int(self._encabezado[1])
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+            "guardadas": self.guardadas,
+            "duplicadas": self.duplicadas,
+            "registros": self._registrados(),
+        }
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del índice BM25 local (corpus_local) que usa search_local_corpus.
+
+Genera un corpus sintético de N páginas con vocabulario de distribución Zipf
+(como el texto real: pocas palabras muy frecuentes y una cola larga), mide el
+tiempo de indexación incremental y la latencia por consulta (p50/p99) con
+consultas de 2 a 5 términos tomados del mismo vocabulario. El objetivo es
+menos de 1 ms por consulta con 100 mil páginas.
+
+Uso:
+    python benchmarks/bench_bm25.py
+    python benchmarks/bench_bm25.py --paginas 10000 100000 --palabras 300 --salida resultados_bm25.jsonl
+"""
+import argparse, json, os, sys, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from corpus_local import IndiceBM25
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))]
+
+
+def vocabulario(tamano: int):
+    return [f"termino{i}" for i in range(tamano)]
+
+
+def medir(paginas: int, palabras: int, vocab: int, consultas: int, k: int, semilla: int = 0) -> dict:
+    rng = np.random.default_rng(semilla)
+    terminos = vocabulario(vocab)
+    indice = IndiceBM25()
+    t0 = time.perf_counter()
+    for i in range(paginas):
+        ids = np.minimum(rng.zipf(1.2, palabras), vocab) - 1
+        indice.agregar(f"https://sitio{i % 500}.edu/pagina{i}", " ".join(terminos[j] for j in ids))
+    carga = time.perf_counter() - t0
+
+    tiempos, resultados = [], 0
+    for _ in range(consultas):
+        ids = np.minimum(rng.zipf(1.5, rng.integers(2, 6)), vocab) - 1
+        consulta = " ".join(terminos[j] for j in ids)
+        t = time.perf_counter()
+        resultados += len(indice.buscar(consulta, k))
+        tiempos.append(time.perf_counter() - t)
+    return {
+        "paginas": paginas,
+        "palabras_por_pagina": palabras,
+        "terminos": len(indice._terminos),
+        "segundos_indexacion": carga,
+        "paginas_por_segundo": paginas / carga,
+        "consulta_p50_ms": percentil(tiempos, 50) * 1e3,
+        "consulta_p99_ms": percentil(tiempos, 99) * 1e3,
+        "resultados_promedio": resultados / consultas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", nargs="+", type=int, default=[100_000])
+    parser.add_argument("--palabras", type=int, default=300, help="Palabras por página")
+    parser.add_argument("--vocabulario", type=int, default=200_000)
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--salida", help="Archivo JSONL donde agregar los resultados")
+    args = parser.parse_args()
+
+    print(f"{'páginas':>9} {'términos':>9} {'indexar s':>10} {'pág/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for paginas in args.paginas:
+        r = medir(paginas, args.palabras, args.vocabulario, args.consultas, args.k)
+        print(f"{r['paginas']:>9} {r['terminos']:>9} {r['segundos_indexacion']:>10.1f} {r['paginas_por_segundo']:>8.0f} "
+              f"{r['consulta_p50_ms']:>8.3f} {r['consulta_p99_ms']:>8.3f}")
+        if args.salida:
+            with open(args.salida, "a", encoding="utf-8") as f:
+                f.write(json.dumps(r) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de latencia de búsqueda del caché semántico (cache_semantico).
+
+Llena un IndiceSemantico temporal con N entradas (por defecto 1 millón):
+vectores aleatorios de norma 1 cargados por bloques, más un puñado de
+preguntas reales. Después mide, por consulta, el tiempo de vectorizar la
+pregunta y el de buscar el vecino más cercano (producto matriz-vector sobre la
+matriz float32 mapeada a disco), y verifica que las paráfrasis de las
+preguntas reales encuentran una pregunta real (alguna equivalente, no un
+vector sintético) por encima de UMBRAL. También reporta la similitud más baja
+entre paráfrasis y la más alta entre preguntas distintas (otra marca, otro
+nivel, otra intención), que deben quedar a lado y lado de UMBRAL.
+
+Uso:
+    python benchmarks/bench_cache_semantico.py
+    python benchmarks/bench_cache_semantico.py --entradas 100000 1000000 --dimension 256 --salida resultados_semantico.jsonl
+"""
+import argparse, json, os, sys, tempfile, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache_semantico import DIMENSION, UMBRAL, IndiceSemantico, vectorizar
+
+# (pregunta guardada, paráfrasis que debe acertar)
+PREGUNTAS = [
+    ("Dime por qué se separó el supermercado la vaquita en la vaquita y supermu",
+     "¿Por qué se separó el supermercado La Vaquita en La Vaquita y Supermú?"),
+    ("Ingeniería en ciencia de datos, pregrado, analítica e inteligencia artificial",
+     "pregrado de ingeniería de ciencia de datos con analítica e inteligencia artificial"),
+    ("¿En qué año se separaron las marcas de la vaquita?",
+     "año de separación de las marcas La Vaquita"),
+    ("¿por qué se separó La Vaquita?", "motivo de la separación de La Vaquita y Supermú"),
+    ("Dime por qué se separó el supermercado la vaquita en la vaquita y supermu",
+     "¿Cuál fue la razón de la separación de La Vaquita en La Vaquita y Supermú?"),
+    ("Dime por qué se separó el supermercado la vaquita en la vaquita y supermu",
+     "¿Por qué La Vaquita se dividió en dos marcas, La Vaquita y Supermú?"),
+    ("¿Cuándo se separó La Vaquita?", "fecha de la separación de La Vaquita"),
+    ("¿Quiénes son los dueños de Supermú?", "¿Quién es el propietario de Supermú?"),
+    ("Maestría en ciencia de datos orientada a aprendizaje automático",
+     "maestría de ciencia de datos con enfoque en aprendizaje automático"),
+]
+# (pregunta guardada, pregunta distinta que no debe acertar)
+DISTINTAS = [
+    ("¿por qué se separó La Vaquita?", "¿por qué se separó Almacenes Éxito?"),
+    ("Dime por qué se separó el supermercado la vaquita en la vaquita y supermu",
+     "Dime por qué se separó el supermercado Carulla en Carulla y Surtimax"),
+    ("¿En qué año se separó La Vaquita?", "¿En qué año se fundó La Vaquita?"),
+    ("¿Cuándo se separó La Vaquita?", "¿Por qué se separó La Vaquita?"),
+    ("¿Quiénes son los dueños de Supermú?", "¿Quiénes son los dueños de La Vaquita?"),
+    ("¿Quiénes son los dueños de Supermú?", "¿Dónde queda Supermú?"),
+    ("Ingeniería en ciencia de datos, pregrado, analítica e inteligencia artificial",
+     "Ingeniería de sistemas, pregrado, desarrollo de software"),
+    ("Ingeniería en ciencia de datos, pregrado, analítica e inteligencia artificial",
+     "Maestría en ciencia de datos, analítica e inteligencia artificial"),
+    ("Maestría en ciencia de datos orientada a aprendizaje automático",
+     "Doctorado en ciencia de datos orientado a aprendizaje automático"),
+]
+BLOQUE = 100_000
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))]
+
+
+def similitudes(pares, dimension: int):
+    return [float(vectorizar(a, dimension) @ vectorizar(b, dimension)) for a, b in pares]
+
+
+def llenar(indice: IndiceSemantico, entradas: int, semilla: int = 0):
+    rng = np.random.default_rng(semilla)
+    restantes = entradas - len(PREGUNTAS)
+    while restantes > 0:
+        n = min(BLOQUE, restantes)
+        vectores = rng.standard_normal((n, indice.dimension), dtype=np.float32)
+        vectores /= np.linalg.norm(vectores, axis=1, keepdims=True)
+        fila = indice.n
+        indice.agregar_vectores(vectores, (f"sintetica {fila + i}" for i in range(n)), ("{}" for _ in range(n)))
+        restantes -= n
+    for pregunta, _ in PREGUNTAS:
+        indice.agregar(pregunta, json.dumps({"pregunta": pregunta}, ensure_ascii=False))
+    indice.sincronizar()
+
+
+def medir(entradas: int, dimension: int, consultas: int) -> dict:
+    with tempfile.TemporaryDirectory() as directorio:
+        t0 = time.perf_counter()
+        indice = IndiceSemantico(directorio, dimension)
+        llenar(indice, entradas)
+        carga = time.perf_counter() - t0
+
+        textos = [parafrasis for _, parafrasis in PREGUNTAS]
+        reales = {pregunta for pregunta, _ in PREGUNTAS}
+        tiempos_vector, tiempos_busqueda, aciertos = [], [], 0
+        for i in range(consultas):
+            texto = textos[i % len(textos)]
+            t = time.perf_counter()
+            vector = vectorizar(texto, dimension)
+            tiempos_vector.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            fila, similitud = indice.vecino(vector)
+            tiempos_busqueda.append(time.perf_counter() - t)
+            aciertos += similitud >= UMBRAL and indice.texto(fila)[0] in reales
+        resultado = {
+            "entradas": entradas,
+            "dimension": dimension,
+            "mb_matriz": indice.n * dimension * 4 / 1e6,
+            "segundos_carga": carga,
+            "vectorizar_p50_ms": percentil(tiempos_vector, 50) * 1e3,
+            "busqueda_p50_ms": percentil(tiempos_busqueda, 50) * 1e3,
+            "busqueda_p99_ms": percentil(tiempos_busqueda, 99) * 1e3,
+            "recuperacion": aciertos / consultas,
+            "umbral": UMBRAL,
+            "min_parafrasis": min(similitudes(PREGUNTAS, dimension)),
+            "max_distintas": max(similitudes(DISTINTAS, dimension)),
+        }
+        del indice
+        return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entradas", nargs="+", type=int, default=[1_000_000])
+    parser.add_argument("--dimension", type=int, default=DIMENSION)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--salida", help="Archivo JSONL donde agregar los resultados")
+    args = parser.parse_args()
+
+    print(f"Umbral: {UMBRAL} (las paráfrasis deben quedar por encima y las distintas por debajo)")
+    print(f"{'entradas':>10} {'MB':>8} {'carga s':>8} {'vector ms':>10} {'p50 ms':>8} {'p99 ms':>8} {'recup.':>7} "
+          f"{'mín. paráf.':>11} {'máx. dist.':>10}")
+    for entradas in args.entradas:
+        r = medir(entradas, args.dimension, args.consultas)
+        print(f"{r['entradas']:>10} {r['mb_matriz']:>8.0f} {r['segundos_carga']:>8.1f} {r['vectorizar_p50_ms']:>10.3f} "
+              f"{r['busqueda_p50_ms']:>8.2f} {r['busqueda_p99_ms']:>8.2f} {r['recuperacion']:>7.0%} "
+              f"{r['min_parafrasis']:>11.2f} {r['max_distintas']:>10.2f}")
+        if args.salida:
+            with open(args.salida, "a", encoding="utf-8") as f:
+                f.write(json.dumps(r) + "\n")
+
+
+if __name__ == "__main__":
+    main()
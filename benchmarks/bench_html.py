@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de memoria y latencia de la extracción de texto de fetch_url.
+
+Compara, sobre páginas sintéticas de varios MB (con mucho script, estilos y
+navegación), la implementación anterior (requests + BeautifulSoup sobre el
+documento completo, recortando después) contra la extracción en streaming de
+html_texto / web_fetch, que se detiene al llegar a max_chars.
+
+  - modo "parseo": solo CPU y memoria pico (tracemalloc), sin red.
+  - modo "http": latencia extremo a extremo contra un servidor HTTP local.
+
+Uso:
+    python benchmarks/bench_html.py --modo parseo
+    python benchmarks/bench_html.py --modo http --tamanos 1000000 5000000
+"""
+import argparse, asyncio, os, sys, threading, time, tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from html_texto import texto_visible
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+
+def generar_html(tamano: int) -> str:
+    """Página tipo sitio universitario de aproximadamente `tamano` caracteres."""
+    cabecera = ("<html><head><title>Ingeniería de Datos</title><style>" + "body{margin:0}" * 200 +
+                "</style><script>" + "var x = '<p>no visible</p>';" * 500 + "</script></head><body>"
+                "<nav>" + "<a href='/x'>Inicio</a>" * 100 + "</nav>")
+    parrafo = ("<div class='curso'><h2>Curso de Aprendizaje Automático</h2><p>El programa de "
+               "Ingeniería en Ciencia de Datos tiene una duración de 10 semestres &amp; 160 créditos.</p>"
+               "<script>track('evento');</script></div>\n")
+    repeticiones = max(1, (tamano - len(cabecera)) // len(parrafo))
+    return cabecera + parrafo * repeticiones + "</body></html>"
+
+
+def anterior(html: str, max_chars: int) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    return soup.get_text(separator="\n", strip=True)[:max_chars]
+
+
+def _medir(funcion, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    funcion(*args)
+    duracion = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracion, pico
+
+
+def modo_parseo(tamanos, max_chars):
+    print(f"{'tamaño':>10}{'impl':>12}{'seg':>10}{'pico MB':>10}")
+    for tamano in tamanos:
+        html = generar_html(tamano)
+        impls = [("streaming", texto_visible)]
+        if BeautifulSoup is not None:
+            impls.insert(0, ("bs4", anterior))
+        for nombre, funcion in impls:
+            duracion, pico = _medir(funcion, html, max_chars)
+            print(f"{len(html):>10}{nombre:>12}{duracion:>10.4f}{pico / 1e6:>10.1f}")
+
+
+def _servidor(html: bytes):
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(html)))
+            self.end_headers()
+            try:
+                # Envío por bloques para que el cliente pueda cortar la conexión
+                for i in range(0, len(html), 65536):
+                    self.wfile.write(html[i:i + 65536])
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def modo_http(tamanos, max_chars, repeticiones):
+    import requests
+    from web_fetch import fetch_text
+
+    print(f"{'tamaño':>10}{'impl':>12}{'seg':>10}")
+    for tamano in tamanos:
+        html = generar_html(tamano).encode("utf-8")
+        servidor = _servidor(html)
+        url = f"http://127.0.0.1:{servidor.server_address[1]}/"
+
+        if BeautifulSoup is not None:
+            t0 = time.perf_counter()
+            for _ in range(repeticiones):
+                anterior(requests.get(url, timeout=20).text, max_chars)
+            print(f"{len(html):>10}{'bs4':>12}{(time.perf_counter() - t0) / repeticiones:>10.4f}")
+
+        async def streaming():
+            for _ in range(repeticiones):
+                await fetch_text(url, max_chars=max_chars, cache=False)
+
+        t0 = time.perf_counter()
+        asyncio.run(streaming())
+        print(f"{len(html):>10}{'streaming':>12}{(time.perf_counter() - t0) / repeticiones:>10.4f}")
+        servidor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modo", choices=["parseo", "http"], default="parseo")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000_000, 5_000_000, 10_000_000])
+    parser.add_argument("--max-chars", type=int, default=4000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+    if args.modo == "parseo":
+        modo_parseo(args.tamanos, args.max_chars)
+    else:
+        modo_http(args.tamanos, args.max_chars, args.repeticiones)
+
+
+if __name__ == "__main__":
+    main()
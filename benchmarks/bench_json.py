@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de throughput de la extracción de JSON sobre salidas tipo LLM.
+
+Genera un corpus sintético (bloques ```json, JSON sin bloque, JSON muy anidado
+y cadenas con muchos escapes) de 100 KB a 10 MB y mide MB/s de:
+  - iter_json: recorrer TODOS los objetos/arreglos del texto
+  - extract_json_obj: obtener el primer objeto (ubicado al final del texto,
+    el peor caso de una transcripción larga)
+
+Uso:
+    python benchmarks/bench_json.py
+    python benchmarks/bench_json.py --tamanos 100000 1000000 --salida resultados_json.jsonl
+"""
+import argparse, json, os, random, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from json_utils import extract_json_obj, iter_json
+
+PROSA = ("Claro, a continuación presento la información encontrada sobre el programa [1]. "
+         "Según la página oficial {ver anexo} la duración es de 10 semestres. ")
+
+
+def _objeto(rnd: random.Random) -> dict:
+    return {
+        "program_name": f"Ingeniería {rnd.randint(1, 10**6)}",
+        "courses_examples": [f"Curso {i}" for i in range(rnd.randint(1, 6))],
+        "tuition": {"monto": rnd.random() * 10**7, "moneda": "COP"},
+        "sources": ["https://example.edu.co/programa?id=%d" % rnd.randint(1, 999)],
+    }
+
+
+def _anidado(profundidad: int) -> dict:
+    obj = {"hoja": True}
+    for i in range(profundidad):
+        obj = {"nivel": i, "hijos": [obj, {"x": i}]}
+    return obj
+
+
+def _con_escapes(rnd: random.Random) -> dict:
+    return {"texto": 'comillas \\"internas\\" y llaves {} [] \\n ' * rnd.randint(1, 5),
+            "ruta": "C:\\\\Users\\\\agente\\\\datos.json", "unicode": "Medellín ñandú \u00e9"}
+
+
+def generar(tipo: str, tamano: int, semilla: int = 0) -> str:
+    """Genera un texto de aproximadamente `tamano` caracteres del tipo indicado."""
+    rnd = random.Random(semilla)
+    partes, total = [], 0
+    while total < tamano:
+        if tipo == "fenced":
+            bloque = PROSA + "```json\n" + json.dumps(_objeto(rnd), ensure_ascii=False, indent=2) + "\n```\n"
+        elif tipo == "unfenced":
+            bloque = PROSA + json.dumps(_objeto(rnd), ensure_ascii=False) + "\n"
+        elif tipo == "nested":
+            bloque = PROSA + json.dumps(_anidado(rnd.randint(5, 40))) + "\n"
+        elif tipo == "escapes":
+            bloque = PROSA + json.dumps(_con_escapes(rnd), ensure_ascii=False) + "\n"
+        else:
+            raise ValueError(f"Tipo de corpus desconocido: {tipo}")
+        partes.append(bloque)
+        total += len(bloque)
+    return "".join(partes)
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--tipos", nargs="+", default=["fenced", "unfenced", "nested", "escapes"])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", help="Archivo JSONL donde agregar los resultados")
+    args = parser.parse_args()
+
+    filas = []
+    print(f"{'tipo':<10}{'tamaño':>12}{'objetos':>10}{'iter_json MB/s':>17}{'extract MB/s':>15}")
+    for tipo in args.tipos:
+        for tamano in args.tamanos:
+            # Prosa sin JSON y un único objeto al final: peor caso para extract_json_obj
+            texto = generar(tipo, tamano)
+            final = PROSA.replace("{ver anexo}", "") * (tamano // len(PROSA)) + json.dumps(_objeto(random.Random(1)))
+            mb = len(texto.encode("utf-8")) / 1e6
+            n_objetos = sum(1 for _ in iter_json(texto))
+            t_iter = _medir(lambda: sum(1 for _ in iter_json(texto)), args.repeticiones)
+            t_ext = _medir(lambda: extract_json_obj(final), args.repeticiones)
+            fila = {
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "tipo": tipo,
+                "bytes": len(texto.encode("utf-8")),
+                "objetos": n_objetos,
+                "iter_json_mb_s": mb / t_iter,
+                "extract_json_obj_mb_s": len(final.encode("utf-8")) / 1e6 / t_ext,
+            }
+            filas.append(fila)
+            print(f"{tipo:<10}{fila['bytes']:>12}{n_objetos:>10}{fila['iter_json_mb_s']:>17.1f}{fila['extract_json_obj_mb_s']:>15.1f}")
+
+    if args.salida:
+        with open(args.salida, "a", encoding="utf-8") as f:
+            for fila in filas:
+                f.write(json.dumps(fila) + "\n")
+
+
+if __name__ == "__main__":
+    main()
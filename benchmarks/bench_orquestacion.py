@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del costo de orquestación de las arquitecturas de agentes del repo,
+contra el modelo simulado de benchmarks/servidor_mock.py (sin red ni API).
+
+Arquitecturas (los mismos agentes e instrucciones de los ejemplos; las
+herramientas hospedadas y la red se cambian por herramientas locales):
+  - cadena:       pipeline determinístico de ejemplo3 (3 agentes y 2 compuertas)
+  - herramientas: agents as tools de ejemplo4 (arquitecto + BuscadorProgramas en paralelo)
+  - react:        bucle ReAct de ejemplo5 con --rondas llamadas a fetch_url
+  - planner:      planner/executor en lote de ejemplo6
+
+Para cada arquitectura y nivel de concurrencia mide throughput y latencia
+(p50/p95/p99) y estima el sobrecosto de orquestación: la latencia p50 menos la
+que tendría la ruta crítica si solo se pagara la latencia del modelo simulado.
+Cada medición se agrega a benchmarks/resultados.jsonl (con fecha y commit) y se
+compara con la medición anterior equivalente, para seguir la evolución.
+
+Uso:
+    python benchmarks/bench_orquestacion.py
+    python benchmarks/bench_orquestacion.py --arquitecturas react planner --concurrencias 1 100
+    python benchmarks/bench_orquestacion.py --url http://127.0.0.1:8765 --latencia 0.2
+"""
+import argparse, asyncio, datetime, json, os, socket, subprocess, sys, time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from agents import Runner, function_tool, set_default_openai_api, set_default_openai_client, set_tracing_disabled
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from concurrencia import as_map_tool, ejecutar_acotado
+
+ARQUITECTURAS = ("cadena", "herramientas", "react", "planner")
+RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados.jsonl")
+
+
+def herramienta_fetch(latencia: float):
+    """fetch_url local: misma firma que la de ejemplo5/ejemplo6, sin red."""
+    @function_tool
+    async def fetch_url(url: str, max_chars: int = 3000) -> str:
+        await asyncio.sleep(latencia)
+        return f"Texto simulado de {url}: plan de estudios, créditos y costo del programa."[:max_chars]
+    return fetch_url
+
+
+def construir(arquitectura: str, args) -> Tuple[Callable[[str], Awaitable], int, int]:
+    """
+    Devuelve (corrida, modelo, herramientas): la corrida recibe una entrada y
+    ejecuta la arquitectura; modelo y herramientas son las llamadas en serie de
+    la ruta crítica (lo mínimo que tardaría una corrida).
+    """
+    fetch_url = herramienta_fetch(args.latencia_herramienta)
+
+    if arquitectura == "cadena":
+        from ejemplo3 import story_pipeline
+        return story_pipeline.ejecutar, 3, 0
+
+    if arquitectura == "herramientas":
+        import ejemplo4
+        buscador = ejemplo4.buscador_programa.clone(tools=[], model="mock")
+        arquitecto = ejemplo4.arquitecto_de_busqueda.clone(model="mock-tools-1", tools=[as_map_tool(
+            buscador, tool_name="BuscadorProgramas",
+            tool_description="Busca en la web una lista de programas, en paralelo, para completar la información de cada uno",
+            max_concurrency=8,
+        )])
+        return (lambda entrada: Runner.run(arquitecto, entrada)), 3, 0
+
+    if arquitectura == "react":
+        import ejemplo5
+        agente = ejemplo5.agent.clone(model=f"mock-tools-{args.rondas}", tools=[fetch_url])
+        return (lambda entrada: Runner.run(agente, entrada, max_turns=args.rondas + 2)), args.rondas + 1, args.rondas
+
+    if arquitectura == "planner":
+        import ejemplo6
+        executor = ejemplo6.executor.clone(model="mock-tools-1", tools=[fetch_url])
+
+        @function_tool
+        async def delegate_batch_to_executor(subtasks: List[str]) -> str:
+            """Ejecuta varias subtareas con el EXECUTOR en paralelo."""
+            fabricas = [lambda s=s: Runner.run(starting_agent=executor, input=s) for s in subtasks]
+            salidas = []
+            async for i, res, tiempo in ejecutar_acotado(fabricas, ejemplo6.MAX_EXECUTORS_CONCURRENTES, subtasks):
+                salidas.append(f"[{subtasks[i]}] " + (f"Error: {tiempo.error}" if tiempo.error else str(res.final_output)))
+            return "\n".join(salidas)
+
+        planner = ejemplo6.planner_batch.clone(model="mock-tools-1", tools=[delegate_batch_to_executor])
+        # planner (llama la herramienta) -> executor (fetch_url) -> executor (final) -> planner (final)
+        return (lambda entrada: Runner.run(starting_agent=planner, input=entrada)), 4, 1
+
+    raise ValueError(f"Arquitectura desconocida: {arquitectura}")
+
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))]
+
+
+async def _peticiones(url: str) -> int:
+    async with httpx.AsyncClient() as cliente:
+        return (await cliente.get(f"{url}/estadisticas")).json()["peticiones"]
+
+
+async def medir(arquitectura: str, concurrencia: int, args) -> dict:
+    corrida, llamadas_modelo, llamadas_herramienta = construir(arquitectura, args)
+    corridas = max(args.corridas, concurrencia)
+    entradas = [f"Programa de prueba {i}: Ingeniería en Ciencia de Datos, pregrado" for i in range(corridas)]
+    fabricas = [lambda e=e: corrida(e) for e in entradas]
+
+    # Calentamiento: importaciones perezosas y conexiones
+    await corrida(entradas[0])
+    antes = await _peticiones(args.url)
+    latencias, errores = [], 0
+    t0 = time.perf_counter()
+    async for _, resultado, tiempo in ejecutar_acotado(fabricas, concurrencia):
+        # El pipeline no lanza excepciones: deja los fallos en resultado.errores
+        if tiempo.error or getattr(resultado, "errores", None):
+            errores += 1
+        else:
+            latencias.append(tiempo.duracion)
+    segundos = time.perf_counter() - t0
+    llamadas = (await _peticiones(args.url) - antes) / corridas
+
+    ideal = llamadas_modelo * args.latencia + llamadas_herramienta * args.latencia_herramienta
+    p50 = percentil(latencias, 50)
+    return {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "etiqueta": args.etiqueta,
+        "arquitectura": arquitectura,
+        "concurrencia": concurrencia,
+        "corridas": corridas,
+        "errores": errores,
+        "latencia_modelo": args.latencia,
+        "llamadas_por_corrida": llamadas,
+        "latencia_ideal": ideal,
+        "p50": p50,
+        "p95": percentil(latencias, 95),
+        "p99": percentil(latencias, 99),
+        "throughput": len(latencias) / segundos if segundos else 0.0,
+        "sobrecosto_p50": p50 - ideal,
+        "segundos": segundos,
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def historial(ruta: str) -> Dict[tuple, dict]:
+    """Última medición registrada por (arquitectura, concurrencia, latencia del modelo)."""
+    ultimas = {}
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                if linea.strip():
+                    r = json.loads(linea)
+                    ultimas[(r["arquitectura"], r["concurrencia"], r["latencia_modelo"])] = r
+    return ultimas
+
+
+def _variacion(actual: float, anterior: float) -> str:
+    return f"{(actual - anterior) / anterior:+.1%}" if anterior else "n/a"
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def lanzar_servidor(args) -> subprocess.Popen:
+    puerto = _puerto_libre()
+    proceso = subprocess.Popen([
+        sys.executable, os.path.join(RAIZ, "benchmarks", "servidor_mock.py"), "--puerto", str(puerto),
+        "--latencia", str(args.latencia), "--jitter", str(args.jitter), "--elementos", str(args.elementos),
+    ])
+    args.url = f"http://127.0.0.1:{puerto}"
+    limite = time.monotonic() + 15
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"{args.url}/salud", timeout=1).status_code == 200:
+                return proceso
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proceso.terminate()
+    raise RuntimeError("El servidor simulado no arrancó")
+
+
+async def correr(args):
+    cliente = AsyncOpenAI(
+        base_url=f"{args.url}/v1", api_key="mock", max_retries=0, timeout=120,
+        http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(max_connections=None, max_keepalive_connections=2000)),
+    )
+    set_default_openai_client(cliente, use_for_tracing=False)
+    set_default_openai_api("chat_completions")
+    set_tracing_disabled(True)
+
+    anteriores = historial(args.salida)
+    print(f"{'arquitectura':<13} {'conc':>5} {'p50':>7} {'p99':>7} {'ideal':>6} {'sobrec.':>8} "
+          f"{'corr/s':>8} {'llam.':>5} {'err':>4}  vs anterior (p50, corr/s)")
+    for arquitectura in args.arquitecturas:
+        for concurrencia in args.concurrencias:
+            r = await medir(arquitectura, concurrencia, args)
+            previa = anteriores.get((arquitectura, concurrencia, args.latencia))
+            comparacion = (f"{_variacion(r['p50'], previa['p50'])}, {_variacion(r['throughput'], previa['throughput'])}"
+                           if previa else "-")
+            print(f"{arquitectura:<13} {concurrencia:>5} {r['p50']:>7.3f} {r['p99']:>7.3f} {r['latencia_ideal']:>6.2f} "
+                  f"{r['sobrecosto_p50']:>8.3f} {r['throughput']:>8.1f} {r['llamadas_por_corrida']:>5.1f} "
+                  f"{r['errores']:>4}  {comparacion}")
+            with open(args.salida, "a", encoding="utf-8") as f:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arquitecturas", nargs="+", default=list(ARQUITECTURAS), choices=ARQUITECTURAS)
+    parser.add_argument("--concurrencias", nargs="+", type=int, default=[1, 10, 100, 1000])
+    parser.add_argument("--corridas", type=int, default=20,
+                        help="Corridas mínimas por nivel (al menos tantas como la concurrencia)")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Segundos por respuesta del modelo simulado")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--latencia-herramienta", type=float, default=0.0, help="Segundos por llamada a fetch_url")
+    parser.add_argument("--rondas", type=int, default=3, help="Llamadas a herramientas del agente ReAct")
+    parser.add_argument("--elementos", type=int, default=3, help="Subtareas/programas por lote generados por el mock")
+    parser.add_argument("--url", help="Usar un servidor simulado ya levantado en lugar de lanzar uno")
+    parser.add_argument("--salida", default=RESULTADOS, help="JSONL histórico de resultados")
+    parser.add_argument("--etiqueta", default="", help="Texto libre para identificar la medición")
+    args = parser.parse_args()
+
+    proceso = None if args.url else lanzar_servidor(args)
+    try:
+        asyncio.run(correr(args))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
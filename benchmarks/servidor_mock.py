@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita el endpoint Chat Completions de OpenAI con respuestas
+guionizadas, para medir la orquestación de los ejemplos sin pagar ni depender
+de la API.
+
+El guion sale del propio request:
+  - si el agente tiene herramientas y aún no ha hecho N rondas de llamadas,
+    responde con una llamada a herramienta (rotando entre las disponibles) cuyos
+    argumentos se generan a partir del JSON schema de la herramienta;
+  - si no, responde con el texto final o, si se pidió response_format
+    json_schema (output_type del agente), con un objeto generado desde el schema.
+N se codifica en el nombre del modelo ("mock-tools-3" = 3 rondas) o, si el
+nombre no lo dice, se toma de --rondas. Cada respuesta tarda --latencia
+segundos (más un jitter uniforme opcional).
+
+Uso:
+    python benchmarks/servidor_mock.py --puerto 8765 --latencia 0.05
+    # en el cliente: AsyncOpenAI(base_url="http://127.0.0.1:8765/v1", api_key="mock")
+    #                set_default_openai_api("chat_completions")
+"""
+import argparse, asyncio, itertools, json, random, re, time
+
+from aiohttp import web
+
+_MODELO_RONDAS = re.compile(r"mock-tools-(\d+)")
+_ids = itertools.count(1)
+
+
+def generar_desde_schema(schema: dict, defs: dict, elementos: int = 3, etiqueta: str = "texto"):
+    """Instancia mínima y válida de un JSON schema (objetos, listas, enums, $ref, anyOf)."""
+    if "$ref" in schema:
+        return generar_desde_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, elementos, etiqueta)
+    for clave in ("anyOf", "oneOf", "allOf"):
+        if clave in schema:
+            opciones = [s for s in schema[clave] if s.get("type") != "null"] or schema[clave]
+            return generar_desde_schema(opciones[0], defs, elementos, etiqueta)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    tipo = schema.get("type", "string")
+    if isinstance(tipo, list):
+        tipo = next((t for t in tipo if t != "null"), "null")
+    if tipo == "object":
+        return {nombre: generar_desde_schema(sub, defs, elementos, nombre)
+                for nombre, sub in schema.get("properties", {}).items()}
+    if tipo == "array":
+        item = schema.get("items", {})
+        # Elementos distintos para que las herramientas que deduplican no los colapsen
+        return [generar_desde_schema(item, defs, elementos, f"{etiqueta} {i + 1}") for i in range(elementos)]
+    if tipo == "integer":
+        return 1
+    if tipo == "number":
+        return 1.0
+    if tipo == "boolean":
+        return True
+    if tipo == "null":
+        return None
+    return etiqueta
+
+
+def _rondas_objetivo(modelo: str, por_defecto: int) -> int:
+    m = _MODELO_RONDAS.search(modelo or "")
+    return int(m.group(1)) if m else por_defecto
+
+
+def _tokens(texto: str) -> int:
+    return max(1, len(texto) // 4)
+
+
+def guion(cuerpo: dict, rondas: int, elementos: int) -> dict:
+    """El mensaje del asistente (texto o llamada a herramienta) que toca en esta conversación."""
+    mensajes = cuerpo.get("messages", [])
+    herramientas = [h["function"] for h in cuerpo.get("tools") or [] if h.get("type") == "function"]
+    hechas = sum(1 for m in mensajes if m.get("role") == "assistant" and m.get("tool_calls"))
+    objetivo = _rondas_objetivo(cuerpo.get("model", ""), rondas)
+
+    if herramientas and hechas < objetivo:
+        funcion = herramientas[hechas % len(herramientas)]
+        parametros = funcion.get("parameters") or {}
+        argumentos = generar_desde_schema(parametros, parametros.get("$defs", {}), elementos)
+        return {"role": "assistant", "content": None, "tool_calls": [{
+            "id": f"call_mock_{next(_ids)}", "type": "function",
+            "function": {"name": funcion["name"], "arguments": json.dumps(argumentos, ensure_ascii=False)},
+        }]}
+
+    formato = cuerpo.get("response_format") or {}
+    if formato.get("type") == "json_schema":
+        schema = formato["json_schema"].get("schema", {})
+        contenido = json.dumps(generar_desde_schema(schema, schema.get("$defs", {}), elementos), ensure_ascii=False)
+    else:
+        contenido = f"Respuesta simulada tras {hechas} llamadas a herramientas."
+    return {"role": "assistant", "content": contenido}
+
+
+def _respuesta(cuerpo: dict, mensaje: dict) -> dict:
+    fin = "tool_calls" if mensaje.get("tool_calls") else "stop"
+    entrada = _tokens(json.dumps(cuerpo.get("messages", []), ensure_ascii=False))
+    salida = _tokens(mensaje.get("content") or json.dumps(mensaje.get("tool_calls")))
+    return {
+        "id": f"chatcmpl-mock-{next(_ids)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": cuerpo.get("model", "mock"),
+        "choices": [{"index": 0, "message": mensaje, "finish_reason": fin}],
+        "usage": {"prompt_tokens": entrada, "completion_tokens": salida, "total_tokens": entrada + salida},
+    }
+
+
+async def _streaming(request: web.Request, completa: dict) -> web.StreamResponse:
+    """La misma respuesta en formato SSE: un trozo con todo el contenido, uno de cierre y el uso."""
+    respuesta = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await respuesta.prepare(request)
+    eleccion = completa["choices"][0]
+    delta = {"role": "assistant", "content": eleccion["message"]["content"]}
+    if eleccion["message"].get("tool_calls"):
+        delta["tool_calls"] = [dict(llamada, index=i) for i, llamada in enumerate(eleccion["message"]["tool_calls"])]
+    base = {k: completa[k] for k in ("id", "created", "model")}
+    trozos = [
+        {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta, "finish_reason": None}]},
+        {**base, "object": "chat.completion.chunk",
+         "choices": [{"index": 0, "delta": {}, "finish_reason": eleccion["finish_reason"]}]},
+        {**base, "object": "chat.completion.chunk", "choices": [], "usage": completa["usage"]},
+    ]
+    for trozo in trozos:
+        await respuesta.write(f"data: {json.dumps(trozo, ensure_ascii=False)}\n\n".encode())
+    await respuesta.write(b"data: [DONE]\n\n")
+    await respuesta.write_eof()
+    return respuesta
+
+
+async def chat_completions(request: web.Request) -> web.StreamResponse:
+    config, estado = request.app["config"], request.app["estado"]
+    cuerpo = await request.json()
+    estado["peticiones"] += 1
+    estado["en_vuelo"] += 1
+    estado["max_en_vuelo"] = max(estado["max_en_vuelo"], estado["en_vuelo"])
+    try:
+        await asyncio.sleep(config.latencia + random.uniform(0, config.jitter))
+        completa = _respuesta(cuerpo, guion(cuerpo, config.rondas, config.elementos))
+        if cuerpo.get("stream"):
+            return await _streaming(request, completa)
+        return web.json_response(completa)
+    finally:
+        estado["en_vuelo"] -= 1
+
+
+async def salud(request: web.Request) -> web.Response:
+    return web.json_response({"ok": True})
+
+
+async def estadisticas(request: web.Request) -> web.Response:
+    return web.json_response(request.app["estado"])
+
+
+def crear_app(config) -> web.Application:
+    app = web.Application(client_max_size=32 * 1024 ** 2)
+    app["config"] = config
+    app["estado"] = {"peticiones": 0, "en_vuelo": 0, "max_en_vuelo": 0}
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/salud", salud)
+    app.router.add_get("/estadisticas", estadisticas)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.05, help="Segundos por respuesta del modelo")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Segundos extra aleatorios (uniforme)")
+    parser.add_argument("--rondas", type=int, default=1,
+                        help="Rondas de herramientas si el nombre del modelo no las indica")
+    parser.add_argument("--elementos", type=int, default=3, help="Largo de las listas generadas")
+    config = parser.parse_args()
+    web.run_app(crear_app(config), host=config.host, port=config.puerto, backlog=4096, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Caché local de respuestas para agentes determinísticos (temperature=0.0).
+
+Las respuestas se guardan en SQLite con una clave de contenido que incluye el
+modelo, las instrucciones, las herramientas, el esquema de output_type, los
+model_settings (con lo que cambie el run_config) y la entrada. Así, la misma pregunta al mismo agente no vuelve a
+pagar una llamada al modelo ni una búsqueda web. El caché es opcional: se activa
+creando un CacheRespuestas y pasándolo a ejecutar_con_cache.
+"""
+import hashlib, json, os, sqlite3, threading, time
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from pydantic import TypeAdapter
+from agents import Agent, RunConfig, Runner
+
+if TYPE_CHECKING:
+    from cache_semantico import CacheSemantico
+
+# Directorio por defecto para los archivos de caché locales
+DIRECTORIO_CACHE = os.getenv("AGENTES_CACHE_DIR", ".cache")
+
+
+class CacheSQLite:
+    """
+    Almacén clave → valor (texto) en SQLite con expiración (TTL) y desalojo LRU
+    cuando se supera max_entradas. Lleva contadores de aciertos y fallos.
+    """
+
+    def __init__(self, ruta: str, ttl: Optional[float] = None, max_entradas: int = 10_000):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(ruta, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " clave TEXT PRIMARY KEY, valor TEXT NOT NULL,"
+            " expira REAL, usado REAL NOT NULL)"
+        )
+        self._con.execute("CREATE INDEX IF NOT EXISTS cache_usado ON cache(usado)")
+        self._con.commit()
+
+    def obtener(self, clave: str) -> Optional[str]:
+        ahora = time.time()
+        with self._lock:
+            fila = self._con.execute("SELECT valor, expira FROM cache WHERE clave = ?", (clave,)).fetchone()
+            if fila is None or (fila[1] is not None and fila[1] < ahora):
+                if fila is not None:
+                    self._con.execute("DELETE FROM cache WHERE clave = ?", (clave,))
+                    self._con.commit()
+                self.fallos += 1
+                return None
+            self._con.execute("UPDATE cache SET usado = ? WHERE clave = ?", (ahora, clave))
+            self._con.commit()
+            self.aciertos += 1
+            return fila[0]
+
+    def guardar(self, clave: str, valor: str, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        ahora = time.time()
+        expira = ahora + ttl if ttl is not None else None
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO cache (clave, valor, expira, usado) VALUES (?, ?, ?, ?)",
+                (clave, valor, expira, ahora),
+            )
+            # Desalojo LRU: se borran las entradas menos usadas recientemente
+            exceso = self._con.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entradas
+            if exceso > 0:
+                self._con.execute(
+                    "DELETE FROM cache WHERE clave IN (SELECT clave FROM cache ORDER BY usado LIMIT ?)",
+                    (exceso,),
+                )
+            self._con.commit()
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+        }
+
+
+def _describir_herramienta(herramienta) -> Any:
+    esquema = getattr(herramienta, "params_json_schema", None)
+    if esquema is not None:
+        return {"nombre": herramienta.name, "parametros": esquema}
+    # Herramientas alojadas (WebSearchTool, ...): su repr incluye la configuración
+    return repr(herramienta)
+
+
+def _nombre_modelo(modelo: Any) -> str:
+    if modelo is None or isinstance(modelo, str):
+        return str(modelo)
+    # Instancia de Model: su repr cambia en cada proceso
+    return f"{type(modelo).__name__}:{getattr(modelo, 'model', '')}"
+
+
+def huella_agente(agente: Agent, run_config: Optional[RunConfig] = None) -> dict:
+    """
+    Todo lo que determina la respuesta de un agente, salvo la entrada. El
+    modelo y los model_settings del run_config mandan sobre los del agente.
+    """
+    modelo = agente.model
+    ajustes = agente.model_settings
+    if run_config is not None:
+        if run_config.model is not None:
+            modelo = run_config.model
+        ajustes = ajustes.resolve(run_config.model_settings)
+    instrucciones = agente.instructions
+    if callable(instrucciones):
+        instrucciones = getattr(instrucciones, "__qualname__", repr(instrucciones))
+    salida = agente.output_type
+    if salida is None or salida is str:
+        esquema = "str"
+    else:
+        esquema = TypeAdapter(salida).json_schema()
+    return {
+        "modelo": _nombre_modelo(modelo),
+        "instrucciones": instrucciones,
+        "herramientas": [_describir_herramienta(h) for h in agente.tools],
+        "esquema_salida": esquema,
+        "model_settings": repr(ajustes),
+    }
+
+
+class CacheRespuestas(CacheSQLite):
+    """Caché de final_output de Runner.run, con clave de contenido por agente y entrada."""
+
+    def __init__(self, ruta: Optional[str] = None, ttl: Optional[float] = 7 * 24 * 3600,
+                 max_entradas: int = 10_000):
+        super().__init__(ruta or os.path.join(DIRECTORIO_CACHE, "respuestas.sqlite"), ttl, max_entradas)
+
+    @staticmethod
+    def clave(agente: Agent, entrada: Any, run_config: Optional[RunConfig] = None) -> str:
+        contenido = {"agente": huella_agente(agente, run_config), "entrada": entrada}
+        return hashlib.sha256(json.dumps(contenido, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+async def ejecutar_con_cache(agente: Agent, entrada: Any, cache: Optional[CacheRespuestas] = None,
+                             semantico: Optional["CacheSemantico"] = None,
+                             guardar_si: Optional[Callable[[Any], bool]] = None, **kwargs) -> Any:
+    """
+    Equivalente a (await Runner.run(agente, entrada)).final_output, pero sirve la
+    respuesta desde el caché si existe: primero el exacto y luego, si se indica,
+    el semántico (misma pregunta con otras palabras). Las salidas tipadas
+    (Respuesta_marcas u otros modelos pydantic) se reconstruyen con su output_type.
+
+    Con guardar_si, una respuesta nueva solo se guarda si guardar_si(final_output)
+    es verdadero (p. ej. la validación del llamador): así un reintento no vuelve
+    a recibir la misma respuesta inválida desde el caché.
+    """
+    if cache is None and semantico is None:
+        return (await Runner.run(agente, entrada, **kwargs)).final_output
+
+    adaptador = TypeAdapter(agente.output_type or str)
+    config = kwargs.get("run_config")
+    clave = cache.clave(agente, entrada, config) if cache is not None else None
+    guardado = cache.obtener(clave) if cache is not None else None
+    if guardado is None and semantico is not None:
+        guardado = semantico.obtener(agente, entrada, config)
+    if guardado is not None:
+        return adaptador.validate_json(guardado)
+
+    resultado = await Runner.run(agente, entrada, **kwargs)
+    if guardar_si is not None and not guardar_si(resultado.final_output):
+        return resultado.final_output
+    valor = adaptador.dump_json(resultado.final_output).decode("utf-8")
+    if cache is not None:
+        cache.guardar(clave, valor)
+    if semantico is not None:
+        semantico.guardar(agente, entrada, valor, config)
+    return resultado.final_output
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Caché semántico de respuestas de agentes.
+
+El caché exacto (cache_agentes.CacheRespuestas) no acierta cuando la misma
+pregunta llega con otras palabras ("¿por qué se separó La Vaquita?" frente a
+"motivo de la separación de La Vaquita y Supermú"). Aquí cada pregunta se
+convierte localmente, sin red, en un vector: raíces de palabras, la intención
+de la pregunta (causa, fecha, persona, lugar, cantidad: "por qué", "motivo" y
+"razón" dan el mismo rasgo), el nivel académico y, con poco peso, trigramas de
+caracteres, todo con el truco del hashing (dimensión fija, float32, norma 1).
+Los vectores de cada agente viven en una matriz float32 contigua mapeada a
+disco (np.memmap), así que la búsqueda del vecino más cercano es un solo
+producto matriz-vector, y se sirve la respuesta guardada si la similitud
+coseno supera el umbral y no ha vencido. Las preguntas y respuestas se guardan
+en SQLite, con el mismo índice que su fila.
+
+El umbral sale de un conjunto de pares a mano (ver benchmarks/
+bench_cache_semantico.py): las paráfrasis quedan en 0.85 o más y la misma
+pregunta sobre otra marca, otro programa u otro nivel, o con otra intención
+sobre la misma marca, en 0.68 o menos.
+"""
+import hashlib, json, os, sqlite3, threading, time, unicodedata, zlib
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from agents import Agent, RunConfig
+
+from cache_agentes import DIRECTORIO_CACHE, huella_agente
+
+DIMENSION = 256
+UMBRAL = 0.78
+TTL = 24 * 3600               # las respuestas salen de búsquedas web: un día, como TAVILY_TTL
+CAPACIDAD_INICIAL = 1024
+# Cambia con los rasgos de vectorizar: los vectores guardados con otra versión no son comparables
+VERSION_VECTORES = 2
+
+# Pesos de cada clase de rasgo (las raíces pesan 1)
+PESO_INTENCION = 1.0
+PESO_NIVEL = 2.0              # un doctorado no responde por una maestría del mismo tema
+PESO_TRIGRAMA = 0.1           # solo para errores de tipeo y variantes que la raíz no une
+
+# Palabras sin contenido: si cuentan, "¿por qué se separó X?" se parece más a
+# "¿por qué se separó Y?" que a "motivo de la separación de X"
+PALABRAS_VACIAS = set(
+    "a al como con cual cuales cuando cuanto cuanta cuantos cuantas de del dime donde dos el en entre es esta "
+    "este explica explicame fue la las lo los me mi muy por porque que quien quienes se ser sin sobre son su "
+    "sus un una uno y o u the of and what how is are to in for".split()
+)
+
+# Palabras (o pares de palabras) que dicen qué se pregunta, no de qué
+INTENCIONES = {
+    "causa": "por que|porque|motivo|motivos|razon|razones|causa|causas|why",
+    "tiempo": "cuando|ano|anos|fecha|when|year",
+    "persona": "quien|quienes|dueno|duenos|propietario|propietarios|who",
+    "lugar": "donde|lugar|ubicacion|queda|where",
+    "cantidad": "cuanto|cuanta|cuantos|cuantas|costo|precio",
+}
+_INTENCION = {palabra: intencion for intencion, palabras in INTENCIONES.items() for palabra in palabras.split("|")}
+
+NIVELES = {
+    "tecnico": "tecnico", "tecnologo": "tecnologo", "tecnologia": "tecnologo",
+    "pregrado": "pregrado", "profesional": "pregrado", "licenciatura": "pregrado",
+    "especializacion": "especializacion", "maestria": "maestria", "magister": "maestria", "master": "maestria",
+    "doctorado": "doctorado", "phd": "doctorado",
+}
+
+# Raíces equivalentes ("se dividió" es "se separó")
+SINONIMOS = {"divid": "separ", "divis": "separ", "escin": "separ", "propi": "dueno"}
+
+
+def _normalizar(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return " ".join("".join(c if c.isalnum() else " " for c in texto).split())
+
+
+def rasgos(texto: str) -> Dict[str, float]:
+    """
+    Rasgo -> peso de una pregunta: intención ("#causa"), nivel académico
+    ("%maestria"), raíz de 5 caracteres de cada palabra con contenido y sus
+    trigramas (con bordes de palabra). Cada rasgo cuenta una vez: repetir la
+    marca en la pregunta no la acerca a otra pregunta sobre la misma marca.
+    """
+    encontrados: Dict[str, float] = {}
+
+    def agregar(rasgo: str, peso: float):
+        encontrados[rasgo] = max(encontrados.get(rasgo, 0.0), peso)
+
+    palabras = _normalizar(texto).split()
+    i = 0
+    while i < len(palabras):
+        par = " ".join(palabras[i:i + 2])
+        if par in _INTENCION:
+            agregar("#" + _INTENCION[par], PESO_INTENCION)
+            i += 2
+            continue
+        palabra = palabras[i]
+        i += 1
+        if palabra in _INTENCION:
+            agregar("#" + _INTENCION[palabra], PESO_INTENCION)
+        elif palabra in NIVELES:
+            agregar("%" + NIVELES[palabra], PESO_NIVEL)
+        elif palabra not in PALABRAS_VACIAS and len(palabra) > 1:
+            agregar(SINONIMOS.get(palabra[:5], palabra[:5]), 1.0)
+            marcada = f" {palabra} "
+            for j in range(len(marcada) - 2):
+                agregar(marcada[j:j + 3], PESO_TRIGRAMA)
+    return encontrados
+
+
+def vectorizar(texto: str, dimension: int = DIMENSION) -> np.ndarray:
+    """
+    Vector float32 de norma 1 con los rasgos de `texto` repartidos en
+    `dimension` posiciones por crc32, con signo para que las colisiones se
+    compensen en vez de sumarse.
+    """
+    pesos = rasgos(texto)
+    vector = np.zeros(dimension, dtype=np.float32)
+    if not pesos:
+        return vector
+    hashes = np.fromiter((zlib.crc32(r.encode("utf-8")) for r in pesos), dtype=np.uint32, count=len(pesos))
+    signos = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dimension, signos * np.fromiter(pesos.values(), dtype=np.float32, count=len(pesos)))
+    norma = np.linalg.norm(vector)
+    return vector / norma if norma else vector
+
+
+class IndiceSemantico:
+    """
+    Vectores (np.memmap float32, n x dimension) y textos (SQLite) de un solo
+    espacio de preguntas. La capacidad del archivo se duplica al llenarse. Con
+    `ttl`, las entradas más viejas que ttl segundos no se devuelven como vecinas
+    (la fecha de cada fila se guarda también en un arreglo en memoria para
+    descartarlas en la misma búsqueda vectorizada).
+    """
+
+    def __init__(self, directorio: str, dimension: int = DIMENSION, ttl: Optional[float] = None):
+        os.makedirs(directorio, exist_ok=True)
+        self.dimension = dimension
+        self.ttl = ttl
+        self._ruta_vectores = os.path.join(directorio, "vectores.f32")
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(os.path.join(directorio, "entradas.sqlite"), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("CREATE TABLE IF NOT EXISTS entradas ("
+                          " fila INTEGER PRIMARY KEY, pregunta TEXT NOT NULL, valor TEXT NOT NULL, creado REAL)")
+        self._con.commit()
+        # Filas con texto en SQLite: un vector escrito sin su fila (corte a mitad) se sobrescribe
+        self.n = self._con.execute("SELECT COALESCE(MAX(fila) + 1, 0) FROM entradas").fetchone()[0]
+        existentes = os.path.getsize(self._ruta_vectores) // (4 * dimension) if os.path.exists(self._ruta_vectores) else 0
+        self._abrir(max(existentes, self.n, CAPACIDAD_INICIAL))
+        # Filas sin entrada quedan con fecha -inf: nunca se sirven si hay ttl
+        self.creados = np.full(self.capacidad, -np.inf)
+        for fila, creado in self._con.execute("SELECT fila, creado FROM entradas"):
+            self.creados[fila] = creado if creado is not None else -np.inf
+
+    def _abrir(self, capacidad: int):
+        with open(self._ruta_vectores, "ab") as f:
+            if f.tell() < capacidad * self.dimension * 4:
+                f.truncate(capacidad * self.dimension * 4)
+        self.capacidad = capacidad
+        self.matriz = np.memmap(self._ruta_vectores, dtype=np.float32, mode="r+", shape=(capacidad, self.dimension))
+
+    def _reservar(self, filas: int):
+        if self.n + filas > self.capacidad:
+            self.matriz.flush()
+            capacidad = self.capacidad
+            while capacidad < self.n + filas:
+                capacidad *= 2
+            del self.matriz
+            self._abrir(capacidad)
+            self.creados = np.concatenate([self.creados, np.full(capacidad - len(self.creados), -np.inf)])
+
+    def agregar_vectores(self, vectores: np.ndarray, preguntas, valores) -> int:
+        """Agrega un bloque de vectores ya calculados (carga masiva); devuelve la primera fila."""
+        with self._lock:
+            self._reservar(len(vectores))
+            inicio = self.n
+            self.matriz[inicio:inicio + len(vectores)] = vectores
+            ahora = time.time()
+            self._con.executemany("INSERT OR REPLACE INTO entradas (fila, pregunta, valor, creado) VALUES (?, ?, ?, ?)",
+                                  ((inicio + i, p, v, ahora) for i, (p, v) in enumerate(zip(preguntas, valores))))
+            self._con.commit()
+            self.creados[inicio:inicio + len(vectores)] = ahora
+            self.n += len(vectores)
+            return inicio
+
+    def agregar(self, pregunta: str, valor: str) -> int:
+        return self.agregar_vectores(vectorizar(pregunta, self.dimension)[None, :], [pregunta], [valor])
+
+    def vecino(self, vector: np.ndarray) -> Optional[Tuple[int, float]]:
+        """(fila, similitud coseno) de la pregunta vigente más parecida."""
+        with self._lock:
+            if self.n == 0:
+                return None
+            similitudes = self.matriz[:self.n] @ vector
+            if self.ttl is not None:
+                similitudes[self.creados[:self.n] < time.time() - self.ttl] = -np.inf
+        fila = int(np.argmax(similitudes))
+        if similitudes[fila] == -np.inf:
+            return None
+        return fila, float(similitudes[fila])
+
+    def texto(self, fila: int) -> Tuple[str, str]:
+        with self._lock:
+            return self._con.execute("SELECT pregunta, valor FROM entradas WHERE fila = ?", (fila,)).fetchone()
+
+    def sincronizar(self):
+        with self._lock:
+            self.matriz.flush()
+
+
+class CacheSemantico:
+    """
+    Caché semántico de final_output por agente: un IndiceSemantico por huella
+    del agente (modelo, instrucciones, herramientas, esquema de salida), para no
+    servir la respuesta de un agente distinto. Las respuestas vencen a los
+    `ttl` segundos (None: no vencen).
+    """
+
+    def __init__(self, directorio: Optional[str] = None, umbral: float = UMBRAL, dimension: int = DIMENSION,
+                 ttl: Optional[float] = TTL):
+        self.directorio = directorio or os.path.join(DIRECTORIO_CACHE, "semantico")
+        self.umbral = umbral
+        self.dimension = dimension
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._indices: Dict[str, IndiceSemantico] = {}
+        self._lock = threading.Lock()
+
+    def indice(self, agente: Agent, run_config: Optional[RunConfig] = None) -> IndiceSemantico:
+        huella = json.dumps([VERSION_VECTORES, huella_agente(agente, run_config)], sort_keys=True, default=str)
+        nombre = hashlib.sha256(huella.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            if nombre not in self._indices:
+                self._indices[nombre] = IndiceSemantico(os.path.join(self.directorio, nombre), self.dimension, self.ttl)
+            return self._indices[nombre]
+
+    def obtener(self, agente: Agent, entrada: Any, run_config: Optional[RunConfig] = None) -> Optional[str]:
+        """Valor guardado (texto JSON) para la pregunta vigente más parecida, si supera el umbral."""
+        if not isinstance(entrada, str):
+            return None
+        indice = self.indice(agente, run_config)
+        encontrado = indice.vecino(vectorizar(entrada, self.dimension))
+        if encontrado is None or encontrado[1] < self.umbral:
+            self.fallos += 1
+            return None
+        pregunta, valor = indice.texto(encontrado[0])
+        self.aciertos += 1
+        print(f"Caché semántico: '{entrada[:60]}' ≈ '{pregunta[:60]}' (similitud {encontrado[1]:.2f})")
+        return valor
+
+    def guardar(self, agente: Agent, entrada: Any, valor: str, run_config: Optional[RunConfig] = None):
+        if isinstance(entrada, str):
+            self.indice(agente, run_config).agregar(entrada, valor)
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+            "entradas": sum(indice.n for indice in self._indices.values()),
+        }
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Cascada de agentes con escalamiento cubierto (hedged).
+
+En la cascada secuencial de ejemplo1/ejemplo2 el agente barato se espera hasta
+el final y solo después se lanza el agente de respaldo, por lo que la latencia
+de peor caso es la suma de ambos. Aquí, si una etapa no ha entregado una
+respuesta válida dentro del retardo de cobertura, se lanza la siguiente en
+paralelo; gana la primera respuesta válida y las demás se cancelan. Con un
+enrutador (enrutador.EnrutadorModelos), la primera etapa se salta cuando se
+predice que no pasará la validación para esa clase de pregunta. Una etapa
+puede rechazar su respuesta devolviendo Rechazo(parcial); las etapas con
+con_parcial=True reciben esa respuesta parcial para completarla en vez de
+empezar de cero (ver relleno.py). Con un plazo vigente (plazo.con_plazo), cada
+etapa espera a lo sumo lo que queda de él y, si vence, la cascada devuelve
+estado PLAZO_EXCEDIDO con la última respuesta parcial que haya.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from enrutador import EnrutadorModelos
+from plazo import PLAZO_EXCEDIDO, PlazoExcedido, agotado, esperar, restante
+from telemetria import evento, medir
+
+
+@dataclass
+class Etapa:
+    """
+    Una etapa de la cascada. `ejecutar` corre el agente y devuelve la respuesta
+    ya validada, o None / Rechazo(parcial) si la respuesta no pasó la validación.
+    Con con_parcial=True, `ejecutar` recibe la última respuesta parcial
+    rechazada por una etapa anterior (o None si no la hay).
+    """
+    nombre: str
+    ejecutar: Callable[..., Awaitable[Any]]
+    timeout: float = 30
+    costo: float = 0.0      # costo estimado de un intento (lo usa el enrutador)
+    con_parcial: bool = False
+
+
+@dataclass
+class Rechazo:
+    """Respuesta que no pasó la validación, pero cuyos campos válidos pueden aprovecharse."""
+    parcial: Any
+
+
+@dataclass
+class ResultadoCascada:
+    valor: Any                       # respuesta válida, o None si ninguna etapa la obtuvo
+    etapa: Optional[str]             # nombre de la etapa ganadora
+    latencia: float                  # segundos totales de la cascada
+    ahorro: float = 0.0              # segundos ahorrados frente a la cascada secuencial (estimado)
+    etapas_lanzadas: List[str] = field(default_factory=list)
+    enrutada: bool = False           # el enrutador saltó la primera etapa
+    estado: str = "ok"               # ok, sin_respuesta o plazo_excedido
+    parcial: Any = None              # última respuesta rechazada, si la hubo
+
+
+class EstadisticasCascada:
+    """Acumula tasas de victoria por etapa y la latencia ahorrada por la cobertura."""
+
+    def __init__(self):
+        self.ejecuciones = 0
+        self.sin_respuesta = 0
+        self.plazo_excedido = 0
+        self.victorias: Dict[str, int] = {}
+        self.ahorro_total = 0.0
+        self.latencia_total = 0.0
+
+    def registrar(self, resultado: ResultadoCascada):
+        self.ejecuciones += 1
+        self.latencia_total += resultado.latencia
+        self.ahorro_total += resultado.ahorro
+        if resultado.estado == PLAZO_EXCEDIDO:
+            self.plazo_excedido += 1
+        elif resultado.etapa is None:
+            self.sin_respuesta += 1
+        else:
+            self.victorias[resultado.etapa] = self.victorias.get(resultado.etapa, 0) + 1
+
+    def resumen(self) -> dict:
+        n = max(self.ejecuciones, 1)
+        return {
+            "ejecuciones": self.ejecuciones,
+            "tasa_victoria": {nombre: v / n for nombre, v in self.victorias.items()},
+            "tasa_sin_respuesta": self.sin_respuesta / n,
+            "tasa_plazo_excedido": self.plazo_excedido / n,
+            "latencia_media": self.latencia_total / n,
+            "ahorro_total": self.ahorro_total,
+            "ahorro_medio": self.ahorro_total / n,
+        }
+
+
+async def _correr_etapa(etapa: Etapa, parcial: Any = None):
+    with medir("etapa", etapa.nombre) as span:
+        corrutina = etapa.ejecutar(parcial) if etapa.con_parcial else etapa.ejecutar()
+        # Timeout propio de la etapa, recortado a lo que quede del plazo de la solicitud
+        valor = await esperar(corrutina, etapa.timeout)
+        span.set_attribute("agentes.valida", valor is not None and not isinstance(valor, Rechazo))
+        return valor
+
+
+async def ejecutar_cascada(etapas: List[Etapa], retardo_cobertura: Optional[float] = None,
+                           estadisticas: Optional[EstadisticasCascada] = None,
+                           enrutador: Optional[EnrutadorModelos] = None,
+                           consulta: Optional[str] = None) -> ResultadoCascada:
+    """
+    Ejecuta las etapas en orden. Una etapa se lanza cuando la anterior termina sin
+    respuesta válida o, si se indica retardo_cobertura, cuando han pasado esos
+    segundos desde el lanzamiento anterior sin respuesta (en paralelo con ella).
+    Con retardo_cobertura=None el comportamiento es el de la cascada secuencial.
+    Con enrutador y consulta, se le consulta si saltar la primera etapa y se le
+    informa el resultado de cada intento de esa etapa, también cuando se cancela
+    sin terminar (como resultado desconocido). Si vence el plazo
+    vigente, se cancelan las etapas en curso y no se lanzan más.
+    """
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    pendientes: Dict[asyncio.Task, int] = {}
+    inicio: Dict[int, float] = {}
+    fin: Dict[int, float] = {}
+    siguiente = 0
+    parcial = None      # última respuesta rechazada, para las etapas con_parcial
+    vencido = False     # alguna etapa se cortó por el plazo de la solicitud
+
+    decision = None
+    if enrutador is not None and consulta is not None and len(etapas) > 1:
+        decision = enrutador.decidir(etapas[0].nombre, consulta)
+        if decision.saltar:
+            evento("enrutador_salta", etapa=etapas[0].nombre, probabilidad=decision.probabilidad,
+                   clase=decision.clase)
+            siguiente = 1
+
+    def lanzar():
+        nonlocal siguiente
+        etapa = etapas[siguiente]
+        tarea = asyncio.create_task(_correr_etapa(etapa, parcial))
+        pendientes[tarea] = siguiente
+        inicio[siguiente] = loop.time()
+        siguiente += 1
+
+    def terminar(valor, ganadora: Optional[int], estado: str = "ok") -> ResultadoCascada:
+        ahora = loop.time()
+        ahorro = 0.0
+        # En secuencia, la ganadora habría arrancado cuando terminaran (o fueran
+        # descartadas ahora) todas las etapas anteriores que se lanzaron.
+        previas = [fin.get(i, ahora) for i in range(ganadora or 0) if i in inicio]
+        if previas:
+            ahorro = max(0.0, max(previas) - inicio[ganadora])
+        resultado = ResultadoCascada(
+            valor=valor,
+            etapa=etapas[ganadora].nombre if ganadora is not None else None,
+            latencia=ahora - t0,
+            ahorro=ahorro,
+            etapas_lanzadas=[etapas[i].nombre for i in sorted(inicio)],
+            enrutada=decision is not None and decision.saltar,
+            estado=estado,
+            parcial=parcial,
+        )
+        if estadisticas is not None:
+            estadisticas.registrar(resultado)
+        return resultado
+
+    lanzar()
+    try:
+        while pendientes:
+            espera = None
+            if retardo_cobertura is not None and siguiente < len(etapas):
+                espera = max(0.0, inicio[siguiente - 1] + retardo_cobertura - loop.time())
+            queda = restante()
+            if queda is not None:
+                espera = queda if espera is None else min(espera, queda)
+            hechas, _ = await asyncio.wait(pendientes, timeout=espera, return_when=asyncio.FIRST_COMPLETED)
+            if not hechas:
+                if agotado():
+                    vencido = True
+                    break
+                # asyncio.wait puede volver un poco antes del timeout pedido: solo se
+                # lanza la cobertura si de verdad se cumplió su retardo, y si no
+                # quedan etapas se sigue esperando hasta el plazo
+                if (retardo_cobertura is not None and siguiente < len(etapas)
+                        and loop.time() >= inicio[siguiente - 1] + retardo_cobertura):
+                    evento("cobertura", etapa=etapas[siguiente].nombre, retardo=retardo_cobertura)
+                    lanzar()
+                continue
+            for tarea in sorted(hechas, key=pendientes.get):
+                i = pendientes.pop(tarea)
+                fin[i] = loop.time()
+                try:
+                    valor = tarea.result()
+                except PlazoExcedido:
+                    evento("etapa_plazo_excedido", etapa=etapas[i].nombre)
+                    vencido = True
+                    if decision is not None and i == 0:
+                        enrutador.registrar(etapas[0].nombre, decision, None, fin[0] - inicio[0], etapas[0].costo)
+                    continue
+                except Exception as e:
+                    evento("etapa_fallida", etapa=etapas[i].nombre, error=repr(e))
+                    valor = None
+                if isinstance(valor, Rechazo):
+                    parcial, valor = valor.parcial, None
+                if decision is not None and i == 0:
+                    enrutador.registrar(etapas[0].nombre, decision, valor is not None,
+                                        fin[0] - inicio[0], etapas[0].costo)
+                if valor is not None:
+                    return terminar(valor, i)
+            # Todas las etapas en curso fallaron: se escala de inmediato (si queda plazo)
+            if not pendientes and siguiente < len(etapas) and not (vencido or agotado()):
+                lanzar()
+        return terminar(None, None, PLAZO_EXCEDIDO if vencido or agotado() else "sin_respuesta")
+    finally:
+        # La etapa barata que sigue en curso se corta (ganó la cobertura o venció
+        # el plazo): sin esto el enrutador solo vería los intentos que terminan
+        if decision is not None and 0 in pendientes.values():
+            enrutador.registrar(etapas[0].nombre, decision, None, loop.time() - inicio[0], etapas[0].costo)
+        for tarea in pendientes:
+            tarea.cancel()
+        # Se espera a que las canceladas terminen, para no dejarlas huérfanas en el loop
+        await asyncio.gather(*pendientes, return_exceptions=True)
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Grabación y reproducción ("casete") de llamadas al modelo y a herramientas.
+
+En modo grabar, cada respuesta del modelo (vía un ModelProvider que envuelve al
+del RunConfig) y cada entrada/salida de las herramientas marcadas con
+@grabable (fetch_text, Tavily, DuckDuckGo, Wikipedia, Nominatim) se escribe en
+un archivo JSONL comprimido con gzip. En modo reproducir, esas respuestas se
+sirven desde memoria, sin red, sin API key y de forma determinística; una
+llamada que no está en el casete es un error. En modo auto se reproduce lo
+grabado y se graban las llamadas nuevas.
+
+Se activa con variables de entorno (los ejemplos llaman a activar() al inicio):
+    AGENTES_CASETE=casetes/ejemplo2.jsonl.gz
+    AGENTES_CASETE_MODO=grabar | reproducir | auto   (por defecto auto)
+"""
+import asyncio, atexit, dataclasses, functools, gzip, hashlib, inspect, json, os, threading
+from typing import Any, Dict, List, Optional
+
+import httpx
+from pydantic import BaseModel, TypeAdapter
+from openai.types.responses import ResponseOutputItem, ResponseStreamEvent
+
+from agents import Model, ModelProvider, ModelResponse, RunConfig, Usage, set_tracing_disabled
+from agents.run import set_default_agent_runner
+
+from concurrencia import RunnerConConfig
+from plazo import PlazoExcedido, esperar
+
+MODOS = ("grabar", "reproducir", "auto")
+# Segundos que un stream grabado a medias espera, al reproducirse, la cancelación que lo cortó
+ESPERA_STREAM_CORTADO = 30
+
+_salidas_modelo = TypeAdapter(List[ResponseOutputItem])
+_eventos_modelo = TypeAdapter(ResponseStreamEvent)
+
+
+class CaseteError(Exception):
+    """La llamada no está grabada en el casete (modo reproducir)."""
+
+
+class ErrorGrabado(Exception):
+    """Excepción que lanzó una herramienta al grabar; se relanza igual al reproducir."""
+
+
+def _transitorio(error: Exception) -> bool:
+    """
+    Fallos que dependen del momento y no de los argumentos (plazo o timeout
+    vencido, red caída, HTTP 429 o 5xx): se relanzan sin grabarlos, para que la
+    próxima ejecución vuelva a intentar la llamada.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
+def _json(valor: Any) -> Any:
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    if dataclasses.is_dataclass(valor) and not isinstance(valor, type):
+        return dataclasses.asdict(valor)
+    # Objetos sin representación estable (cachés, clientes): solo cuenta su tipo
+    return type(valor).__name__
+
+
+def clave(tipo: str, contenido: Any) -> str:
+    texto = json.dumps({"tipo": tipo, "contenido": contenido}, sort_keys=True, default=_json, ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class Casete:
+    """
+    Registros {tipo, nombre, clave, respuesta} en un .jsonl.gz. Una misma clave
+    puede tener varias respuestas grabadas: se reproducen en el mismo orden y,
+    agotadas, se repite la última.
+    """
+
+    def __init__(self, ruta: str, modo: str = "auto"):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de casete desconocido: {modo!r} (use {', '.join(MODOS)})")
+        self.ruta = ruta
+        self.modo = modo
+        self.grabadas: Dict[str, List[Any]] = {}
+        self._posiciones: Dict[str, int] = {}
+        self.reproducidas = 0
+        self.nuevas = 0
+        self._lock = threading.Lock()
+        self._archivo = None
+        if modo != "grabar" and os.path.exists(ruta):
+            with gzip.open(ruta, "rt", encoding="utf-8") as f:
+                for linea in f:
+                    if linea.strip():
+                        registro = json.loads(linea)
+                        self.grabadas.setdefault(registro["clave"], []).append(registro["respuesta"])
+        elif modo == "reproducir":
+            raise FileNotFoundError(f"No existe el casete {ruta}")
+        if modo != "reproducir":
+            os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+            # Cada sesión agrega un miembro gzip; gzip.open los lee todos seguidos
+            self._archivo = gzip.open(ruta, "wt" if modo == "grabar" else "at", encoding="utf-8")
+            atexit.register(self.cerrar)
+
+    def buscar(self, clave: str) -> Optional[List[Any]]:
+        """[respuesta] si está grabada (y el modo permite reproducir), None si hay que llamar."""
+        if self.modo == "grabar":
+            return None
+        with self._lock:
+            respuestas = self.grabadas.get(clave)
+            if not respuestas:
+                if self.modo == "reproducir":
+                    raise CaseteError(f"La llamada {clave[:12]} no está grabada en {self.ruta}")
+                return None
+            posicion = self._posiciones.get(clave, 0)
+            self._posiciones[clave] = posicion + 1
+            self.reproducidas += 1
+            return [respuestas[min(posicion, len(respuestas) - 1)]]
+
+    def grabar(self, tipo: str, nombre: str, clave: str, respuesta: Any):
+        with self._lock:
+            self.grabadas.setdefault(clave, []).append(respuesta)
+            self.nuevas += 1
+            if self._archivo is None:   # un stream abandonado que se cierra después de cerrar()
+                return
+            registro = {"tipo": tipo, "nombre": nombre, "clave": clave, "respuesta": respuesta}
+            self._archivo.write(json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def cerrar(self):
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+    def resumen(self) -> dict:
+        return {"ruta": self.ruta, "modo": self.modo, "reproducidas": self.reproducidas, "grabadas": self.nuevas}
+
+
+# --- Modelo ---
+
+def _clave_modelo(nombre: str, system_instructions, input, model_settings, tools, output_schema, handoffs) -> str:
+    return clave("modelo", {
+        "modelo": nombre,
+        "instrucciones": system_instructions,
+        "entrada": input,
+        "ajustes": model_settings.to_json_dict(),
+        "herramientas": [h.name for h in tools],
+        "salida": None if output_schema is None or output_schema.is_plain_text() else output_schema.json_schema(),
+        "handoffs": [h.tool_name for h in handoffs],
+    })
+
+
+def _uso(usage: Usage) -> dict:
+    return {"requests": usage.requests, "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens, "total_tokens": usage.total_tokens}
+
+
+class ModeloCasete(Model):
+    """Envuelve un Model: sirve las respuestas grabadas y graba las nuevas."""
+
+    def __init__(self, casete: Casete, nombre: str, crear_modelo):
+        self.casete = casete
+        self.nombre = nombre
+        self._crear_modelo = crear_modelo   # perezoso: al reproducir no se necesita cliente ni API key
+        self._modelo: Optional[Model] = None
+
+    @property
+    def modelo(self) -> Model:
+        if self._modelo is None:
+            self._modelo = self._crear_modelo()
+        return self._modelo
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, **kwargs) -> ModelResponse:
+        k = _clave_modelo(self.nombre, system_instructions, input, model_settings, tools, output_schema, handoffs)
+        grabada = self.casete.buscar(k)
+        if grabada is not None:
+            datos = grabada[0]
+            return ModelResponse(output=_salidas_modelo.validate_python(datos["output"]),
+                                 usage=Usage(**datos["usage"]), response_id=datos["response_id"])
+        respuesta = await self.modelo.get_response(system_instructions, input, model_settings, tools,
+                                                   output_schema, handoffs, tracing, **kwargs)
+        self.casete.grabar("modelo", self.nombre, k, {
+            "output": [item.model_dump(mode="json") for item in respuesta.output],
+            "usage": _uso(respuesta.usage),
+            "response_id": respuesta.response_id,
+        })
+        return respuesta
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, **kwargs):
+        k = _clave_modelo(self.nombre, system_instructions, input, model_settings, tools, output_schema, handoffs)
+        grabada = self.casete.buscar("stream:" + k)
+        if grabada is not None:
+            datos = grabada[0]
+            if isinstance(datos, list):     # casetes grabados antes de guardar streams parciales
+                datos = {"eventos": datos, "completo": True}
+            for evento in datos["eventos"]:
+                yield _eventos_modelo.validate_python(evento)
+            if not datos["completo"]:
+                # Al grabar, el consumidor canceló el stream en este punto: se espera
+                # la misma cancelación en vez de terminar un stream que no terminó
+                try:
+                    await esperar(asyncio.Event().wait(), ESPERA_STREAM_CORTADO)
+                except PlazoExcedido:
+                    raise
+                except TimeoutError:
+                    raise CaseteError(f"El stream {k[:12]} se grabó cortado tras {len(datos['eventos'])} eventos "
+                                      f"y nadie lo canceló en {ESPERA_STREAM_CORTADO}s (en {self.casete.ruta})")
+            return
+        # Se graba también el stream que el consumidor corta a mitad (un intento
+        # cancelado por la cascada), con los eventos que alcanzó a recibir
+        eventos: Optional[list] = []
+        completo = False
+        try:
+            async for evento in self.modelo.stream_response(system_instructions, input, model_settings, tools,
+                                                            output_schema, handoffs, tracing, **kwargs):
+                eventos.append(evento.model_dump(mode="json"))
+                yield evento
+            completo = True
+        except Exception:
+            # Falló el modelo, no el consumidor: no hay nada reproducible que grabar
+            eventos = None
+            raise
+        finally:
+            if eventos is not None:
+                self.casete.grabar("modelo", self.nombre, "stream:" + k, {"eventos": eventos, "completo": completo})
+
+
+class ProveedorCasete(ModelProvider):
+    def __init__(self, casete: Casete, proveedor: ModelProvider):
+        self.casete = casete
+        self.proveedor = proveedor
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return ModeloCasete(self.casete, model_name or "", lambda: self.proveedor.get_model(model_name))
+
+
+class RunnerCasete(RunnerConConfig):
+    """AgentRunner por defecto que pasa todas las llamadas al modelo por el casete."""
+
+    def __init__(self, casete: Casete):
+        super().__init__()
+        self.casete = casete
+
+    def _con_casete(self, kwargs: dict) -> dict:
+        config = kwargs.get("run_config") or RunConfig()
+        if not isinstance(config.model_provider, ProveedorCasete):
+            config = dataclasses.replace(config, model_provider=ProveedorCasete(self.casete, config.model_provider))
+        return {**kwargs, "run_config": config}
+
+    async def run(self, starting_agent, input, **kwargs):
+        return await super().run(starting_agent, input, **self._con_casete(kwargs))
+
+    def run_sync(self, starting_agent, input, **kwargs):
+        return super().run_sync(starting_agent, input, **self._con_casete(kwargs))
+
+    def run_streamed(self, starting_agent, input, **kwargs):
+        return super().run_streamed(starting_agent, input, **self._con_casete(kwargs))
+
+
+# --- Activación y herramientas ---
+
+_activo: Optional[Casete] = None
+_leido_entorno = False
+_lock_activar = threading.Lock()
+
+
+def activar(ruta: Optional[str] = None, modo: Optional[str] = None) -> Optional[Casete]:
+    """
+    Activa el casete indicado (o el de AGENTES_CASETE) para todo el proceso e
+    instala el runner que graba/reproduce las llamadas al modelo. Sin ruta ni
+    variable de entorno no hace nada y devuelve None.
+    """
+    global _activo, _leido_entorno
+    with _lock_activar:
+        if ruta is None:
+            if _leido_entorno:
+                return _activo
+            _leido_entorno = True
+            ruta = os.getenv("AGENTES_CASETE")
+            if not ruta:
+                return None
+        if _activo is not None:
+            _activo.cerrar()
+        _activo = Casete(ruta, modo or os.getenv("AGENTES_CASETE_MODO", "auto"))
+        set_default_agent_runner(RunnerCasete(_activo))
+        if _activo.modo == "reproducir":
+            # Sin red: las trazas tampoco se exportan a OpenAI
+            set_tracing_disabled(True)
+        return _activo
+
+
+def grabable(nombre: str):
+    """
+    Decorador para funciones async de herramientas con resultado serializable
+    en JSON: con un casete activo, la salida se graba o se reproduce según los
+    argumentos de la llamada. Una excepción se graba (y se relanza igual al
+    reproducir) solo si no es transitoria.
+    """
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+
+        @functools.wraps(funcion)
+        async def envoltura(*args, **kwargs):
+            casete = activar()
+            if casete is None:
+                return await funcion(*args, **kwargs)
+            argumentos = firma.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            k = clave(nombre, argumentos.arguments)
+            grabada = casete.buscar(k)
+            if grabada is not None:
+                if isinstance(grabada[0], dict) and "__error__" in grabada[0]:
+                    raise ErrorGrabado(grabada[0]["__error__"])
+                return grabada[0]
+            try:
+                resultado = await funcion(*args, **kwargs)
+            except Exception as e:
+                if not _transitorio(e):
+                    casete.grabar("herramienta", nombre, k, {"__error__": str(e)})
+                raise
+            casete.grabar("herramienta", nombre, k, resultado)
+            return resultado
+        return envoltura
+    return decorador
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Ejecución concurrente acotada de corridas de agentes.
+
+Permite lanzar un lote de tareas (por ejemplo, varias corridas de un executor)
+con un límite de concurrencia, recibir cada resultado en cuanto termina y
+conocer los tiempos de cada tarea para identificar la ruta crítica del lote.
+También ofrece as_map_tool, la variante "map" de Agent.as_tool.
+"""
+import asyncio, contextvars
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from agents import Agent, FunctionTool, RunConfig, RunContextWrapper, Runner, function_tool
+from agents.run import AgentRunner, get_default_agent_runner, set_default_agent_runner
+
+from telemetria import registrar_espera
+
+
+@dataclass
+class TiempoTarea:
+    indice: int
+    etiqueta: str
+    espera: float = 0.0        # segundos en cola esperando un cupo
+    inicio: float = 0.0        # segundos desde el inicio del lote
+    fin: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def duracion(self) -> float:
+        return self.fin - self.inicio
+
+
+async def ejecutar_acotado(fabricas: List[Callable[[], Awaitable[Any]]], limite: int,
+                           etiquetas: Optional[List[str]] = None) -> AsyncIterator[Tuple[int, Any, TiempoTarea]]:
+    """
+    Ejecuta las tareas con a lo sumo `limite` simultáneas y entrega
+    (indice, resultado, tiempo) en el orden en que van terminando. Si una tarea
+    lanza una excepción, el resultado es la excepción (no se interrumpe el lote).
+    """
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    semaforo = asyncio.Semaphore(limite)
+    terminadas: asyncio.Queue = asyncio.Queue()
+
+    async def correr(indice: int, fabrica):
+        tiempo = TiempoTarea(indice, etiquetas[indice] if etiquetas else str(indice))
+        async with semaforo:
+            tiempo.inicio = loop.time() - t0
+            tiempo.espera = tiempo.inicio
+            registrar_espera("lote", tiempo.espera)
+            try:
+                resultado = await fabrica()
+            except Exception as e:
+                resultado = e
+                tiempo.error = repr(e)
+            tiempo.fin = loop.time() - t0
+        terminadas.put_nowait((indice, resultado, tiempo))
+
+    tareas = [asyncio.create_task(correr(i, f)) for i, f in enumerate(fabricas)]
+    try:
+        for _ in tareas:
+            yield await terminadas.get()
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+
+
+def resumen_tiempos(tiempos: List[TiempoTarea]) -> dict:
+    """Tiempo de pared, suma secuencial, paralelismo efectivo y ruta crítica del lote."""
+    if not tiempos:
+        return {"pared": 0.0, "suma": 0.0, "paralelismo": 0.0, "ruta_critica": None}
+    pared = max(t.fin for t in tiempos)
+    suma = sum(t.duracion for t in tiempos)
+    # La tarea que termina de última fija el tiempo total: su espera + su duración
+    critica = max(tiempos, key=lambda t: t.fin)
+    return {
+        "pared": pared,
+        "suma": suma,
+        "paralelismo": suma / pared if pared else 0.0,
+        "ruta_critica": {"etiqueta": critica.etiqueta, "espera": critica.espera, "duracion": critica.duracion},
+    }
+
+
+# RunConfig de la corrida en curso: el SDK no se lo pasa a las herramientas
+_config_activa: contextvars.ContextVar[Optional[RunConfig]] = contextvars.ContextVar("agentes_run_config",
+                                                                                    default=None)
+
+
+def config_activa() -> Optional[RunConfig]:
+    """RunConfig de la corrida de agente que está ejecutando al llamador (None si no se pasó)."""
+    return _config_activa.get()
+
+
+class RunnerConConfig(AgentRunner):
+    """
+    AgentRunner que deja el run_config de cada corrida en una ContextVar. Las
+    herramientas corren en tareas creadas dentro de la corrida y lo heredan, así
+    que as_map_tool puede pasarlo a las corridas del sub-agente. La aplicación lo
+    instala al arrancar con instalar_runner.
+    """
+
+    async def run(self, starting_agent, input, **kwargs):
+        token = _config_activa.set(kwargs.get("run_config"))
+        try:
+            return await super().run(starting_agent, input, **kwargs)
+        finally:
+            _config_activa.reset(token)
+
+    def run_streamed(self, starting_agent, input, **kwargs):
+        # La tarea de la corrida copia el contexto al crearse dentro de run_streamed
+        token = _config_activa.set(kwargs.get("run_config"))
+        try:
+            return super().run_streamed(starting_agent, input, **kwargs)
+        finally:
+            _config_activa.reset(token)
+
+
+def instalar_runner():
+    """
+    Instala RunnerConConfig como runner por defecto del proceso. Se llama una vez
+    al arrancar la aplicación; si ya hay uno que registra el run_config (el del
+    casete), se deja ese.
+    """
+    if not isinstance(get_default_agent_runner(), RunnerConConfig):
+        set_default_agent_runner(RunnerConConfig())
+
+
+def as_map_tool(agente: Agent, tool_name: str, tool_description: str, max_concurrency: int = 5) -> FunctionTool:
+    """
+    Variante "map" de agente.as_tool: la herramienta recibe una LISTA de entradas,
+    corre el sub-agente sobre ellas en paralelo (a lo sumo max_concurrency a la vez,
+    una sola vez por entrada repetida) y devuelve las salidas en el orden de entrada.
+    Como as_tool, cada corrida recibe el contexto de la corrida que llama a la
+    herramienta y, además, su run_config (modelo, proveedor, filtros, trazas), siempre
+    que la aplicación haya instalado RunnerConConfig (ver instalar_runner).
+    """
+    async def mapear(context: RunContextWrapper, inputs: List[str]) -> List[str]:
+        unicas = list(dict.fromkeys(inputs))
+        config = config_activa()
+        fabricas = [lambda e=e: Runner.run(agente, e, context=context.context, run_config=config) for e in unicas]
+        salidas = {}
+        async for i, resultado, tiempo in ejecutar_acotado(fabricas, max_concurrency, unicas):
+            salidas[unicas[i]] = f"Error: {tiempo.error}" if tiempo.error else str(resultado.final_output)
+        return [salidas[e] for e in inputs]
+
+    return function_tool(mapear, name_override=tool_name, description_override=tool_description)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Compactación del contexto en bucles largos de herramientas (ReAct).
+
+En el bucle Thought/Action/Observation de ejemplo5 cada observación de
+fetch_url (hasta 3000 caracteres) queda en la conversación para todos los
+turnos siguientes, así que los tokens de entrada por turno crecen con cada
+paso y el total de la corrida crece de forma cuadrática. CompactadorContexto
+se usa como call_model_input_filter del RunConfig: antes de cada llamada al
+modelo conserva textuales las últimas K observaciones, reemplaza las más
+antiguas por un resumen corto con su URL de origen y, si aun así se pasa del
+presupuesto de tokens del turno, resume también las recientes (de la más
+antigua a la más nueva) y por último recorta la más reciente.
+
+Los tokens se estiman como caracteres / 4 (sin depender de un tokenizador).
+
+Uso:
+    compactador = CompactadorContexto(ultimas=2, presupuesto=6000)
+    result = await Runner.run(agent, prompt, run_config=RunConfig(call_model_input_filter=compactador))
+    print(compactador.resumen())
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from agents.run import CallModelData, ModelInputData
+
+
+def estimar_tokens(valor: Any) -> int:
+    texto = valor if isinstance(valor, str) else json.dumps(valor, ensure_ascii=False, default=str)
+    return len(texto) // 4 + 1
+
+
+def _campo(item: Any, nombre: str) -> Any:
+    return item.get(nombre) if isinstance(item, dict) else getattr(item, nombre, None)
+
+
+def resumir(texto: str, fuente: Optional[str], max_chars: int = 300) -> str:
+    """Resumen extractivo: el comienzo del texto, cortado en un límite de frase o palabra."""
+    texto = " ".join(texto.split())
+    if len(texto) > max_chars:
+        corte = texto[:max_chars]
+        fin = max(corte.rfind(". "), corte.rfind(" "))
+        texto = (corte[:fin + 1] if fin > max_chars // 2 else corte).rstrip() + " …"
+    origen = f" de {fuente}" if fuente else ""
+    return f"[Observación anterior resumida{origen}] {texto}"
+
+
+class CompactadorContexto:
+    """
+    Filtro de entrada del modelo para una corrida. Lleva la cuenta de los
+    tokens que se habrían enviado sin compactar y de los que se enviaron.
+    """
+
+    def __init__(self, ultimas: int = 2, presupuesto: Optional[int] = 8000, max_resumen: int = 300,
+                 herramientas: Optional[List[str]] = None):
+        self.ultimas = ultimas
+        self.presupuesto = presupuesto
+        self.max_resumen = max_resumen
+        self.herramientas = herramientas     # None: compacta las salidas de todas las function tools
+        self.turnos = 0
+        self.tokens_originales = 0
+        self.tokens_enviados = 0
+        self._resumenes: Dict[str, str] = {}
+
+    def _fuentes(self, items: List[Any]) -> Dict[str, Optional[str]]:
+        """call_id -> URL (u otra fuente) de los argumentos de la llamada, para las herramientas compactables."""
+        fuentes = {}
+        for item in items:
+            if _campo(item, "type") != "function_call":
+                continue
+            if self.herramientas is not None and _campo(item, "name") not in self.herramientas:
+                continue
+            try:
+                argumentos = json.loads(_campo(item, "arguments") or "{}")
+            except ValueError:
+                argumentos = {}
+            fuentes[_campo(item, "call_id")] = argumentos.get("url") or argumentos.get("query")
+        return fuentes
+
+    def _resumen(self, call_id: str, salida: str, fuente: Optional[str]) -> str:
+        # Mismo resumen en todos los turnos: el prefijo de la conversación no cambia
+        if call_id not in self._resumenes:
+            self._resumenes[call_id] = resumir(salida, fuente, self.max_resumen)
+        return self._resumenes[call_id]
+
+    def compactar(self, instrucciones: Optional[str], items: List[Any]) -> List[Any]:
+        fuentes = self._fuentes(items)
+        observaciones = [i for i, item in enumerate(items)
+                         if _campo(item, "type") == "function_call_output" and _campo(item, "call_id") in fuentes
+                         and isinstance(_campo(item, "output"), str)]
+        salida = list(items)
+
+        def reemplazar(i: int, texto: str):
+            item = items[i]
+            salida[i] = dict(item, output=texto) if isinstance(item, dict) else item.model_copy(update={"output": texto})
+
+        def resumir_item(i: int):
+            call_id = _campo(items[i], "call_id")
+            reemplazar(i, self._resumen(call_id, _campo(items[i], "output"), fuentes[call_id]))
+
+        def total() -> int:
+            return estimar_tokens(instrucciones or "") + sum(estimar_tokens(item) for item in salida)
+
+        # Observaciones viejas (todas menos las últimas K) -> resumen
+        recientes = observaciones[-self.ultimas:] if self.ultimas > 0 else []
+        for i in observaciones:
+            if i not in recientes:
+                resumir_item(i)
+
+        if self.presupuesto is not None:
+            # Sobre presupuesto: se resumen también las recientes, de la más antigua a la más nueva...
+            while total() > self.presupuesto and len(recientes) > 1:
+                resumir_item(recientes.pop(0))
+            # ... y, como último recurso, se recorta la más reciente
+            exceso = total() - self.presupuesto
+            if exceso > 0 and recientes:
+                i = recientes[0]
+                texto = _campo(salida[i], "output")
+                reemplazar(i, texto[:max(self.max_resumen, len(texto) - exceso * 4)] + " …[recortado]")
+        return salida
+
+    def __call__(self, datos: CallModelData) -> ModelInputData:
+        entrada = datos.model_data
+        items = self.compactar(entrada.instructions, entrada.input)
+        original = estimar_tokens(entrada.instructions or "") + sum(estimar_tokens(item) for item in entrada.input)
+        enviado = estimar_tokens(entrada.instructions or "") + sum(estimar_tokens(item) for item in items)
+        self.turnos += 1
+        self.tokens_originales += original
+        self.tokens_enviados += enviado
+        return ModelInputData(input=items, instructions=entrada.instructions)
+
+    def resumen(self) -> dict:
+        ahorrados = self.tokens_originales - self.tokens_enviados
+        return {
+            "turnos": self.turnos,
+            "tokens_originales": self.tokens_originales,
+            "tokens_enviados": self.tokens_enviados,
+            "tokens_ahorrados": ahorrados,
+            "ahorro": ahorrados / self.tokens_originales if self.tokens_originales else 0.0,
+        }
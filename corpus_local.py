@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Búsqueda BM25 local sobre las páginas que ya se descargaron con fetch_url.
+
+En ejemplo6 cada subtarea del Executor vuelve a la búsqueda web aunque otra
+subtarea ya haya leído páginas que la responden (la misma universidad, el
+mismo plan de estudios). IndiceBM25 es un índice invertido en memoria que se
+actualiza con cada página que llega: por término, arreglos de documentos y
+frecuencias (array de la librería estándar para agregar barato) y un arreglo
+numpy con el largo de cada documento. El aporte BM25 de cada término a cada
+documento se calcula con numpy la primera vez que se consulta y se guarda; se
+recalcula solo si el término recibió documentos nuevos o si N o el largo
+promedio cambiaron más de un 1 %. Una consulta es entonces una suma por
+término (densa para los términos muy frecuentes) y una selección de los k
+mejores que solo ordena los documentos que superan una cota inferior.
+
+Las páginas se agregan también a un JSONL en disco, así que el índice se
+reconstruye al iniciar y acumula lo descargado en corridas anteriores. El
+archivo guarda a lo sumo las MAX_DOCUMENTOS URLs más recientes: al cargarlo se
+queda con la última versión de cada URL y lo reescribe si sobraban líneas, y en
+una corrida larga se compacta igual cuando llega al doble. Cargar el índice
+toma tiempo con un corpus grande: desde código async se llama con
+asyncio.to_thread (ver ejemplo6).
+"""
+import hashlib, json, math, os, re, threading, unicodedata
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cache_agentes import DIRECTORIO_CACHE
+
+K1 = 1.2
+B = 0.75
+CAPACIDAD_INICIAL = 1024
+# Cambio relativo de N o del largo promedio que obliga a recalcular los pesos guardados
+TOLERANCIA_ESTADISTICAS = 0.01
+# Términos presentes en al menos 1/FRACCION_DENSA de los documentos guardan pesos densos
+FRACCION_DENSA = 16
+LARGO_FRAGMENTO = 300
+# URLs (las más recientes) que se conservan en el JSONL
+MAX_DOCUMENTOS = 5000
+
+PALABRAS_VACIAS = set(
+    "a al como con cual cuales cuando de del donde el ella en entre era es esta este esto fue ha hay la las le "
+    "lo los mas me mi muy no o para pero por porque que quien se ser si sin sobre son su sus te tiene un una uno "
+    "y ya the of and or to in for on at by is are was be it this that with as from an".split()
+)
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Palabras en minúscula, sin tildes ni palabras vacías."""
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return [t for t in re.findall(r"\w+", texto) if t not in PALABRAS_VACIAS and len(t) > 1]
+
+
+@dataclass
+class Resultado:
+    url: str
+    puntaje: float
+    fragmento: str
+    otras_urls: List[str] = field(default_factory=list)   # copias del mismo texto
+
+
+class IndiceBM25:
+    """
+    Índice invertido incremental con ranking BM25. Una URL que se vuelve a
+    agregar reemplaza su documento anterior; un texto idéntico al de otra URL
+    (p. ej. un espejo que el almacén de páginas agrupó) no se indexa dos veces.
+    """
+
+    def __init__(self, ruta: Optional[str] = None, k1: float = K1, b: float = B,
+                 max_documentos: int = MAX_DOCUMENTOS):
+        self.k1 = k1
+        self.b = b
+        self.ruta = ruta
+        self.max_documentos = max_documentos
+        self._lock = threading.Lock()
+        self._terminos: Dict[str, Tuple[array, array]] = {}     # término -> (documentos, frecuencias)
+        self._pesos: Dict[str, Tuple[np.ndarray, np.ndarray, Tuple[int, float]]] = {}
+        self._largos = np.zeros(CAPACIDAD_INICIAL, dtype=np.float32)
+        self._vivos = np.zeros(CAPACIDAD_INICIAL, dtype=bool)
+        self._textos: List[str] = []
+        self._urls: List[List[str]] = []
+        self._por_url: Dict[str, int] = {}
+        self._por_contenido: Dict[str, int] = {}
+        self._total_largos = 0.0
+        self._lineas = 0        # líneas del JSONL, para saber cuándo compactarlo
+        self.documentos = 0
+        if ruta and os.path.exists(ruta):
+            self._cargar()
+
+    def __len__(self) -> int:
+        return self.documentos
+
+    def _cargar(self):
+        """Indexa la última versión de las max_documentos URLs más recientes del JSONL."""
+        ultimas: Dict[str, str] = {}
+        with open(self.ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:      # línea a medio escribir
+                    continue
+                self._lineas += 1
+                # Se saca y se vuelve a meter para que quede al final, como la más reciente
+                ultimas.pop(registro["url"], None)
+                ultimas[registro["url"]] = registro["texto"]
+        recientes = list(ultimas.items())[-self.max_documentos:]
+        for url, texto in recientes:
+            self._agregar(url, texto)
+        if self._lineas > len(recientes):
+            self._compactar(recientes)
+
+    def _compactar(self, registros: List[Tuple[str, str]]):
+        """Reescribe el JSONL solo con `registros` (url, texto). Llamar con self._lock o al construir."""
+        temporal = f"{self.ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            for url, texto in registros:
+                f.write(json.dumps({"url": url, "texto": texto}, ensure_ascii=False) + "\n")
+        os.replace(temporal, self.ruta)
+        self._lineas = len(registros)
+
+    def _reservar(self):
+        n = len(self._textos)
+        if n >= len(self._largos):
+            self._largos = np.concatenate([self._largos, np.zeros(len(self._largos), dtype=np.float32)])
+            self._vivos = np.concatenate([self._vivos, np.zeros(len(self._vivos), dtype=bool)])
+
+    def _retirar(self, doc: int):
+        self._vivos[doc] = False
+        self._total_largos -= float(self._largos[doc])
+        self.documentos -= 1
+
+    def _agregar(self, url: str, texto: str) -> bool:
+        contenido = hashlib.sha256(texto.encode("utf-8")).hexdigest()
+        anterior = self._por_url.get(url)
+        if anterior is not None and self._textos[anterior] == texto:
+            return False
+        if anterior is not None:
+            self._urls[anterior].remove(url)
+            if not self._urls[anterior]:
+                self._retirar(anterior)
+        copia = self._por_contenido.get(contenido)
+        if copia is not None and self._vivos[copia]:
+            self._urls[copia].append(url)
+            self._por_url[url] = copia
+            return False
+
+        self._reservar()
+        doc = len(self._textos)
+        tokens = tokenizar(texto)
+        frecuencias: Dict[str, int] = {}
+        for token in tokens:
+            frecuencias[token] = frecuencias.get(token, 0) + 1
+        for termino, tf in frecuencias.items():
+            if termino not in self._terminos:
+                self._terminos[termino] = (array("i"), array("f"))
+            docs, tfs = self._terminos[termino]
+            docs.append(doc)
+            tfs.append(tf)
+            self._pesos.pop(termino, None)
+        self._textos.append(texto)
+        self._urls.append([url])
+        self._largos[doc] = len(tokens)
+        self._vivos[doc] = True
+        self._por_url[url] = doc
+        self._por_contenido[contenido] = doc
+        self._total_largos += len(tokens)
+        self.documentos += 1
+        return True
+
+    def agregar(self, url: str, texto: str) -> bool:
+        """Indexa (o reindexa) el texto de `url`; devuelve True si agregó un documento nuevo."""
+        if not texto.strip():
+            return False
+        with self._lock:
+            if self._por_url.get(url) is not None and self._textos[self._por_url[url]] == texto:
+                return False
+            nuevo = self._agregar(url, texto)
+            if self.ruta:
+                os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                with open(self.ruta, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"url": url, "texto": texto}, ensure_ascii=False) + "\n")
+                self._lineas += 1
+                if self._lineas > 2 * self.max_documentos:
+                    vigentes = sorted(self._por_url.items(), key=lambda par: par[1])[-self.max_documentos:]
+                    self._compactar([(u, self._textos[doc]) for u, doc in vigentes])
+            return nuevo
+
+    def _pesos_termino(self, termino: str, promedio: float) -> Optional[Tuple[Optional[np.ndarray], np.ndarray]]:
+        """
+        (documentos, aporte BM25 del término a cada uno), desde el caché si sigue
+        vigente. Para términos muy frecuentes los pesos se guardan densos (uno por
+        documento, documentos=None): sumar un arreglo contiguo es mucho más barato
+        que una suma dispersa con índices.
+        """
+        guardado = self._pesos.get(termino)
+        if guardado is not None:
+            docs, pesos, (n, prom) = guardado
+            if (abs(self.documentos - n) <= TOLERANCIA_ESTADISTICAS * n
+                    and abs(promedio - prom) <= TOLERANCIA_ESTADISTICAS * prom):
+                return docs, pesos
+        if termino not in self._terminos:
+            return None
+        docs_arr, tfs_arr = self._terminos[termino]
+        docs = np.array(docs_arr, dtype=np.int32)
+        tfs = np.array(tfs_arr, dtype=np.float32)
+        df = len(docs)
+        idf = math.log(1 + (max(self.documentos - df, 0) + 0.5) / (df + 0.5))
+        normalizacion = self.k1 * (1 - self.b + self.b * self._largos[docs] / promedio)
+        pesos = (idf * tfs * (self.k1 + 1) / (tfs + normalizacion)).astype(np.float32)
+        if df * FRACCION_DENSA >= len(self._textos):
+            denso = np.zeros(len(self._textos), dtype=np.float32)
+            denso[docs] = pesos
+            docs, pesos = None, denso
+        self._pesos[termino] = (docs, pesos, (self.documentos, promedio))
+        return docs, pesos
+
+    def _puntuar(self, consulta: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Puntajes por documento y los documentos del término menos frecuente (None si todos son densos)."""
+        with self._lock:
+            n = len(self._textos)
+            puntajes = np.zeros(n, dtype=np.float32)
+            if not self.documentos:
+                return puntajes, None
+            promedio = self._total_largos / self.documentos or 1.0
+            raros = None
+            for termino in set(tokenizar(consulta)):
+                encontrado = self._pesos_termino(termino, promedio)
+                if encontrado is None:
+                    continue
+                docs, pesos = encontrado
+                if docs is None:
+                    puntajes[:len(pesos)] += pesos
+                else:
+                    puntajes[docs] += pesos
+                    if raros is None or len(docs) < len(raros):
+                        raros = docs
+            if self.documentos < n:
+                puntajes *= self._vivos[:n]
+            return puntajes, raros
+
+    def puntajes(self, consulta: str) -> np.ndarray:
+        """Puntaje BM25 de la consulta para cada documento (0 para los que no la contienen)."""
+        return self._puntuar(consulta)[0]
+
+    def buscar(self, consulta: str, k: int = 5) -> List[Tuple[int, float]]:
+        """(documento, puntaje) de los k mejores documentos, de mayor a menor."""
+        puntajes, raros = self._puntuar(consulta)
+        if raros is not None and len(raros) >= k:
+            # El k-ésimo mejor entre los documentos del término más raro es una cota
+            # inferior del k-ésimo global: solo se ordenan los que la alcanzan
+            cota = max(float(np.partition(puntajes[raros], -k)[-k]), float(np.finfo(np.float32).tiny))
+            candidatos = np.flatnonzero(puntajes >= cota)
+        elif len(puntajes) > 4 * k:
+            candidatos = np.argpartition(puntajes, -k)[-k:]
+            candidatos = candidatos[puntajes[candidatos] > 0]
+        else:
+            candidatos = np.flatnonzero(puntajes)
+        if len(candidatos) > k:
+            candidatos = candidatos[np.argpartition(puntajes[candidatos], -k)[-k:]]
+        candidatos = candidatos[np.argsort(-puntajes[candidatos], kind="stable")]
+        return [(int(doc), float(puntajes[doc])) for doc in candidatos]
+
+    def fragmento(self, doc: int, consulta: str, largo: int = LARGO_FRAGMENTO) -> str:
+        """Ventana del texto con más términos de la consulta."""
+        texto = self._textos[doc]
+        if len(texto) <= largo:
+            return texto
+        terminos = set(tokenizar(consulta))
+        paso = largo // 2
+        inicio = max(range(0, len(texto) - paso, paso),
+                     key=lambda i: sum(t in terminos for t in tokenizar(texto[i:i + largo])))
+        return ("…" if inicio else "") + texto[inicio:inicio + largo].strip() + "…"
+
+    def consultar(self, consulta: str, k: int = 5) -> List[Resultado]:
+        resultados = []
+        for doc, puntaje in self.buscar(consulta, k):
+            url, *otras = self._urls[doc]
+            resultados.append(Resultado(url, puntaje, self.fragmento(doc, consulta), otras))
+        return resultados
+
+
+_corpus: Optional[IndiceBM25] = None
+_lock_corpus = threading.Lock()
+
+
+def corpus_local() -> IndiceBM25:
+    """
+    Índice de las páginas descargadas, compartido por el proceso y persistido
+    en .cache/corpus. La primera llamada lee el JSONL: desde un event loop,
+    usar asyncio.to_thread(corpus_local).
+    """
+    global _corpus
+    with _lock_corpus:
+        if _corpus is None:
+            _corpus = IndiceBM25(os.path.join(DIRECTORIO_CACHE, "corpus", "paginas.jsonl"))
+        return _corpus
@@ -5,82 +5,17 @@ from dotenv import load_dotenv
 from typing import List, Tuple, Any
 from pydantic import BaseModel, Field, ValidationError
 load_dotenv() #Carga de la clave de acceso de OpenAI
+from telemetria import configurar as configurar_telemetria, instrumentar
+configurar_telemetria("ejemplo1")
+from casete import activar as activar_casete
+activar_casete()
 import json, re
-class JsonExtractionError(Exception):
-    pass
-
-def extract_json_obj(text: str) -> Tuple[Any, str]:
-    """
-    Extrae SOLO el objeto JSON de una respuesta que puede incluir un bloque
-    ```json ... ``` y/o texto adicional. Devuelve:
-      - obj: el objeto Python parseado (dict/list)
-      - raw: el string JSON exacto extraído
-
-    Estrategia:
-      1) Si hay bloque ```json ... ```, usa su contenido.
-      2) Si no, busca el PRIMER objeto JSON balanceado recorriendo { ... }.
-      3) Intenta json.loads; si falla, lanza JsonExtractionError con pista.
-    """
-    if not isinstance(text, str):
-        raise TypeError("text debe ser str")
-
-    # 1) Intentar con bloque ```json ... ```
-    fence = re.search(r"```(?:json)?\s*(.*?)\s*```", text, flags=re.DOTALL | re.IGNORECASE)
-    candidate = None
-    if fence:
-        candidate = fence.group(1).strip()
-
-    # 2) Si no hay bloque, buscar primer objeto JSON balanceado
-    if candidate is None:
-        # Buscar primer '{'
-        start = text.find("{")
-        if start == -1:
-            raise JsonExtractionError("No se encontró ninguna llave '{' en el texto.")
-        # Recorrer contando llaves y respetando strings/escapes
-        i = start
-        depth = 0
-        in_string = False
-        escape = False
-        end = None
-        while i < len(text):
-            ch = text[i]
-            if in_string:
-                if escape:
-                    escape = False
-                elif ch == "\\":
-                    escape = True
-                elif ch == '"':
-                    in_string = False
-            else:
-                if ch == '"':
-                    in_string = True
-                elif ch == "{":
-                    depth += 1
-                elif ch == "}":
-                    depth -= 1
-                    if depth == 0:
-                        end = i
-                        break
-            i += 1
-
-        if end is None:
-            raise JsonExtractionError("No se encontró un objeto JSON balanceado (faltan llaves de cierre).")
-        candidate = text[start:end+1].strip()
-
-    # 3) Parsear JSON estrictamente
-    try:
-        obj = json.loads(candidate)
-        return obj, candidate
-    except json.JSONDecodeError as e:
-        # Pista útil para depurar
-        context = candidate[max(0, e.pos-60): e.pos+60]
-        msg = (
-            f"Error al parsear JSON: {e}\n"
-            f"Contexto cercano a la posición {e.pos}:\n---\n{context}\n---"
-        )
-        raise JsonExtractionError(msg)
-
-
+from json_utils import JsonExtractionError, ExtractorJsonIncremental, extract_json_obj
+from plazo import PLAZO_EXCEDIDO, PlazoExcedido, con_plazo, esperar
+from cascada import Etapa, EstadisticasCascada, ejecutar_cascada
+from enrutador import EnrutadorModelos
+from cache_agentes import CacheRespuestas, ejecutar_con_cache
+import os
 
 class Respuesta_marcas(BaseModel):
     anio_separacion: str = Field(..., description="Año de la separación")
@@ -90,6 +25,7 @@ class Respuesta_marcas(BaseModel):
 
 # Función para validar la respuesta y determinar si está completa o no
 #@function_tool
+@instrumentar("validacion")
 def validar(info: dict) -> bool:
    #print(type(info))
    #print(info.keys())
@@ -112,6 +48,33 @@ def validar(info: dict) -> bool:
    except Exception as e:
        print('Ocurrió una excepción en la validación: ',e)
        return False
+
+# Validación de un solo campo, para poder descartar una respuesta en streaming
+# apenas llega un campo vacío, sin esperar a que el agente termine de generar.
+def validar_campo(clave: str, valor: Any) -> bool:
+   try:
+    if clave == 'marcas_resultantes':
+       return len(valor)>0 and all(len(d2['marca'])>0 and len(d2['dueños'])>0 for d2 in valor)
+    return len(valor)>0
+   except Exception:
+       return False
+
+# Ejecuta un agente en modo streaming y valida cada campo del JSON en cuanto se cierra.
+# Devuelve el diccionario si la respuesta completa es válida, o None si se descartó.
+async def intento_streaming(agente: Agent, pregunta: str):
+    resultado = Runner.run_streamed(agente, pregunta)
+    extractor = ExtractorJsonIncremental()
+    try:
+        async for clave, valor in extractor.consumir_streaming(resultado):
+            if not validar_campo(clave, valor):
+                print(f"Campo '{clave}' incompleto, se cancela la generación del agente")
+                return None
+    except JsonExtractionError as e:
+        print('No se pudo extraer el JSON en streaming: ', e)
+        return None
+    finally:
+        resultado.cancel()
+    return extractor.objeto if validar(extractor.objeto) else None
 # Creamos un agente básico que trata de responder la pregunta. 
 agente1 = Agent(
    name="Buscador de noticias",
@@ -177,36 +140,67 @@ agente3 = Agent(
        #max_tokens=1024,  # Maximum length of response
    ),
 )
-async def main():
+# Una respuesta solo queda en el caché si trae un JSON válido: si no, el
+# reintento volvería a recibir la misma respuesta inválida
+def respuesta_valida(final_output: str) -> bool:
     try:
-        result = await asyncio.wait_for(
-            Runner.run(agente1, "Dime por qué se separó el supermercado la vaquita en la vaquita y supermu"),
-            timeout=30)
-        #print("Resultado de la primera consulta: ",result.final_output)
-        data_json, tmp=extract_json_obj(result.final_output)
-        #print(data_json.keys())
-        validacion=validar(data_json)
-        print('Validación primera respuesta: ', validacion)
-        if(not(validacion)):
-            print("No fue una respuesta completa, se pasa a un segundo agente")
-            result2 = await asyncio.wait_for(
-                Runner.run(agente2, "Dime por qué se separó el supermercado la vaquita en la vaquita y supermu"),
-                timeout=30)
-            #print("Resultado de la segunda consulta: ",result2.final_output)
-            json_data, candidate=extract_json_obj(result2.final_output)
-            print(json_data)
-            validacion=validar(json_data)
-            print('Validación segunda respuesta: ', validacion)
+        return validar(extract_json_obj(final_output)[0])
+    except JsonExtractionError:
+        return False
+
+# Ejecuta el agente con la respuesta completa y la valida al final
+async def intento_completo(agente: Agent, pregunta: str):
+    final_output = await ejecutar_con_cache(agente, pregunta, cache, guardar_si=respuesta_valida)
+    json_data, candidate=extract_json_obj(final_output)
+    print(json_data)
+    return json_data if validar(json_data) else None
+
+# Segundos que se espera al primer agente antes de lanzar el segundo en paralelo
+RETARDO_COBERTURA = 10
+# Segundos para toda la solicitud (cascada + reporte)
+PLAZO_TOTAL = 60
+estadisticas = EstadisticasCascada()
+# Caché opcional de respuestas (los agentes son determinísticos): AGENTES_CACHE=1
+cache = CacheRespuestas() if os.getenv("AGENTES_CACHE") else None
+# Enrutador opcional que aprende cuándo saltar agente1 (AGENTES_ENRUTADOR=1)
+enrutador = EnrutadorModelos() if os.getenv("AGENTES_ENRUTADOR") else None
 
-            if(validacion):
-                result3 = await asyncio.wait_for(
-                    Runner.run(agente3, json.dumps(json_data, ensure_ascii=False, indent=2)),
-                    timeout=30)
+async def main():
+    pregunta = "Dime por qué se separó el supermercado la vaquita en la vaquita y supermu"
+    resultado = None
+    # Un solo plazo para toda la solicitud: cada etapa de la cascada, el reporte y
+    # las herramientas que usen reciben solo lo que quede de él
+    with con_plazo(PLAZO_TOTAL):
+        try:
+            # El primer agente se valida campo a campo mientras genera; si no responde a
+            # tiempo o su respuesta es incompleta, el segundo agente entra a competir.
+            resultado = await ejecutar_cascada([
+                Etapa("agente1", lambda: intento_streaming(agente1, pregunta)),
+                Etapa("agente2", lambda: intento_completo(agente2, pregunta)),
+            ], retardo_cobertura=RETARDO_COBERTURA, estadisticas=estadisticas,
+               enrutador=enrutador, consulta=pregunta)
+            if resultado.estado == PLAZO_EXCEDIDO:
+                print(f"Plazo de {PLAZO_TOTAL}s excedido tras {resultado.latencia:.1f}s; "
+                      f"respuesta parcial: {resultado.parcial}")
+            else:
+                print(f"Respuesta de '{resultado.etapa}' en {resultado.latencia:.1f}s (ahorro estimado {resultado.ahorro:.1f}s)")
+
+            if(resultado.valor is not None):
+                result3 = await esperar(Runner.run(agente3, json.dumps(resultado.valor, ensure_ascii=False, indent=2)), 30)
                 print('-------------------------------')
                 print(result3.final_output)
-    except Exception as e:
-        print('Ocurrió un error :',e)
-    
+        except PlazoExcedido:
+            # La respuesta validada (si la hubo) se entrega aunque no alcance el reporte
+            print(f'Plazo de {PLAZO_TOTAL}s excedido antes del reporte; respuesta: ',
+                  resultado.valor if resultado is not None else None)
+        except Exception as e:
+            print('Ocurrió un error :',e)
+    print('Estadísticas de la cascada: ', estadisticas.resumen())
+    if cache is not None:
+        print('Estadísticas del caché: ', cache.estadisticas())
+    if enrutador is not None:
+        print('Estadísticas del enrutador: ', enrutador.resumen())
+
     # Function calls itself,
     # Looping in smaller pieces,
     # Endless by design.
@@ -9,7 +9,18 @@ from dotenv import load_dotenv
 from typing import List, Tuple, Any
 from pydantic import BaseModel, Field, ValidationError
 load_dotenv() #Carga de la clave de acceso de OpenAI
+from telemetria import configurar as configurar_telemetria, instrumentar
+configurar_telemetria("ejemplo2")
+from casete import activar as activar_casete
+activar_casete()
 import json, re
+from plazo import PLAZO_EXCEDIDO, PlazoExcedido, con_plazo, esperar
+from cascada import Etapa, EstadisticasCascada, Rechazo, ejecutar_cascada
+from relleno import rellenar
+from enrutador import EnrutadorModelos
+from cache_agentes import CacheRespuestas, ejecutar_con_cache
+from cache_semantico import CacheSemantico
+import os
 
 class Respuesta_marcas(BaseModel):
     anio_separacion: str = Field(..., description="Año de la separación")
@@ -19,6 +30,7 @@ class Respuesta_marcas(BaseModel):
 
 # Función para validar la respuesta y determinar si está completa o no
 #@function_tool
+@instrumentar("validacion")
 def validar(info: Respuesta_marcas) -> bool:
     try:
         flag_anio=len(info.anio_separacion)>0 
@@ -102,37 +114,82 @@ agente3 = Agent(
    ),
    output_type=str
 )
+# Ejecuta un agente con salida tipada y devuelve la respuesta solo si es válida;
+# si no lo es, la devuelve como Rechazo para que la siguiente etapa la complete
+async def intento(agente: Agent, pregunta: str):
+    # Una respuesta rechazada no se guarda: el reintento vuelve a preguntar al modelo
+    final_output = await ejecutar_con_cache(agente, pregunta, cache, semantico, guardar_si=validar)
+    assert isinstance(final_output, Respuesta_marcas)
+    return final_output if validar(final_output) else Rechazo(final_output)
+
+# Con una respuesta parcial rechazada, le pide al agente solo los campos vacíos
+async def intento_relleno(agente: Agent, pregunta: str, parcial: Respuesta_marcas = None):
+    if parcial is None:
+        return await intento(agente, pregunta)
+    completa = await rellenar(agente, pregunta, parcial, cache)
+    return completa if validar(completa) else Rechazo(completa)
+
+# Segundos que se espera al primer agente antes de lanzar el segundo en paralelo
+RETARDO_COBERTURA = 10
+# Segundos para toda la solicitud (cascada + reporte)
+PLAZO_TOTAL = 60
+estadisticas = EstadisticasCascada()
+# True: si agente1 deja campos vacíos, agente2 solo completa esos campos
+RELLENAR_CAMPOS = True
+# Caché opcional de respuestas (los agentes son determinísticos): AGENTES_CACHE=1
+cache = CacheRespuestas() if os.getenv("AGENTES_CACHE") else None
+# Caché semántico opcional (preguntas equivalentes con otras palabras): AGENTES_CACHE_SEMANTICO=1
+semantico = CacheSemantico() if os.getenv("AGENTES_CACHE_SEMANTICO") else None
+# Enrutador opcional que aprende cuándo saltar agente1 (AGENTES_ENRUTADOR=1)
+enrutador = EnrutadorModelos() if os.getenv("AGENTES_ENRUTADOR") else None
+
+# Cascada agente1 -> agente2 con escalamiento cubierto para una pregunta
+async def cascada_marcas(pregunta: str, estadisticas: EstadisticasCascada = estadisticas,
+                         retardo_cobertura: float = RETARDO_COBERTURA,
+                         enrutador: EnrutadorModelos = enrutador):
+    return await ejecutar_cascada([
+        Etapa("agente1", lambda: intento(agente1, pregunta)),
+        Etapa("agente2", lambda parcial=None: intento_relleno(agente2, pregunta, parcial),
+              con_parcial=RELLENAR_CAMPOS),
+    ], retardo_cobertura=retardo_cobertura, estadisticas=estadisticas,
+       enrutador=enrutador, consulta=pregunta)
+
 async def main():
-    try:
-        result = await asyncio.wait_for(
-            Runner.run(agente1, "Dime por qué se separó el supermercado la vaquita en la vaquita y supermu"),
-            timeout=30)
-        #print("Resultado de la primera consulta: ",result.final_output)
-        assert isinstance(result.final_output, Respuesta_marcas)
-        valido=validar(result.final_output)
-        
-        if(not(valido)):
-            print("No fue una respuesta completa, se pasa a un segundo agente")
-            result2 = await asyncio.wait_for(
-                Runner.run(agente2, "Dime por qué se separó el supermercado la vaquita en la vaquita y supermu"),
-                timeout=30)
-            #print("Resultado de la segunda consulta: ",result2.final_output)
-            assert isinstance(result2.final_output, Respuesta_marcas)
-            valido2=validar(result2.final_output)
-        
-            if(valido2):
-                result3 = await asyncio.wait_for(
-                    Runner.run(agente3, json.dumps(result2.final_output, ensure_ascii=False, indent=2)),
-                    timeout=30)
+    pregunta = "Dime por qué se separó el supermercado la vaquita en la vaquita y supermu"
+    resultado = None
+    # Un solo plazo para toda la solicitud: cada etapa de la cascada, el reporte y
+    # las herramientas que usen reciben solo lo que quede de él
+    with con_plazo(PLAZO_TOTAL):
+        try:
+            resultado = await cascada_marcas(pregunta)
+            if resultado.estado == PLAZO_EXCEDIDO:
+                print(f"Plazo de {PLAZO_TOTAL}s excedido tras {resultado.latencia:.1f}s; "
+                      f"respuesta parcial: {resultado.parcial}")
+            else:
+                print(f"Respuesta de '{resultado.etapa}' en {resultado.latencia:.1f}s (ahorro estimado {resultado.ahorro:.1f}s)")
+
+            if(resultado.valor is not None):
+                result3 = await esperar(Runner.run(agente3, json.dumps(resultado.valor.model_dump(), ensure_ascii=False, indent=2)), 30)
                 print('-------------------------------')
                 print(result3.final_output)
-                
-    except Exception as e:
-        print('Ocurrió un error :',e)
-    
+        except PlazoExcedido:
+            # La respuesta validada (si la hubo) se entrega aunque no alcance el reporte
+            print(f'Plazo de {PLAZO_TOTAL}s excedido antes del reporte; respuesta: ',
+                  resultado.valor if resultado is not None else None)
+        except Exception as e:
+            print('Ocurrió un error :',e)
+    print('Estadísticas de la cascada: ', estadisticas.resumen())
+    if cache is not None:
+        print('Estadísticas del caché: ', cache.estadisticas())
+    if semantico is not None:
+        print('Estadísticas del caché semántico: ', semantico.estadisticas())
+    if enrutador is not None:
+        print('Estadísticas del enrutador: ', enrutador.resumen())
+
     # Function calls itself,
     # Looping in smaller pieces,
     # Endless by design.
 
-asyncio.run(main())
+if __name__ == "__main__":
+    asyncio.run(main())
 
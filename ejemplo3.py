@@ -3,8 +3,13 @@ import asyncio
 from pydantic import BaseModel
 
 from agents import Agent, Runner, trace
+from pipeline import Compuerta, Paso, Pipeline
 from dotenv import load_dotenv
 load_dotenv() #Carga de la clave de acceso de OpenAI
+from telemetria import configurar as configurar_telemetria
+configurar_telemetria("ejemplo3")
+from casete import activar as activar_casete
+activar_casete()
 """
 Ejemplo de otros agentes que operan de manera determinística, mostrando tres pasos que al ser correcto
 el resultado de un paso intermedio, puede pasar al siguiente. 
@@ -34,42 +39,42 @@ story_agent = Agent(
 )
 
 
+# El mismo flujo como pipeline declarativo: pasos (agentes) y compuertas sobre la salida tipada
+story_pipeline = Pipeline([
+    # 1. Generate an outline
+    Paso("outline", story_outline_agent),
+    # 2. Check the outline
+    Paso("check", outline_checker_agent, depende_de=["outline"]),
+    # 3. Gates to stop if the outline is not good quality or not a scifi story
+    Compuerta("good_quality", "check", lambda out: out.good_quality,
+              "Outline is not good quality, so we stop here.", tipo=OutlineCheckerOutput),
+    Compuerta("is_scifi", "check", lambda out: out.is_scifi,
+              "Outline is not a scifi story, so we stop here.", tipo=OutlineCheckerOutput),
+    # 4. Write the story
+    Paso("story", story_agent, depende_de=["outline", "good_quality", "is_scifi"]),
+])
+
+
 async def main():
     input_prompt = input("What kind of story do you want? ")
 
     # Ensure the entire workflow is a single trace
     with trace("Deterministic story flow"):
-        # 1. Generate an outline
-        outline_result = await Runner.run(
-            story_outline_agent,
-            input_prompt,
-        )
-        print("Outline generated:", outline_result.final_output)
-
-        # 2. Check the outline
-        outline_checker_result = await Runner.run(
-            outline_checker_agent,
-            outline_result.final_output,
-        )
-        print(outline_checker_result.final_output)
-        # 3. Add a gate to stop if th.e outline is not good quality or not a scifi story
-        assert isinstance(outline_checker_result.final_output, OutlineCheckerOutput)
-        if not outline_checker_result.final_output.good_quality:
-            print("Outline is not good quality, so we stop here.")
-            exit(0)
-
-        if not outline_checker_result.final_output.is_scifi:
-            print("Outline is not a scifi story, so we stop here.")
-            exit(0)
-
+        result = await story_pipeline.ejecutar(input_prompt)
+
+    if "outline" in result.salidas:
+        print("Outline generated:", result.salidas["outline"])
+    if "check" in result.salidas:
+        print(result.salidas["check"])
+    if result.errores:
+        print("Errors:", result.errores)
+    if result.detenido_por:
+        print(result.detenido_por)
+        return
+
+    if result.completo:
         print("Outline is good quality and a scifi story, so we continue to write the story.")
-
-        # 4. Write the story
-        story_result = await Runner.run(
-            story_agent,
-            outline_result.final_output,
-        )
-        print(f"Story: {story_result.final_output}")
+        print(f"Story: {result.salidas['story']}")
 
 
 if __name__ == "__main__":
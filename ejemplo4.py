@@ -2,8 +2,17 @@ import asyncio
 
 from agents import Agent, ItemHelpers, Runner, trace, WebSearchTool, ModelSettings
 
+import os
+
+from cache_agentes import ejecutar_con_cache
+from cache_semantico import CacheSemantico
+from concurrencia import as_map_tool, instalar_runner
 from dotenv import load_dotenv
 load_dotenv()
+from telemetria import configurar as configurar_telemetria
+configurar_telemetria("ejemplo4")
+from casete import activar as activar_casete
+activar_casete()
 """
 Este modelo implementa la arquitectura de agentes determinísticos y secuenciales, pero permite
 definir dentro de un agente, otro agente que desarrolla tareas para él. En este caso, la arquitectura
@@ -29,12 +38,15 @@ buscador_programa = Agent(
 arquitecto_de_busqueda = Agent(
     name="Agente buscador de diferentes programas",
     instructions=("Tu recibes una entrada que menciona varios programas académicos."
-                  "Primero identifica cada uno de los programas y llama a la herramienta buscador_programa, "
-                  "Haciendo que cada programa sea buscado por dicha herramienta. Al final espera todas las respuestas "
-                  "y genera un reporte final con el texto detallado de cada programa") ,
-    tools=[buscador_programa.as_tool(
-            tool_name="BuscadorPrograma",
-            tool_description="Busca un programa en la web para completar su información",
+                  "Primero identifica cada uno de los programas y llama UNA sola vez a la herramienta BuscadorProgramas "
+                  "con la lista completa, un elemento por programa (nombre, nivel y universidad). La herramienta busca "
+                  "todos los programas en paralelo y devuelve una respuesta por programa, en el mismo orden. "
+                  "Con esas respuestas genera un reporte final con el texto detallado de cada programa") ,
+    tools=[as_map_tool(
+            buscador_programa,
+            tool_name="BuscadorProgramas",
+            tool_description="Busca en la web una lista de programas, en paralelo, para completar la información de cada uno",
+            max_concurrency=8,
         ),],
     model="gpt-4.1",
     model_settings=ModelSettings(
@@ -60,18 +72,27 @@ maestro = Agent(
    output_type=str
 )
 
+# Caché semántico opcional para el maestro: el mismo programa descrito con otras palabras (AGENTES_CACHE_SEMANTICO=1)
+semantico = CacheSemantico() if os.getenv("AGENTES_CACHE_SEMANTICO") else None
+
 async def main():
+    instalar_runner()
     input_prompt = input("Escriba el nombre del programa, su nivel académico y una breve descripción del mismo:")
 
-    resultado_maestro = await Runner.run(
+    resultado_maestro = await ejecutar_con_cache(
             maestro,
             input_prompt,
+            semantico=semantico,
         )
-    resultado_busqueda= await Runner.run(
+    # Sin caché semántico: dos listados casi iguales (un programa de más o de
+    # menos) darían el reporte del otro
+    resultado_busqueda= await ejecutar_con_cache(
         arquitecto_de_busqueda, 
-        resultado_maestro.final_output
+        resultado_maestro,
     )
-    print("Resultado final:", resultado_busqueda.final_output)
+    print("Resultado final:", resultado_busqueda)
+    if semantico is not None:
+        print("Estadísticas del caché semántico:", semantico.estadisticas())
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,10 +1,14 @@
 # react_agent_example.py
-from agents import Agent, Runner, WebSearchTool, function_tool
-import requests
-from bs4 import BeautifulSoup
+from agents import Agent, RunConfig, Runner, WebSearchTool, function_tool
+from web_fetch import fetch_text
+from contexto import CompactadorContexto
 
 from dotenv import load_dotenv
 load_dotenv()
+from telemetria import configurar as configurar_telemetria
+configurar_telemetria("ejemplo5")
+from casete import activar as activar_casete
+activar_casete()
 
 """
 Modelo que implementa la arquitectura react con una cadena de pensamientos. Se define dentro de un 
@@ -12,12 +16,8 @@ agente la manera como debe operar durante su evolución hasta que obtiene una re
 """
 
 @function_tool
-def fetch_url(url: str, max_chars: int = 3000) -> str:
-    resp = requests.get(url, timeout=15)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-    text = soup.get_text(separator="\n", strip=True)
-    return text[:max_chars]
+async def fetch_url(url: str, max_chars: int = 3000) -> str:
+    return await fetch_text(url, max_chars=max_chars, timeout=15)
 
 # --- Instrucciones estilo ReAct ---
 #El modelo react no es una clase especial, simplemente corresponde a unas instrucciones que hacen 
@@ -49,6 +49,10 @@ agent = Agent(
     ],
 )
 
+# Compactación del contexto: observaciones textuales que se conservan y tope de tokens por turno
+ULTIMAS_OBSERVACIONES = 2
+PRESUPUESTO_TOKENS = 6000
+
 if __name__ == "__main__":
     # Ejemplo sencillo de tarea (cámbialo por lo que necesites):
     prompt = (
@@ -58,10 +62,12 @@ if __name__ == "__main__":
     )
 
     # Ejecuta el bucle ReAct (la SDK itera Thought→Action→Observation hasta finalizar)
-    result = Runner.run_sync(agent, prompt) #este comando evita tener que llamar a una función async
+    compactador = CompactadorContexto(ultimas=ULTIMAS_OBSERVACIONES, presupuesto=PRESUPUESTO_TOKENS)
+    result = Runner.run_sync(agent, prompt, run_config=RunConfig(call_model_input_filter=compactador)) #este comando evita tener que llamar a una función async
     #internamente crea el loop y llama al agente dentro de ella. 
     # result.final_output contiene el 'Final: ...' del agente
     print('Resultado final del agente:','\n',result.final_output)
+    print('Compactación del contexto: ', compactador.resumen())
 
     # (Opcional) También puedes inspeccionar los pasos intermedios:
     
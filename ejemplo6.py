@@ -2,25 +2,45 @@
 from agents import Agent, Runner, WebSearchTool, function_tool
 from pydantic import BaseModel, Field
 from typing import List, Optional
-import requests
-from bs4 import BeautifulSoup
+from web_fetch import fetch_text
+from corpus_local import corpus_local
+from concurrencia import config_activa, ejecutar_acotado, instalar_runner, resumen_tiempos
 from dotenv import load_dotenv
 import asyncio
 
 load_dotenv()
+from telemetria import configurar as configurar_telemetria
+configurar_telemetria("ejemplo6")
+from casete import activar as activar_casete
+activar_casete()
 # ----------------------------
 # Tools del EXECUTOR
 # ----------------------------
 @function_tool
-def fetch_url(url: str, max_chars: int = 4000) -> str:
+async def fetch_url(url: str, max_chars: int = 4000) -> str:
     """
     Descarga una página y retorna texto visible (recortado).
     """
-    resp = requests.get(url, timeout=20)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-    text = soup.get_text(separator="\n", strip=True)
-    return text[:max_chars]
+    texto = await fetch_text(url, max_chars=max_chars, timeout=20)
+    # Cada página leída queda disponible para search_local_corpus. El índice se
+    # carga y se actualiza en un hilo, fuera del event loop de los executors
+    await asyncio.to_thread(lambda: corpus_local().agregar(url, texto))
+    return texto
+
+@function_tool
+async def search_local_corpus(query: str, k: int = 5) -> str:
+    """
+    Busca (BM25) en las páginas que ya se descargaron con fetch_url, en esta
+    corrida o en anteriores. Retorna URL, puntaje y un fragmento por resultado.
+    """
+    resultados = await asyncio.to_thread(lambda: corpus_local().consultar(query, k))
+    if not resultados:
+        return "Sin resultados en el corpus local; usa la búsqueda web."
+    partes = []
+    for i, r in enumerate(resultados, 1):
+        copias = f" (también en: {', '.join(r.otras_urls)})" if r.otras_urls else ""
+        partes.append(f"[{i}] {r.url}{copias} — puntaje {r.puntaje:.2f}\n{r.fragmento}")
+    return "\n\n".join(partes)
 
 # ----------------------------
 # EXECUTOR AGENT
@@ -28,7 +48,9 @@ def fetch_url(url: str, max_chars: int = 4000) -> str:
 EXECUTOR_INSTRUCTIONS = """
 Eres un EXECUTOR. Tu trabajo es resolver subtareas CONCRETAS que te delega un Planner.
 Sigue este patrón simple de verificación:
-- Si necesitas fuentes, usa primero la herramienta de búsqueda web para localizar URLs confiables.
+- Antes de ir a la web, usa search_local_corpus: contiene las páginas que ya se descargaron para otras subtareas.
+  Si un resultado responde la subtarea, cítalo y no repitas la búsqueda.
+- Si necesitas más fuentes, usa la herramienta de búsqueda web para localizar URLs confiables.
 - Luego, usa fetch_url para extraer el contenido clave y verificar.
 - Devuelve SIEMPRE una respuesta breve, precisa y con 1–3 URLs como evidencia.
 No inventes datos. Si hay incertidumbre, dilo explícitamente.
@@ -40,7 +62,7 @@ Formato de salida recomendado (texto):
 executor = Agent(
     name="Executor",
     instructions=EXECUTOR_INSTRUCTIONS,
-    tools=[WebSearchTool(), fetch_url],
+    tools=[search_local_corpus, WebSearchTool(), fetch_url],
 )
 
 # ----------------------------
@@ -54,6 +76,29 @@ async def delegate_to_executor(subtask: str) -> str:
     res = await Runner.run(starting_agent=executor, input=subtask)
     return res.final_output
 
+# Máximo de EXECUTORS corriendo al tiempo en el modo por lotes
+MAX_EXECUTORS_CONCURRENTES = 4
+
+@function_tool
+async def delegate_batch_to_executor(subtasks: List[str]) -> str:
+    """
+    Ejecuta TODAS las subtareas con el EXECUTOR en paralelo (concurrencia acotada)
+    y devuelve sus salidas en el orden en que fueron terminando, con sus tiempos.
+    """
+    config = config_activa()
+    fabricas = [lambda s=s: Runner.run(starting_agent=executor, input=s, run_config=config) for s in subtasks]
+    partes, tiempos = [], []
+    async for i, res, tiempo in ejecutar_acotado(fabricas, MAX_EXECUTORS_CONCURRENTES, subtasks):
+        tiempos.append(tiempo)
+        salida = f"Error: {tiempo.error}" if tiempo.error else res.final_output
+        print(f"[executor] subtarea {i + 1}/{len(subtasks)} lista en {tiempo.duracion:.1f}s "
+              f"(esperó {tiempo.espera:.1f}s): {subtasks[i][:60]}")
+        partes.append(f"### Subtarea {i + 1}: {subtasks[i]}\n{salida}")
+    resumen = resumen_tiempos(tiempos)
+    print(f"[executor] lote en {resumen['pared']:.1f}s (secuencial {resumen['suma']:.1f}s), "
+          f"ruta crítica: {resumen['ruta_critica']}")
+    return "\n\n".join(partes)
+
 # ----------------------------
 # MODELO PARA PARSEAR EL INFORME FINAL (opcional)
 # ----------------------------
@@ -90,7 +135,24 @@ Reglas:
   Action: delegate_to_executor{"subtask": "..."}
   Observation: captura el resumen devuelto por el EXECUTOR.
 - Tras cubrir suficientes resultados (≥6 programas únicos o ≥2 por nivel geográfico), sintetiza.
+"""
 
+PLANNER_BATCH_INSTRUCTIONS = """
+Eres un PLANNER. Tu objetivo es:
+1) Descomponer la solicitud del usuario en subtareas claras e independientes.
+2) Delegar TODAS las subtareas de una sola vez al EXECUTOR usando la herramienta delegate_batch_to_executor,
+   que las ejecuta en paralelo.
+3) Integrar la información en un informe final estructurado, con cobertura local, nacional e internacional.
+
+Reglas:
+- Define 4–8 subtareas que cubran: búsqueda local, nacional e internacional; syllabus/plan de estudios; costo (tuition/fees); ingreso/cupos (intake/enrollment); y tendencias del nombre del programa.
+- Thought: explica brevemente el plan completo.
+  Action: delegate_batch_to_executor{"subtasks": ["...", "...", ...]}
+  Observation: revisa las salidas de cada subtarea.
+- Si la cobertura no es suficiente (≥6 programas únicos o ≥2 por nivel geográfico), envía un segundo lote solo con lo que falta; luego sintetiza.
+"""
+
+SALIDA_PLANNER = """
 Salida final:
 Devuelve un JSON que cumpla EXACTAMENTE este esquema (usa lenguaje claro):
 {
@@ -121,12 +183,23 @@ Notas:
 
 planner = Agent(
     name="Planner",
-    instructions=PLANNER_INSTRUCTIONS,
+    instructions=PLANNER_INSTRUCTIONS + SALIDA_PLANNER,
     tools=[delegate_to_executor],  # El Planner solo puede delegar (no busca directo)
 )
 
+# Variante que envía el lote completo de subtareas y las ejecuta en paralelo
+planner_batch = Agent(
+    name="Planner",
+    instructions=PLANNER_BATCH_INSTRUCTIONS + SALIDA_PLANNER,
+    tools=[delegate_batch_to_executor],
+)
+
+# True: el Planner delega las subtareas en lote (paralelo); False: una por una
+MODO_PARALELO = True
+
 
 async def main():
+    instalar_runner()
     user_program = "Ingeniería en ciencia de Datos"
     user_desc = "Programa orientado a analítica, ingeniería de datos e inteligencia artificial."
 
@@ -144,7 +217,7 @@ Devuélveme el JSON final con el esquema indicado.
 """
 
     # Ejecuta Planner/Executor (el Planner delega internamente al Executor)
-    result = await Runner.run(starting_agent=planner, input=prompt)
+    result = await Runner.run(starting_agent=planner_batch if MODO_PARALELO else planner, input=prompt)
 
     # Texto final (debería ser JSON)
     print("\n=== FINAL (JSON) ===")
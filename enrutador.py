@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Enrutador aprendido para la cascada de agentes.
+
+En ejemplo1/ejemplo2 la cascada siempre prueba primero el agente barato
+(gpt-4.1-nano sin herramientas). Para preguntas que necesitan datos frescos de
+la web ese intento falla la validación una y otra vez y solo suma latencia.
+El enrutador agrupa las preguntas en clases (por rasgos simples del texto),
+registra por clase cuántas veces la etapa barata pasó o no la validación, su
+latencia y su costo, y predice la probabilidad de éxito con un prior de
+Laplace. Si la probabilidad queda bajo el umbral (y hay suficientes
+observaciones), la cascada arranca directamente en la etapa con búsqueda web.
+Una fracción de las veces (exploración) se prueba igual la etapa barata, para
+no dejar de aprender. Las estadísticas se guardan en un JSON.
+"""
+import atexit, datetime, json, os, random, re, threading, unicodedata
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from cache_agentes import DIRECTORIO_CACHE
+
+_RECENCIA = re.compile(r"\b(hoy|actual|actualmente|ahora|reciente|recientemente|ultim[oa]s?|nuev[oa]s?|"
+                       r"este ano|esta semana|este mes|vigente|precio|cotizacion)\b")
+_ANIO = re.compile(r"\b(19|20)\d{2}\b")
+_INTERROGATIVOS = ("por que", "cuando", "quien", "cuanto", "donde", "como", "cual", "que")
+
+
+def _normalizar(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+
+
+def clase_consulta(pregunta: str) -> str:
+    """Clase de una pregunta: si pide datos recientes, su tipo (por qué, cuándo, ...) y su largo."""
+    texto = _normalizar(pregunta)
+    anio_actual = datetime.date.today().year
+    recencia = bool(_RECENCIA.search(texto)) or any(
+        int(m.group(0)) >= anio_actual - 1 for m in _ANIO.finditer(texto))
+    tipo = next((i.replace(" ", "_") for i in _INTERROGATIVOS if re.search(rf"\b{i}\b", texto)), "otro")
+    palabras = len(texto.split())
+    largo = "corta" if palabras < 8 else "media" if palabras < 20 else "larga"
+    return f"recencia={'si' if recencia else 'no'}|tipo={tipo}|largo={largo}"
+
+
+@dataclass
+class Decision:
+    clase: str
+    probabilidad: float     # probabilidad estimada de que la etapa barata pase la validación
+    saltar: bool            # True: la cascada arranca en la segunda etapa
+    explorando: bool = False
+
+
+class EnrutadorModelos:
+    """
+    Estadísticas por (etapa barata, clase de pregunta) y decisión de saltarla.
+
+    umbral: se salta la etapa barata si su probabilidad de éxito es menor.
+    min_observaciones: no se salta nada en una clase con menos intentos.
+    exploracion: probabilidad de probar igual la etapa barata cuando se saltaría.
+    """
+
+    def __init__(self, ruta: Optional[str] = None, umbral: float = 0.3, min_observaciones: int = 5,
+                 exploracion: float = 0.1, clasificar: Callable[[str], str] = clase_consulta,
+                 guardar_cada: int = 20):
+        self.ruta = ruta or os.path.join(DIRECTORIO_CACHE, "enrutador.json")
+        self.umbral = umbral
+        self.min_observaciones = min_observaciones
+        self.exploracion = exploracion
+        self.clasificar = clasificar
+        self.guardar_cada = guardar_cada
+        self.clases: Dict[str, dict] = {}
+        self.decisiones = 0
+        self.saltos = 0
+        self.evaluadas = 0           # intentos de la etapa barata con resultado conocido
+        self.aciertos = 0            # ... en los que la predicción (pasa / no pasa) fue correcta
+        self.latencia_ahorrada = 0.0
+        self.costo_ahorrado = 0.0
+        self._pendientes = 0
+        self._lock = threading.Lock()
+        if os.path.exists(self.ruta):
+            with open(self.ruta, encoding="utf-8") as f:
+                self.clases = json.load(f).get("clases", {})
+        atexit.register(self.guardar)
+
+    def _stats(self, etapa: str, clase: str) -> dict:
+        return self.clases.setdefault(f"{etapa}|{clase}", {"exitos": 0, "fallos": 0, "latencia": 0.0, "costo": 0.0})
+
+    def probabilidad(self, etapa: str, clase: str) -> float:
+        s = self.clases.get(f"{etapa}|{clase}")
+        if s is None:
+            return 0.5
+        return (s["exitos"] + 1) / (s["exitos"] + s["fallos"] + 2)
+
+    def decidir(self, etapa: str, pregunta: str) -> Decision:
+        clase = self.clasificar(pregunta)
+        with self._lock:
+            p = self.probabilidad(etapa, clase)
+            s = self.clases.get(f"{etapa}|{clase}", {"exitos": 0, "fallos": 0})
+            saltar = s["exitos"] + s["fallos"] >= self.min_observaciones and p < self.umbral
+            explorando = saltar and random.random() < self.exploracion
+            self.decisiones += 1
+            if saltar and not explorando:
+                self.saltos += 1
+                intentos = s["exitos"] + s["fallos"]
+                # Se ahorra lo que en promedio cuesta un intento de la etapa barata en esta clase
+                self.latencia_ahorrada += s["latencia"] / intentos
+                self.costo_ahorrado += s["costo"] / intentos
+        return Decision(clase, p, saltar and not explorando, explorando)
+
+    def registrar(self, etapa: str, decision: Decision, exito: Optional[bool], latencia: float, costo: float = 0.0):
+        """
+        Resultado de un intento de la etapa barata: validación superada o no, o
+        None si se canceló antes de terminar (ganó la etapa de cobertura o venció
+        el plazo). Un intento cortado cuenta como fallo, porque no entregó a
+        tiempo y sí costó, pero no se usa para medir el acierto de la predicción.
+        """
+        with self._lock:
+            s = self._stats(etapa, decision.clase)
+            s["exitos" if exito else "fallos"] += 1
+            s["latencia"] += latencia
+            s["costo"] += costo
+            if exito is None:
+                s["cortados"] = s.get("cortados", 0) + 1
+            else:
+                self.evaluadas += 1
+                self.aciertos += (decision.probabilidad >= self.umbral) == exito
+            self._pendientes += 1
+            guardar = self._pendientes >= self.guardar_cada
+        if guardar:
+            self.guardar()
+
+    def guardar(self):
+        with self._lock:
+            if not self._pendientes:
+                return
+            self._pendientes = 0
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            temporal = f"{self.ruta}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump({"clases": self.clases}, f, ensure_ascii=False, indent=1)
+            os.replace(temporal, self.ruta)
+
+    def resumen(self) -> dict:
+        return {
+            "decisiones": self.decisiones,
+            "saltos": self.saltos,
+            "tasa_salto": self.saltos / self.decisiones if self.decisiones else 0.0,
+            "tasa_acierto": self.aciertos / self.evaluadas if self.evaluadas else 0.0,
+            "latencia_ahorrada": self.latencia_ahorrada,
+            "costo_ahorrado": self.costo_ahorrado,
+            "clases": {clave: dict(s, probabilidad=(s["exitos"] + 1) / (s["exitos"] + s["fallos"] + 2))
+                       for clave, s in self.clases.items()},
+        }
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Extracción incremental de texto visible desde HTML.
+
+A diferencia de BeautifulSoup, no construye el árbol completo del documento:
+el HTML se procesa por fragmentos a medida que llega y el extractor avisa
+cuando ya produjo max_chars de texto, para cortar descarga y parseo.
+"""
+from html.parser import HTMLParser
+from typing import List
+
+# Etiquetas cuyo contenido no es texto visible (o es navegación repetida)
+ETIQUETAS_OMITIDAS = {"script", "style", "nav", "noscript", "template", "svg"}
+# Tamaño de los trozos que se pasan al parser entre chequeos de max_chars
+TAM_TROZO = 8192
+# Elementos vacíos: nunca tienen etiqueta de cierre
+_VACIAS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class ExtractorTextoHTML(HTMLParser):
+    """
+    Parser HTML incremental que acumula los textos visibles (sin espacios a los
+    lados, como get_text(separator="\\n", strip=True)) hasta max_chars.
+    Usa alimentar(fragmento) y consulta `completo` para saber si ya basta.
+    """
+
+    def __init__(self, max_chars: int = 4000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.completo = False
+        self._partes: List[str] = []
+        # Texto del nodo en curso: HTMLParser lo entrega en pedazos cuando un
+        # fragmento de la red corta una palabra, y se junta hasta la próxima etiqueta
+        self._pendiente: List[str] = []
+        self._largo = 0
+        self._omitir = 0          # profundidad dentro de etiquetas omitidas
+        self._pila: List[str] = []
+
+    def alimentar(self, fragmento: str) -> bool:
+        """Procesa un fragmento de HTML; devuelve True si ya se tiene max_chars de texto."""
+        # Se parsea en trozos pequeños para detenerse poco después de max_chars
+        for i in range(0, len(fragmento), TAM_TROZO):
+            if self.completo:
+                break
+            self.feed(fragmento[i:i + TAM_TROZO])
+        return self.completo
+
+    def texto(self) -> str:
+        pendiente = "".join(self._pendiente).strip()
+        return "\n".join(self._partes + ([pendiente] if pendiente else []))[:self.max_chars]
+
+    def close(self):
+        super().close()
+        self._vaciar()
+
+    def _vaciar(self):
+        """Cierra el nodo de texto en curso como una parte de texto()."""
+        texto = "".join(self._pendiente).strip()
+        self._pendiente = []
+        if texto and not self.completo:
+            # Largo exacto de texto(): + 1 por el separador "\n" con la parte anterior
+            self._largo += len(texto) + (1 if self._partes else 0)
+            self._partes.append(texto)
+            # Con max_chars justos ya no hace falta leer más
+            if self._largo >= self.max_chars:
+                self.completo = True
+
+    def handle_starttag(self, tag, attrs):
+        self._vaciar()
+        if tag in _VACIAS:
+            return
+        if tag in ETIQUETAS_OMITIDAS:
+            self._omitir += 1
+        self._pila.append(tag)
+
+    def handle_endtag(self, tag):
+        self._vaciar()
+        if tag not in self._pila:
+            return  # cierre sin apertura (HTML mal formado): se ignora
+        # Cierra también las etiquetas abiertas que quedaron sin cerrar
+        while self._pila:
+            abierta = self._pila.pop()
+            if abierta in ETIQUETAS_OMITIDAS:
+                self._omitir -= 1
+            if abierta == tag:
+                break
+
+    def handle_data(self, data):
+        if self._omitir or self.completo:
+            return
+        self._pendiente.append(data)
+        # Un nodo de texto enorme no espera a su etiqueta de cierre: si con lo
+        # que ya llegó se alcanza max_chars, el resto no cambiaría texto()
+        if self._largo + len("".join(self._pendiente).strip()) + (1 if self._partes else 0) >= self.max_chars:
+            self._vaciar()
+
+
+def texto_visible(html: str, max_chars: int = 4000) -> str:
+    """Texto visible de un HTML ya descargado, deteniendo el parseo al llegar a max_chars."""
+    extractor = ExtractorTextoHTML(max_chars)
+    extractor.alimentar(html)
+    extractor.close()
+    return extractor.texto()
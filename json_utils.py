@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Utilidades para extraer objetos JSON de las respuestas en texto de los agentes.
+
+Incluye un escáner de una sola pasada sobre el texto completo (iter_json, usado
+por extract_json_obj) y un extractor incremental que procesa los deltas de texto
+de Runner.run_streamed, entregando cada campo del objeto principal apenas se cierra.
+"""
+import json, re
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+
+
+class JsonExtractionError(Exception):
+    pass
+
+
+_decoder = json.JSONDecoder()
+# Solo posiciones que pueden iniciar un JSON: '{' seguido de clave o cierre, y
+# '[' seguido de un valor o cierre. Así el texto libre ("{ver anexo}",
+# "[texto](url)") no llega al decodificador, cuyo error cuesta O(posición).
+_apertura = re.compile(r'\{(?=\s*["}])|\[(?=\s*[-"\d{\[\]tfn])')
+
+
+def iter_json(text: str, inicio: int = 0) -> Iterator[Tuple[int, int, Any]]:
+    """
+    Recorre el texto UNA sola vez y entrega, de forma perezosa, cada objeto o
+    arreglo JSON de primer nivel que encuentre, como (inicio, fin, valor):
+      - inicio, fin: posiciones exactas en el texto (text[inicio:fin] es el JSON)
+      - valor: el objeto Python ya parseado (dict/list)
+
+    Funciona igual dentro o fuera de bloques ```json```. El parseo se hace
+    directamente sobre el texto original con el escáner de json (en C), sin
+    copiar subcadenas. Los valores anidados no se entregan por separado: tras un JSON
+    válido el recorrido continúa desde su cierre. Un '{' o '[' que no inicia un
+    JSON válido (texto libre, enlaces [texto](url), JSON truncado) se salta.
+    """
+    if not isinstance(text, str):
+        raise TypeError("text debe ser str")
+    buscar = _apertura.search
+    escanear = _decoder.scan_once
+    pos = inicio
+    while True:
+        m = buscar(text, pos)
+        if m is None:
+            return
+        i = m.start()
+        try:
+            obj, fin = escanear(text, i)
+        except (StopIteration, json.JSONDecodeError):
+            pos = i + 1
+            continue
+        yield i, fin, obj
+        pos = fin
+
+
+def extract_json_obj(text: str) -> Tuple[Any, str]:
+    """
+    Extrae SOLO el objeto JSON de una respuesta que puede incluir un bloque
+    ```json ... ``` y/o texto adicional. Devuelve:
+      - obj: el objeto Python parseado (dict/list)
+      - raw: el string JSON exacto extraído
+
+    Estrategia (una sola pasada con iter_json):
+      1) Devuelve el PRIMER objeto JSON válido, esté o no dentro de un bloque.
+      2) Si no hay objetos, devuelve el primer arreglo JSON válido.
+      3) Si no hay ninguno, lanza JsonExtractionError con pista.
+    """
+    primer_arreglo = None
+    for inicio, fin, obj in iter_json(text):
+        if isinstance(obj, dict):
+            return obj, text[inicio:fin]
+        if primer_arreglo is None:
+            primer_arreglo = (obj, text[inicio:fin])
+    if primer_arreglo is not None:
+        return primer_arreglo
+
+    start = text.find("{")
+    if start == -1:
+        raise JsonExtractionError("No se encontró ninguna llave '{' en el texto.")
+    # Pista útil para depurar: el error del primer candidato
+    try:
+        _decoder.raw_decode(text, start)
+    except json.JSONDecodeError as e:
+        context = text[max(start, e.pos-60): e.pos+60]
+        msg = (
+            f"Error al parsear JSON: {e}\n"
+            f"Contexto cercano a la posición {e.pos}:\n---\n{context}\n---"
+        )
+        raise JsonExtractionError(msg)
+    raise JsonExtractionError("No se encontró un objeto JSON válido en el texto.")
+
+
+class ExtractorJsonIncremental:
+    """
+    Extractor de JSON que recibe el texto por fragmentos (deltas de streaming).
+
+    Lleva el estado de llaves, cadenas y escapes entre fragmentos, de modo que
+    cada campo de primer nivel del objeto principal se entrega como
+    (clave, valor) en el momento en que su valor se cierra, sin esperar al
+    resto de la respuesta. El texto anterior a la primera '{' (por ejemplo
+    la apertura de un bloque ```json) se ignora.
+    """
+
+    def __init__(self):
+        self.objeto: Dict[str, Any] = {}  # campos completos recibidos hasta ahora
+        self.terminado = False             # True cuando se cerró el objeto principal
+        self._iniciado = False
+        self._nivel = 0
+        self._en_cadena = False
+        self._escape = False
+        self._fase = "clave"               # clave -> dos_puntos -> valor
+        self._clave: List[str] = []
+        self._valor: List[str] = []
+
+    def alimentar(self, fragmento: str) -> List[Tuple[str, Any]]:
+        """
+        Procesa un fragmento de texto y devuelve la lista de campos (clave, valor)
+        que quedaron completos con él. Lanza JsonExtractionError si un valor
+        cerrado no es JSON válido.
+        """
+        completos = []
+        for ch in fragmento:
+            if self.terminado:
+                break
+            if not self._iniciado:
+                if ch == "{":
+                    self._iniciado = True
+                    self._nivel = 1
+                continue
+
+            # Dentro de una cadena solo importan el escape y la comilla de cierre
+            if self._en_cadena:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._en_cadena = False
+                self._acumular(ch)
+                continue
+
+            if ch == '"':
+                self._en_cadena = True
+                self._acumular(ch)
+            elif ch in "{[":
+                self._nivel += 1
+                self._acumular(ch)
+            elif ch in "}]":
+                self._nivel -= 1
+                if self._nivel == 0:
+                    # Cierre del objeto principal: el último valor queda completo
+                    if self._fase == "valor":
+                        completos.append(self._cerrar_campo())
+                    self.terminado = True
+                else:
+                    self._acumular(ch)
+            elif ch == ":" and self._nivel == 1 and self._fase == "dos_puntos":
+                self._fase = "valor"
+            elif ch == "," and self._nivel == 1 and self._fase == "valor":
+                completos.append(self._cerrar_campo())
+            else:
+                self._acumular(ch)
+        return completos
+
+    def _acumular(self, ch: str):
+        if self._nivel == 1 and self._fase == "clave":
+            self._clave.append(ch)
+            # La clave termina al cerrar su comilla
+            if ch == '"' and not self._en_cadena and len(self._clave) > 1:
+                self._fase = "dos_puntos"
+        elif self._fase == "valor":
+            self._valor.append(ch)
+
+    def _cerrar_campo(self) -> Tuple[str, Any]:
+        clave_raw = "".join(self._clave).strip()
+        valor_raw = "".join(self._valor).strip()
+        self._clave, self._valor = [], []
+        self._fase = "clave"
+        try:
+            clave = json.loads(clave_raw)
+            valor = json.loads(valor_raw)
+        except json.JSONDecodeError as e:
+            raise JsonExtractionError(
+                f"Campo JSON inválido en streaming ({clave_raw or '?'}): {e}\n---\n{valor_raw[:120]}\n---"
+            )
+        self.objeto[clave] = valor
+        return clave, valor
+
+    async def consumir_streaming(self, resultado) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Recorre los eventos de un resultado de Runner.run_streamed y entrega cada
+        campo (clave, valor) del objeto principal en cuanto se cierra.
+        Lanza JsonExtractionError si el stream termina sin cerrar el objeto.
+        """
+        async for evento in resultado.stream_events():
+            if evento.type != "raw_response_event":
+                continue
+            # Solo interesan los deltas de texto de la respuesta del modelo
+            if getattr(evento.data, "type", None) != "response.output_text.delta":
+                continue
+            for campo in self.alimentar(evento.data.delta):
+                yield campo
+        if not self.terminado:
+            raise JsonExtractionError("El stream terminó sin cerrar el objeto JSON.")
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Ejecución por lotes del pipeline de separación de marcas (ejemplo2).
+
+Lee preguntas de un archivo JSONL o CSV en streaming, corre la cascada
+agente1 -> agente2 de forma concurrente bajo un límite global de corridas en
+vuelo y escribe cada resultado validado (o cada fallo) en JSONL apenas termina.
+La memoria no crece con el tamaño del archivo: la cola de entrada es acotada y
+las latencias se acumulan en un histograma de tamaño fijo.
+
+Uso:
+    python lote_marcas.py preguntas.jsonl --salida resultados.jsonl --errores fallos.jsonl
+    python lote_marcas.py preguntas.csv --campo pregunta --concurrencia 50 --plazo 45
+"""
+import argparse, asyncio, contextlib, csv, json, math, os, sys, time
+from typing import Any, Iterator, Optional, TextIO, Tuple
+
+from cascada import EstadisticasCascada
+from ejemplo2 import PLAZO_TOTAL, RETARDO_COBERTURA, cascada_marcas, enrutador
+from plazo import con_plazo
+
+
+class HistogramaLatencias:
+    """Histograma logarítmico de memoria fija para percentiles aproximados (error < 2%)."""
+
+    BASE = 1.02
+    MINIMO = 1e-3   # 1 ms
+
+    def __init__(self):
+        self.conteos = {}
+        self.total = 0
+
+    def registrar(self, segundos: float):
+        cubeta = max(0, math.ceil(math.log(max(segundos, self.MINIMO) / self.MINIMO, self.BASE)))
+        self.conteos[cubeta] = self.conteos.get(cubeta, 0) + 1
+        self.total += 1
+
+    def percentil(self, p: float) -> float:
+        if not self.total:
+            return 0.0
+        objetivo = math.ceil(self.total * p / 100)
+        acumulado = 0
+        for cubeta in sorted(self.conteos):
+            acumulado += self.conteos[cubeta]
+            if acumulado >= objetivo:
+                return self.MINIMO * self.BASE ** cubeta
+        return 0.0
+
+
+def _filas_jsonl(f: TextIO) -> Iterator[Tuple[int, Any]]:
+    """(número de línea, objeto o excepción) por cada línea no vacía."""
+    for numero, linea in enumerate(f, start=1):
+        if not linea.strip():
+            continue
+        try:
+            yield numero, json.loads(linea)
+        except ValueError as e:
+            yield numero, e
+
+
+def _filas_csv(f: TextIO) -> Iterator[Tuple[int, Any]]:
+    """(número de fila, diccionario o excepción); el lector sigue tras una fila mal formada."""
+    lector = csv.DictReader(f)
+    numero = 0
+    while True:
+        numero += 1
+        try:
+            yield numero, next(lector)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield numero, e
+
+
+def leer_preguntas(ruta: str, campo: str) -> Iterator[dict]:
+    """
+    Entrega cada fila del archivo (JSONL o CSV) sin cargarlo completo en
+    memoria. Una fila ilegible o sin la pregunta no detiene el lote: se entrega
+    como {"fila", "error"} (sin el campo de la pregunta) para registrarla como fallo.
+    """
+    with open(ruta, encoding="utf-8", newline="") as f:
+        filas = _filas_csv(f) if ruta.lower().endswith(".csv") else _filas_jsonl(f)
+        for numero, fila in filas:
+            if isinstance(fila, Exception):
+                yield {"fila": numero, "error": f"Fila ilegible: {fila}"}
+            elif not isinstance(fila, dict) or not fila.get(campo):
+                yield {"fila": numero, "error": f"La fila {numero} no tiene el campo '{campo}'"}
+            else:
+                yield {"fila": numero, **fila}
+
+
+def _escribir(archivo: TextIO, registro: dict):
+    archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    archivo.flush()
+
+
+async def procesar(args) -> dict:
+    cola: asyncio.Queue = asyncio.Queue(maxsize=args.concurrencia * 2)
+    cascadas = EstadisticasCascada()
+    latencias = HistogramaLatencias()
+    conteo = {"total": 0, "validos": 0, "fallos": 0, "escalados": 0}
+    t0 = time.perf_counter()
+
+    salida = open(args.salida, "a", encoding="utf-8")
+    errores = open(args.errores, "a", encoding="utf-8") if args.errores else salida
+
+    async def productor():
+        for fila in leer_preguntas(args.entrada, args.campo):
+            await cola.put(fila)   # se bloquea si los trabajadores van atrasados
+        for _ in range(args.concurrencia):
+            await cola.put(None)
+
+    async def correr(fila: dict):
+        """(registro, escalado) de una pregunta."""
+        registro = {"fila": fila["fila"], "pregunta": fila[args.campo]}
+        try:
+            with con_plazo(args.plazo):
+                resultado = await cascada_marcas(fila[args.campo], cascadas, args.retardo)
+        except Exception as e:
+            registro["error"] = repr(e)
+            return registro, False
+        registro.update(etapa=resultado.etapa, estado=resultado.estado, latencia=resultado.latencia,
+                        etapas_lanzadas=resultado.etapas_lanzadas, enrutada=resultado.enrutada)
+        if resultado.valor is not None:
+            registro["respuesta"] = resultado.valor.model_dump()
+        else:
+            registro["error"] = "Ninguna etapa produjo una respuesta válida"
+            if resultado.parcial is not None:
+                registro["parcial"] = resultado.parcial.model_dump()
+        # Escaló si se usó una etapa distinta de la primera: también cuando el
+        # enrutador la saltó y solo se lanzó la segunda
+        return registro, resultado.enrutada or len(resultado.etapas_lanzadas) > 1
+
+    async def trabajador():
+        while (fila := await cola.get()) is not None:
+            if args.campo not in fila:
+                # Fila ilegible (ver leer_preguntas): fallo sin correr la cascada
+                registro, escalado = fila, False
+            else:
+                inicio = time.perf_counter()
+                registro, escalado = await correr(fila)
+                latencias.registrar(time.perf_counter() - inicio)
+            conteo["total"] += 1
+            conteo["escalados"] += escalado
+            if "error" in registro:
+                conteo["fallos"] += 1
+                _escribir(errores, registro)
+            else:
+                conteo["validos"] += 1
+                _escribir(salida, registro)
+            if conteo["total"] % args.progreso == 0:
+                print(f"[lote] {conteo['total']} preguntas, "
+                      f"{conteo['total'] / (time.perf_counter() - t0):.2f} items/s", file=sys.stderr)
+
+    try:
+        await asyncio.gather(productor(), *(trabajador() for _ in range(args.concurrencia)))
+    finally:
+        salida.close()
+        if errores is not salida:
+            errores.close()
+
+    duracion = time.perf_counter() - t0
+    n = max(conteo["total"], 1)
+    return {
+        **conteo,
+        "segundos": duracion,
+        "items_por_segundo": conteo["total"] / duracion if duracion else 0.0,
+        "latencia_p50": latencias.percentil(50),
+        "latencia_p99": latencias.percentil(99),
+        "tasa_escalamiento": conteo["escalados"] / n,
+        "cascada": cascadas.resumen(),
+        "enrutador": enrutador.resumen() if enrutador is not None else None,
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entrada", help="Archivo .jsonl o .csv con una pregunta por fila")
+    parser.add_argument("--campo", default="pregunta", help="Columna/clave que contiene la pregunta")
+    parser.add_argument("--salida", default="resultados_marcas.jsonl")
+    parser.add_argument("--errores", help="JSONL para los fallos (por defecto, el mismo de --salida)")
+    parser.add_argument("--concurrencia", type=int, default=20, help="Máximo de cascadas en vuelo")
+    parser.add_argument("--retardo", type=float, default=RETARDO_COBERTURA, help="Retardo de cobertura (s)")
+    parser.add_argument("--plazo", type=float, default=PLAZO_TOTAL, help="Plazo total por pregunta (s)")
+    parser.add_argument("--progreso", type=int, default=100, help="Informar cada N preguntas")
+    parser.add_argument("--silencioso", action="store_true", help="Oculta los mensajes de validación")
+    args = parser.parse_args(argv)
+
+    with open(os.devnull, "w") as nulo, (contextlib.redirect_stdout(nulo) if args.silencioso
+                                         else contextlib.nullcontext()):
+        resumen = asyncio.run(procesar(args))
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
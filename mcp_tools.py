@@ -1,25 +1,49 @@
 """MCP Tools - Strands Agents Workshop"""
 import httpx
-import wikipedia
 import asyncio
 import json
-from typing import Dict, Any
+import re
+import threading
+import time
+import unicodedata
+import weakref
+from typing import Dict, Any, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from strands import tool
-import requests 
 import os
 from dotenv import load_dotenv
+from web_fetch import cliente_http, ejecutar_sync
+from cache_agentes import CacheSQLite, DIRECTORIO_CACHE
+from telemetria import anotar, instrumentar, registrar_espera
+from casete import grabable
+from plazo import PLAZO_EXCEDIDO, PlazoExcedido, acotar, esperar, restante, sin_plazo
 
 # Carga automáticamente las variables desde el archivo .env
 load_dotenv()
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
-@tool
-def tavily_search(query: str, search_depth: str = "basic") -> str:
-    """
-    Usa la API de Tavily para hacer una búsqueda web contextual.
-    search_depth puede ser 'basic' o 'advanced'.
-    """
-    url = "https://api.tavily.com/search"
+TAVILY_URL = "https://api.tavily.com/search"
+TAVILY_TTL = 24 * 3600          # web results go stale; a day is enough for report runs
+TAVILY_MAX_CONCURRENCY = 5
+_tavily_cache: Optional[CacheSQLite] = None
+# In-flight Tavily requests per event loop, for singleflight coalescing
+_tavily_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+# Callers currently waiting on each in-flight Tavily request
+_tavily_waiters: Dict[asyncio.Task, int] = {}
+
+def tavily_cache() -> CacheSQLite:
+    """Persistent cache of parsed Tavily responses."""
+    global _tavily_cache
+    if _tavily_cache is None:
+        _tavily_cache = CacheSQLite(os.path.join(DIRECTORIO_CACHE, "tavily.sqlite"),
+                                    ttl=TAVILY_TTL, max_entradas=50_000)
+    return _tavily_cache
+
+def _tavily_key(query: str, search_depth: str) -> str:
+    return json.dumps([" ".join(query.split()).casefold(), search_depth])
+
+@grabable("tavily_request")
+async def _tavily_request(query: str, search_depth: str, key: str) -> Dict[str, Any]:
     payload = {
         "query": query,
         "search_depth": search_depth,
@@ -30,62 +54,366 @@ def tavily_search(query: str, search_depth: str = "basic") -> str:
         "Content-Type": "application/json",
         "Authorization": f"Bearer {TAVILY_API_KEY}"
     }
-
-    response = requests.post(url, json=payload, headers=headers)
+    response = await cliente_http().post(TAVILY_URL, json=payload, headers=headers, timeout=30.0)
     response.raise_for_status()
-
     data = response.json()
-    answer = data.get("answer", "")
-    results = data.get("results", [])
+    parsed = {
+        "answer": data.get("answer", ""),
+        "results": [{"title": r["title"], "url": r["url"], "content": r.get("content", "")}
+                    for r in data.get("results", [])]
+    }
+    tavily_cache().guardar(key, json.dumps(parsed))
+    return parsed
 
-    summary = f"**Respuesta Tavily:** {answer}\n\n"
-    for r in results:
+@instrumentar("herramienta", "tavily_search")
+async def _tavily_raw(query: str, search_depth: str = "basic") -> Dict[str, Any]:
+    """Parsed Tavily response, served from cache or coalesced with an identical in-flight query."""
+    key = _tavily_key(query, search_depth)
+    cached = tavily_cache().obtener(key)
+    anotar(cache_hit=cached is not None)
+    if cached is not None:
+        return json.loads(cached)
+    inflight = _tavily_inflight.setdefault(asyncio.get_running_loop(), {})
+    task = inflight.get(key)
+    anotar(coalesced=task is not None)
+    if task is None:
+        # The shared request carries no deadline of its own: each caller waits
+        # within its deadline, and the last one to give up cancels it
+        task = inflight[key] = asyncio.create_task(_tavily_request(query, search_depth, key), context=sin_plazo())
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+        task.add_done_callback(lambda t: _tavily_waiters.pop(t, None))
+    _tavily_waiters[task] = _tavily_waiters.get(task, 0) + 1
+    try:
+        # shield: a cancelled caller must not cancel the request other callers wait on
+        return await esperar(asyncio.shield(task))
+    except PlazoExcedido:
+        if _tavily_waiters.get(task) == 1:
+            task.cancel()
+        raise
+    finally:
+        if task in _tavily_waiters:
+            _tavily_waiters[task] -= 1
+
+def _tavily_summary(data: Dict[str, Any]) -> str:
+    summary = f"**Respuesta Tavily:** {data['answer']}\n\n"
+    for r in data["results"]:
         summary += f"- [{r['title']}]({r['url']})\n"
     return summary
 
+async def _tavily_search_many(queries: List[str], search_depth: str = "basic",
+                              max_concurrency: int = TAVILY_MAX_CONCURRENCY) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def one(query: str) -> Dict[str, Any]:
+        try:
+            async with semaphore:
+                return {"query": query, "success": True,
+                        "summary": _tavily_summary(await _tavily_raw(query, search_depth))}
+        except Exception as e:
+            return {"query": query, "success": False, "error": str(e)}
+
+    # Duplicates in the batch share one request through the singleflight map
+    return list(await asyncio.gather(*(one(q) for q in queries)))
+
+@tool
+async def tavily_search_async(query: str, search_depth: str = "basic") -> str:
+    """
+    Usa la API de Tavily para hacer una búsqueda web contextual (async).
+    search_depth puede ser 'basic' o 'advanced'.
+    """
+    return _tavily_summary(await _tavily_raw(query, search_depth))
+
 @tool
-def wikipedia_search(query: str) -> Dict[str, Any]:
+def tavily_search(query: str, search_depth: str = "basic") -> str:
+    """
+    Usa la API de Tavily para hacer una búsqueda web contextual.
+    search_depth puede ser 'basic' o 'advanced'.
+    """
+    return _tavily_summary(ejecutar_sync(_tavily_raw(query, search_depth)))
+
+@tool
+async def tavily_search_many_async(queries: List[str], search_depth: str = "basic",
+                                   max_concurrency: int = TAVILY_MAX_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Varias búsquedas Tavily a la vez (async), con caché, límite de concurrencia y
+    una sola petición para consultas idénticas. Resultados en el orden de entrada.
+    """
+    return await _tavily_search_many(queries, search_depth, max_concurrency)
+
+@tool
+def tavily_search_many(queries: List[str], search_depth: str = "basic",
+                       max_concurrency: int = TAVILY_MAX_CONCURRENCY) -> List[Dict[str, Any]]:
+    """
+    Varias búsquedas Tavily a la vez, con caché, límite de concurrencia y una sola
+    petición para consultas idénticas. Resultados en el orden de entrada.
+    """
+    return ejecutar_sync(_tavily_search_many(queries, search_depth, max_concurrency))
+
+WIKIPEDIA_LANGS = ("es", "en")   # Spanish first, fallback to English
+WIKIPEDIA_BATCH = 20             # MediaWiki returns at most 20 intro extracts per request
+
+def _wikipedia_api(lang: str) -> str:
+    # Per-call endpoint: unlike wikipedia.set_lang, no process-global state
+    return f"https://{lang}.wikipedia.org/w/api.php"
+
+def _short(summary: str) -> str:
+    # Limit summary text (500 characters)
+    return summary[:500] + "..." if len(summary) > 500 else summary
+
+@grabable("wikipedia_page")
+async def _wikipedia_request(query: str, lang: str) -> Dict[str, Any]:
+    """Search + page summary in a single MediaWiki request for one language.
+
+    Failures raise instead of returning an error dict, so the cassette can
+    leave transient ones (timeouts, 429, 5xx) unrecorded.
+    """
+    response = await esperar(cliente_http().get(
+        _wikipedia_api(lang),
+        params={
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "generator": "search",
+            "gsrsearch": query,
+            "gsrlimit": "5",
+            "prop": "extracts|info|pageprops",
+            "exintro": "1",
+            "explaintext": "1",
+            "exlimit": "5",
+            "inprop": "url",
+            "ppprop": "disambiguation",
+            "redirects": "1"
+        },
+        timeout=acotar(10.0)
+    ))
+    response.raise_for_status()
+    pages = sorted(response.json().get("query", {}).get("pages", []), key=lambda p: p.get("index", 0))
+    if not pages:
+        return {"success": False, "error": f"No page found for '{query}'", "lang": lang}
+    page = pages[0]
+    if "disambiguation" in page.get("pageprops", {}):
+        return {
+            "success": False,
+            "error": "Multiple results found",
+            "options": [p["title"] for p in pages[1:]][:5],  # Top 5 only
+            "lang": lang
+        }
+    return {
+        "success": True,
+        "title": page["title"],
+        "summary": _short(page.get("extract", "")),
+        "url": page.get("fullurl", ""),
+        "lang": lang
+    }
+
+@instrumentar("herramienta", "wikipedia_page")
+async def _wikipedia_page(query: str, lang: str) -> Dict[str, Any]:
+    try:
+        return await _wikipedia_request(query, lang)
+    except Exception as e:
+        return {"success": False, "error": str(e), "lang": lang}
+
+async def _wikipedia_search(query: str, race: bool = False) -> Dict[str, Any]:
+    if not race:
+        for lang in WIKIPEDIA_LANGS:
+            result = await _wikipedia_page(query, lang)
+            if result["success"]:
+                return result
+        return result
+    # Race: query every language at once and keep the first successful answer
+    tasks = [asyncio.create_task(_wikipedia_page(query, lang)) for lang in WIKIPEDIA_LANGS]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if result["success"]:
+                return result
+        return tasks[-1].result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@instrumentar("herramienta", "wikipedia_summaries")
+@grabable("wikipedia_summaries_lang")
+async def _wikipedia_summaries_lang(titles: List[str], lang: str) -> Dict[str, Dict[str, Any]]:
+    """Intro summaries for up to WIKIPEDIA_BATCH titles in one request, keyed by input title."""
+    response = await esperar(cliente_http().get(
+        _wikipedia_api(lang),
+        params={
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "titles": "|".join(titles),
+            "prop": "extracts|info",
+            "exintro": "1",
+            "explaintext": "1",
+            "exlimit": str(WIKIPEDIA_BATCH),
+            "inprop": "url",
+            "redirects": "1"
+        },
+        timeout=acotar(10.0)
+    ))
+    response.raise_for_status()
+    query = response.json().get("query", {})
+    # Follow title normalisation and redirects back to the input titles
+    final_title = {t: t for t in titles}
+    for step in ("normalized", "redirects"):
+        mapping = {item["from"]: item["to"] for item in query.get(step, [])}
+        final_title = {t: mapping.get(ft, ft) for t, ft in final_title.items()}
+    pages = {p["title"]: p for p in query.get("pages", []) if not p.get("missing")}
+    results = {}
+    for title, ft in final_title.items():
+        page = pages.get(ft)
+        if page is not None:
+            results[title] = {
+                "success": True,
+                "title": page["title"],
+                "summary": _short(page.get("extract", "")),
+                "url": page.get("fullurl", ""),
+                "lang": lang
+            }
+    return results
+
+async def _wikipedia_summaries(titles: List[str], lang: str = "es", fallback_lang: Optional[str] = "en") -> Dict[str, Any]:
+    unique = list(dict.fromkeys(titles))
+    found: Dict[str, Dict[str, Any]] = {}
+    for current in [lang] + ([fallback_lang] if fallback_lang and fallback_lang != lang else []):
+        pending = [t for t in unique if t not in found]
+        if not pending:
+            break
+        chunks = [pending[i:i + WIKIPEDIA_BATCH] for i in range(0, len(pending), WIKIPEDIA_BATCH)]
+        for chunk_result in await asyncio.gather(*(_wikipedia_summaries_lang(c, current) for c in chunks),
+                                                 return_exceptions=True):
+            if isinstance(chunk_result, dict):
+                found.update(chunk_result)
+    return {
+        "success": True,
+        "results": [dict(found[t], query=t) if t in found else {"success": False, "query": t, "error": "Page not found"}
+                    for t in titles]
+    }
+
+@tool
+async def wikipedia_search_async(query: str, race: bool = False) -> Dict[str, Any]:
+    """Search Wikipedia for information (async, safe to run concurrently)
+    
+    Args:
+        query: Search query
+        race: Query Spanish and English concurrently and keep the first hit
+        
+    Returns:
+        Dictionary containing search results
+    """
+    return await _wikipedia_search(query, race)
+
+@tool
+def wikipedia_search(query: str, race: bool = False) -> Dict[str, Any]:
     """Search Wikipedia for information
     
     Args:
         query: Search query
+        race: Query Spanish and English concurrently and keep the first hit
         
     Returns:
         Dictionary containing search results
     """
-    try:
-        # Korean first, fallback to English if failed
-        try:
-            wikipedia.set_lang("es")
-            page = wikipedia.page(query)
-        except (wikipedia.exceptions.DisambiguationError, wikipedia.exceptions.PageError):
-            wikipedia.set_lang("en")
-            page = wikipedia.page(query)
+    return ejecutar_sync(_wikipedia_search(query, race))
+
+@tool
+async def wikipedia_summaries_async(titles: List[str], lang: str = "es") -> Dict[str, Any]:
+    """Fetch Wikipedia summaries for many page titles in batched requests (async)
+    
+    Args:
+        titles: Page titles (e.g. program or university names)
+        lang: Wikipedia language; titles not found there are retried in English
         
-        # Limit summary text (500 characters)
-        summary = page.summary
-        if len(summary) > 500:
-            summary = summary[:500] + "..."
+    Returns:
+        Dictionary with one result per input title (in input order)
+    """
+    return await _wikipedia_summaries(titles, lang)
+
+@tool
+def wikipedia_summaries(titles: List[str], lang: str = "es") -> Dict[str, Any]:
+    """Fetch Wikipedia summaries for many page titles in batched requests
+    
+    Args:
+        titles: Page titles (e.g. program or university names)
+        lang: Wikipedia language; titles not found there are retried in English
         
-        return {
-            "success": True,
-            "title": page.title,
-            "summary": summary,
-            "url": page.url
-        }
+    Returns:
+        Dictionary with one result per input title (in input order)
+    """
+    return ejecutar_sync(_wikipedia_summaries(titles, lang))
+
+@grabable("duckduckgo_search")
+async def _duckduckgo_request(query: str) -> Dict[str, Any]:
+    # Failures raise so the cassette does not record transient ones
+    response = await esperar(cliente_http().get(
+        "https://api.duckduckgo.com/",
+        params={
+            "q": query,
+            "format": "json",
+            "no_html": "1",
+            "skip_disambig": "1"
+        },
+        timeout=acotar(10.0)
+    ))
+    response.raise_for_status()
+    
+    if response.status_code == 200:
+        data = response.json()
         
-    except wikipedia.exceptions.DisambiguationError as e:
-        return {
-            "success": False,
-            "error": "Multiple results found",
-            "options": e.options[:5]  # Top 5 only
-        }
-         
+        # If Abstract information exists
+        if data.get("Abstract"):
+            return {
+                "success": True,
+                "title": data.get("Heading", query),
+                "summary": data["Abstract"],
+                "url": data.get("AbstractURL", "")
+            }
+        
+        # If Definition information exists
+        elif data.get("Definition"):
+            return {
+                "success": True,
+                "title": query,
+                "summary": data["Definition"],
+                "url": data.get("DefinitionURL", "")
+            }
+        
+        # If related topics exist
+        elif data.get("RelatedTopics"):
+            topics = data["RelatedTopics"][:3]
+            summaries = []
+            for topic in topics:
+                if isinstance(topic, dict) and topic.get("Text"):
+                    summaries.append(topic["Text"])
+            
+            if summaries:
+                return {
+                    "success": True,
+                    "title": query,
+                    "summary": " | ".join(summaries)
+                }
+    
+    return {"success": False, "error": "No results found"}
+
+@instrumentar("herramienta", "duckduckgo_search")
+async def _duckduckgo_search(query: str) -> Dict[str, Any]:
+    try:
+        return await _duckduckgo_request(query)
     except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
-        }
+        return {"success": False, "error": str(e)}
+
+@tool
+async def duckduckgo_search_async(query: str) -> Dict[str, Any]:
+    """Search DuckDuckGo for information (async, shares the pooled HTTP client)
+    
+    Args:
+        query: Search query
+        
+    Returns:
+        Dictionary containing search results
+    """
+    return await _duckduckgo_search(query)
 
 @tool
 def duckduckgo_search(query: str) -> Dict[str, Any]:
@@ -97,63 +425,177 @@ def duckduckgo_search(query: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing search results
     """
+    return ejecutar_sync(_duckduckgo_search(query))
+
+GEOCODE_NOT_FOUND = "Location not found"
+
+@grabable("geocode")
+async def _geocode_request(location: str) -> Dict[str, Any]:
+    # Failures raise so the cassette does not record transient ones.
+    # Using OpenStreetMap Nominatim API for geocoding
+    response = await esperar(cliente_http().get(
+        "https://nominatim.openstreetmap.org/search",
+        params={
+            "q": location,
+            "format": "json",
+            "limit": 1
+        },
+        headers={
+            "User-Agent": "StrandsAgents/1.0",
+            "Accept": "application/json",
+            "Accept-Charset": "utf-8"
+        },
+        timeout=acotar(10.0)
+    ))
+    
+    # 429/5xx (rate limit, outage) are errors, not an answer about the place
+    response.raise_for_status()
+    data = response.json()
+    if data:
+        result = data[0]
+        return {
+            "success": True,
+            "latitude": float(result["lat"]),
+            "longitude": float(result["lon"]),
+            "display_name": result.get("display_name", location)
+        }
+    
+    return {"success": False, "error": GEOCODE_NOT_FOUND}
+
+async def _geocode(location: str) -> Dict[str, Any]:
     try:
-        async def fetch_search_results():
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "https://api.duckduckgo.com/",
-                    params={
-                        "q": query,
-                        "format": "json",
-                        "no_html": "1",
-                        "skip_disambig": "1"
-                    },
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # If Abstract information exists
-                    if data.get("Abstract"):
-                        return {
-                            "success": True,
-                            "title": data.get("Heading", query),
-                            "summary": data["Abstract"],
-                            "url": data.get("AbstractURL", "")
-                        }
-                    
-                    # If Definition information exists
-                    elif data.get("Definition"):
-                        return {
-                            "success": True,
-                            "title": query,
-                            "summary": data["Definition"],
-                            "url": data.get("DefinitionURL", "")
-                        }
-                    
-                    # If related topics exist
-                    elif data.get("RelatedTopics"):
-                        topics = data["RelatedTopics"][:3]
-                        summaries = []
-                        for topic in topics:
-                            if isinstance(topic, dict) and topic.get("Text"):
-                                summaries.append(topic["Text"])
-                        
-                        if summaries:
-                            return {
-                                "success": True,
-                                "title": query,
-                                "summary": " | ".join(summaries)
-                            }
-                
-                return {"success": False, "error": "No results found"}
-        
-        return asyncio.run(fetch_search_results())
-        
+        return await _geocode_request(location)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+class TokenBucket:
+    """Token-bucket rate limiter shared by every event loop and thread.
+
+    Each acquire() reserves one token; when the bucket is empty the caller
+    sleeps until its reserved token has been refilled. If that slot falls
+    after the request deadline (plazo.py) the token is given back and
+    PlazoExcedido is raised right away instead of sleeping past it.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._reservations = 0
+        self._lock = threading.Lock()
+
+    def _release(self, reservation: int):
+        # Only the latest reservation can be undone: later callers already
+        # sleep until the slots after it
+        with self._lock:
+            if self._reservations == reservation:
+                self._tokens += 1
+
+    async def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            self._reservations += 1
+            reservation = self._reservations
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            left = restante()
+            if left is not None and wait > left:
+                self._tokens += 1
+                raise PlazoExcedido("no rate-limit slot before the deadline")
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._release(reservation)
+                raise
+
+# Nominatim usage policy: at most 1 request per second
+NOMINATIM_LIMITER = TokenBucket(rate=1.0, capacity=1.0)
+GEOCODE_TTL = 90 * 24 * 3600          # found places barely move
+GEOCODE_NEGATIVE_TTL = 24 * 3600      # "not found" may be fixed upstream
+_geocode_cache: Optional[CacheSQLite] = None
+
+def geocode_cache() -> CacheSQLite:
+    """Persistent geocoding cache (SQLite under the local cache directory)."""
+    global _geocode_cache
+    if _geocode_cache is None:
+        _geocode_cache = CacheSQLite(os.path.join(DIRECTORIO_CACHE, "geocode.sqlite"),
+                                     ttl=GEOCODE_TTL, max_entradas=200_000)
+    return _geocode_cache
+
+def normalize_place(location: str) -> str:
+    """Cache key for a place name: no accents, casefolded, no punctuation, single spaces."""
+    text = unicodedata.normalize("NFKD", location)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+async def _geocode_and_store(location: str, key: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        await NOMINATIM_LIMITER.acquire()
+    except PlazoExcedido as e:
+        # Not cached: the place may well exist
+        return {"success": False, "error": str(e)}
+    registrar_espera("nominatim", time.perf_counter() - start)
+    result = await _geocode(location)
+    if result.get("success"):
+        geocode_cache().guardar(key, json.dumps(result))
+    elif result.get("error") == GEOCODE_NOT_FOUND:
+        # Negative caching only for a search that answered with no hits;
+        # HTTP and transport errors are not cached
+        geocode_cache().guardar(key, json.dumps(result), ttl=GEOCODE_NEGATIVE_TTL)
+    return result
+
+@instrumentar("herramienta", "get_position")
+async def _get_position(location: str) -> Dict[str, Any]:
+    key = normalize_place(location)
+    cached = geocode_cache().obtener(key)
+    anotar(cache_hit=cached is not None)
+    if cached is not None:
+        return json.loads(cached)
+    return await _geocode_and_store(location, key)
+
+async def _get_positions(locations: List[str]) -> Dict[str, Any]:
+    # Dedupe by normalised name, keeping the first spelling of each place
+    unique: Dict[str, str] = {}
+    for location in locations:
+        unique.setdefault(normalize_place(location), location)
+    by_key: Dict[str, Dict[str, Any]] = {}
+    misses = []
+    for key, location in unique.items():
+        cached = geocode_cache().obtener(key)
+        if cached is not None:
+            by_key[key] = json.loads(cached)
+        else:
+            misses.append(key)
+    # Misses queue on the Nominatim limiter (1 request/second)
+    found = await asyncio.gather(*(_geocode_and_store(unique[key], key) for key in misses))
+    by_key.update(zip(misses, found))
+    hits = len(unique) - len(misses)
+    return {
+        "success": True,
+        "results": [dict(by_key[normalize_place(location)], query=location) for location in locations],
+        "unique_locations": len(unique),
+        "cache_hits": hits,
+        "cache_hit_ratio": hits / len(unique) if unique else 0.0
+    }
+
+@tool
+async def get_position_async(location: str) -> Dict[str, Any]:
+    """Get latitude and longitude coordinates for a given location name (async)
+    
+    Args:
+        location: The name of the location to get coordinates for
+        
+    Returns:
+        Dictionary containing coordinates and location information
+    """
+    return await _get_position(location)
+
 @tool
 def get_position(location: str) -> Dict[str, Any]:
     """Get latitude and longitude coordinates for a given location name
@@ -164,43 +606,142 @@ def get_position(location: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing coordinates and location information
     """
-    try:
-        # Using OpenStreetMap Nominatim API for geocoding
-        async def fetch_coordinates():
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "https://nominatim.openstreetmap.org/search",
-                    params={
-                        "q": location,
-                        "format": "json",
-                        "limit": 1
-                    },
-                    headers={
-                        "User-Agent": "StrandsAgents/1.0",
-                        "Accept": "application/json",
-                        "Accept-Charset": "utf-8"
-                    },
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200: 
-                    data = response.json()  
-                    if data:
-                        result = data[0]
-                        return {
-                            "success": True,
-                            "latitude": float(result["lat"]),
-                            "longitude": float(result["lon"]),
-                            "display_name": result.get("display_name", location)
-                        }
-                
-                return {"success": False, "error": "Location not found"}
+    return ejecutar_sync(_get_position(location))
+
+@tool
+async def get_positions_async(locations: List[str]) -> Dict[str, Any]:
+    """Geocode many location names at once (async)
+    
+    Args:
+        locations: Location names; duplicates are looked up only once
         
-        # Execute async function
-        return asyncio.run(fetch_coordinates())
+    Returns:
+        Dictionary with one result per input location (in input order)
+        and the cache hit ratio
+    """
+    return await _get_positions(locations)
+
+@tool
+def get_positions(locations: List[str]) -> Dict[str, Any]:
+    """Geocode many location names at once
+    
+    Args:
+        locations: Location names; duplicates are looked up only once
         
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    Returns:
+        Dictionary with one result per input location (in input order)
+        and the cache hit ratio
+    """
+    return ejecutar_sync(_get_positions(locations))
+
+FEDERATED_BUDGET = 8.0   # seconds: whatever has arrived by then is returned
+_TRACKING_PREFIXES = ("utm_", "mc_")
+_TRACKING_PARAMS = {"gclid", "fbclid", "ref"}
+
+def normalize_url(url: str) -> str:
+    """Dedupe key for a URL: same page regardless of scheme, www, tracking params or trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not (k.lower().startswith(_TRACKING_PREFIXES) or k.lower() in _TRACKING_PARAMS))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("", host, path, urlencode(query), ""))
+
+async def _federated_backend(source: str, query: str) -> List[Dict[str, Any]]:
+    if source == "tavily":
+        data = await _tavily_raw(query)
+        hits = [{"title": r["title"], "url": r["url"], "snippet": r["content"][:300]} for r in data["results"]]
+        if data["answer"]:
+            hits.insert(0, {"title": "Respuesta Tavily", "url": "", "snippet": data["answer"]})
+        return hits
+    result = await (_duckduckgo_search(query) if source == "duckduckgo" else _wikipedia_search(query, race=True))
+    if not result.get("success"):
+        raise RuntimeError(result.get("error", "No results found"))
+    return [{"title": result["title"], "url": result.get("url", ""), "snippet": result["summary"][:300]}]
+
+@instrumentar("herramienta", "federated_search")
+async def _federated_search(query: str, budget: float = FEDERATED_BUDGET) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    sources = ["tavily", "duckduckgo", "wikipedia"]
+    arrival: List[str] = []
+    elapsed: Dict[str, float] = {}
+
+    async def timed(source: str) -> List[Dict[str, Any]]:
+        # Completion time recorded by the backend itself, measured from the fan-out start:
+        # a done-callback may not have run yet when asyncio.wait returns on the budget
+        try:
+            return await _federated_backend(source, query)
+        finally:
+            elapsed[source] = loop.time() - start
+            arrival.append(source)
+
+    tasks = {}
+    # Past the request deadline nothing is launched; a shorter remaining deadline trims the budget
+    wait = acotar(budget)
+    timeout_status = "timeout" if wait >= budget else PLAZO_EXCEDIDO
+    for source in sources:
+        tasks[source] = asyncio.create_task(timed(source))
+    await asyncio.wait(tasks.values(), timeout=wait)
+
+    backends: Dict[str, Dict[str, Any]] = {}
+    merged: Dict[str, Dict[str, Any]] = {}
+    for source in list(arrival) + [s for s in sources if s not in arrival]:
+        task = tasks[source]
+        if not task.done():
+            task.cancel()
+            backends[source] = {"status": timeout_status, "latency": round(wait, 3)}
+            continue
+        latency = round(elapsed.get(source, loop.time() - start), 3)
+        if task.cancelled() or task.exception() is not None:
+            error = "cancelled" if task.cancelled() else str(task.exception())
+            backends[source] = {"status": "error", "latency": latency, "error": error}
+            continue
+        hits = task.result()
+        backends[source] = {"status": "ok", "latency": latency, "count": len(hits)}
+        for hit in hits:
+            # Hits without URL (e.g. Tavily's direct answer) are never merged
+            key = normalize_url(hit["url"]) if hit["url"] else f"{source}:{hit['title']}"
+            if key in merged:
+                merged[key]["sources"].append(source)
+            else:
+                merged[key] = dict(hit, source=source, sources=[source], latency=latency)
+    return {
+        "success": bool(merged),
+        "query": query,
+        "results": list(merged.values()),
+        "backends": backends
+    }
+
+@tool
+async def federated_search_async(query: str, budget: float = FEDERATED_BUDGET) -> Dict[str, Any]:
+    """Search Tavily, DuckDuckGo and Wikipedia concurrently within a latency budget (async)
+    
+    Args:
+        query: Search query
+        budget: Seconds to wait; backends that have not answered are dropped
+        
+    Returns:
+        Dictionary with merged results (deduplicated by URL, tagged with
+        source and latency) and the status of each backend
+    """
+    return await _federated_search(query, budget)
+
+@tool
+def federated_search(query: str, budget: float = FEDERATED_BUDGET) -> Dict[str, Any]:
+    """Search Tavily, DuckDuckGo and Wikipedia concurrently within a latency budget
+    
+    Args:
+        query: Search query
+        budget: Seconds to wait; backends that have not answered are dropped
+        
+    Returns:
+        Dictionary with merged results (deduplicated by URL, tagged with
+        source and latency) and the status of each backend
+    """
+    return ejecutar_sync(_federated_search(query, budget))
  
  
 
@@ -229,6 +770,18 @@ if __name__ == "__main__":
     result=get_position('Guatapé, Antioquia')
     print(result)
 
+    print("\n📚 Batch positions test")
+    result=get_positions(['Guatapé, Antioquia', 'guatape antioquia', 'Medellín'])
+    print(result)
+
     print('\nConsulta de Tavily')
     result=tavily_search('Universidad Pontificia Bolivariana')
     print(result)
+
+    print('\nBúsqueda federada')
+    result=federated_search('Universidad Pontificia Bolivariana')
+    print(result)
+
+    print('\nConsultas de Tavily en lote')
+    result=tavily_search_many(['Universidad Pontificia Bolivariana', 'Universidad Pontificia Bolivariana', 'Universidad de Antioquia'])
+    print(result)
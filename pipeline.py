@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de pipelines de agentes declarativos.
+
+Un pipeline es un DAG de pasos (agentes) y compuertas (predicados sobre la
+salida tipada de un paso, como OutlineCheckerOutput.good_quality). Al crearlo
+se valida el grafo; al ejecutarlo, las ramas independientes corren en paralelo,
+cada paso tiene su timeout (recortado al plazo de la solicitud, ver plazo.py)
+y, si una compuerta no se cumple, todo lo que depende de ella se omite.
+ejecutar_muchos pasa muchas entradas por el mismo pipeline con concurrencia
+acotada.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from agents import Agent, Runner
+
+from concurrencia import ejecutar_acotado
+from plazo import PLAZO_EXCEDIDO, PlazoExcedido, esperar
+
+
+@dataclass
+class Paso:
+    """
+    Corre un agente. `entrada` construye su input a partir de las salidas ya
+    disponibles ({"entrada": entrada_del_pipeline, nombre_paso: salida, ...});
+    por defecto usa la salida del primer paso del que depende, o la entrada
+    del pipeline si no depende de ningún paso.
+    """
+    nombre: str
+    agente: Agent
+    depende_de: List[str] = field(default_factory=list)
+    entrada: Optional[Callable[[Dict[str, Any]], Any]] = None
+    timeout: float = 60
+
+
+@dataclass
+class Compuerta:
+    """Deja pasar el flujo solo si predicado(salida del paso `paso`) es verdadero."""
+    nombre: str
+    paso: str
+    predicado: Callable[[Any], bool]
+    mensaje: str = ""
+    tipo: Optional[type] = None   # si se indica, la salida debe ser de este tipo
+
+    @property
+    def depende_de(self) -> List[str]:
+        return [self.paso]
+
+
+@dataclass
+class ResultadoPipeline:
+    entrada: Any
+    salidas: Dict[str, Any] = field(default_factory=dict)
+    estados: Dict[str, str] = field(default_factory=dict)    # ok, detenido, omitido, error, timeout, plazo_excedido
+    errores: Dict[str, str] = field(default_factory=dict)
+    tiempos: Dict[str, float] = field(default_factory=dict)
+    detenido_por: Optional[str] = None                      # mensaje de la primera compuerta cerrada
+
+    @property
+    def completo(self) -> bool:
+        return all(estado == "ok" for estado in self.estados.values())
+
+
+class PipelineError(Exception):
+    pass
+
+
+class Pipeline:
+    def __init__(self, nodos: List[Union[Paso, Compuerta]]):
+        self.nodos = {n.nombre: n for n in nodos}
+        if len(self.nodos) != len(nodos):
+            raise PipelineError("Hay nombres de pasos repetidos en el pipeline.")
+        for nodo in nodos:
+            for dep in nodo.depende_de:
+                if dep not in self.nodos:
+                    raise PipelineError(f"'{nodo.nombre}' depende de '{dep}', que no existe.")
+        self.orden = self._orden_topologico()
+
+    def _orden_topologico(self) -> List[str]:
+        pendientes = {nombre: set(n.depende_de) for nombre, n in self.nodos.items()}
+        orden = []
+        while pendientes:
+            listos = [nombre for nombre, deps in pendientes.items() if not deps]
+            if not listos:
+                raise PipelineError(f"El pipeline tiene un ciclo entre: {sorted(pendientes)}")
+            for nombre in listos:
+                orden.append(nombre)
+                del pendientes[nombre]
+            for deps in pendientes.values():
+                deps.difference_update(listos)
+        return orden
+
+    def _entrada_de(self, paso: Paso, disponibles: Dict[str, Any]) -> Any:
+        if paso.entrada is not None:
+            return paso.entrada(disponibles)
+        for dep in paso.depende_de:
+            if isinstance(self.nodos[dep], Paso):
+                return disponibles[dep]
+        return disponibles["entrada"]
+
+    async def ejecutar(self, entrada: Any) -> ResultadoPipeline:
+        """Ejecuta el pipeline para una entrada; las ramas independientes corren en paralelo."""
+        resultado = ResultadoPipeline(entrada)
+        disponibles: Dict[str, Any] = {"entrada": entrada}
+        loop = asyncio.get_running_loop()
+        tareas: Dict[str, asyncio.Task] = {}
+
+        async def correr(nombre: str) -> bool:
+            nodo = self.nodos[nombre]
+            deps_ok = await asyncio.gather(*(tareas[d] for d in nodo.depende_de))
+            if not all(deps_ok):
+                resultado.estados[nombre] = "omitido"
+                return False
+            t0 = loop.time()
+            try:
+                if isinstance(nodo, Compuerta):
+                    salida = disponibles[nodo.paso]
+                    if nodo.tipo is not None and not isinstance(salida, nodo.tipo):
+                        raise TypeError(f"se esperaba {nodo.tipo.__name__} y llegó {type(salida).__name__}")
+                    if not nodo.predicado(salida):
+                        resultado.estados[nombre] = "detenido"
+                        return False
+                else:
+                    run = await esperar(Runner.run(nodo.agente, self._entrada_de(nodo, disponibles)), nodo.timeout)
+                    disponibles[nombre] = resultado.salidas[nombre] = run.final_output
+                resultado.estados[nombre] = "ok"
+                return True
+            except PlazoExcedido:
+                resultado.estados[nombre] = PLAZO_EXCEDIDO
+                return False
+            except asyncio.TimeoutError:
+                resultado.estados[nombre] = "timeout"
+                return False
+            except Exception as e:
+                resultado.estados[nombre] = "error"
+                resultado.errores[nombre] = repr(e)
+                return False
+            finally:
+                resultado.tiempos[nombre] = loop.time() - t0
+
+        for nombre in self.orden:
+            tareas[nombre] = asyncio.create_task(correr(nombre))
+        try:
+            await asyncio.gather(*tareas.values())
+        finally:
+            for tarea in tareas.values():
+                tarea.cancel()
+        # Se informa la primera compuerta cerrada en el orden en que se declararon
+        for nombre, nodo in self.nodos.items():
+            if resultado.estados.get(nombre) == "detenido":
+                resultado.detenido_por = nodo.mensaje or f"Compuerta '{nombre}' no superada"
+                break
+        return resultado
+
+    async def ejecutar_muchos(self, entradas: List[Any], limite: int = 10) -> List[ResultadoPipeline]:
+        """Pasa muchas entradas por el pipeline, a lo sumo `limite` a la vez; resultados en orden de entrada."""
+        fabricas = [lambda e=e: self.ejecutar(e) for e in entradas]
+        resultados: List[Optional[ResultadoPipeline]] = [None] * len(entradas)
+        async for i, resultado, tiempo in ejecutar_acotado(fabricas, limite):
+            if tiempo.error:
+                resultado = ResultadoPipeline(entradas[i], errores={"pipeline": tiempo.error})
+            resultados[i] = resultado
+        return resultados
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Plazo (deadline) de extremo a extremo para una solicitud.
+
+Sin un plazo común, cada paso tiene su propio timeout fijo: una cascada de tres
+agentes con 30 s cada uno puede tardar 90 s, y las llamadas HTTP de las
+herramientas no saben cuánto le queda a la solicitud. Aquí el instante límite
+vive en una ContextVar: las tareas que crea asyncio (etapas de la cascada,
+herramientas que corre el Runner) lo heredan, y ejecutar_sync (web_fetch) lo
+pasa al event loop de fondo. Cada paso espera con min(su timeout, lo que
+queda) y, al vencer el plazo, se cancela lo que está en curso (incluidas las
+peticiones HTTP) con PlazoExcedido, para que el llamador devuelva lo que ya
+tenga con estado PLAZO_EXCEDIDO en vez de fallar con una excepción genérica.
+
+Uso:
+    with con_plazo(60):
+        resultado = await ejecutar_cascada(etapas)       # cada etapa recibe lo que quede
+        informe = await esperar(Runner.run(agente, entrada), 30)
+"""
+import asyncio, contextlib, contextvars, time
+from typing import Any, Awaitable, Optional
+
+PLAZO_EXCEDIDO = "plazo_excedido"
+
+# Instante límite en time.monotonic() (válido entre hilos y event loops), o None sin plazo
+_limite: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("agentes_plazo", default=None)
+
+
+class PlazoExcedido(TimeoutError):
+    """Se agotó el plazo total de la solicitud."""
+
+    def __init__(self, mensaje: str = "se agotó el plazo de la solicitud"):
+        super().__init__(f"{PLAZO_EXCEDIDO}: {mensaje}")
+
+
+def limite() -> Optional[float]:
+    return _limite.get()
+
+
+def restante() -> Optional[float]:
+    """Segundos que le quedan al plazo vigente (0 si venció), o None si no hay plazo."""
+    instante = _limite.get()
+    return None if instante is None else max(0.0, instante - time.monotonic())
+
+
+def agotado() -> bool:
+    queda = restante()
+    return queda is not None and queda <= 0
+
+
+@contextlib.contextmanager
+def fijar_limite(instante: Optional[float]):
+    """Usa `instante` (time.monotonic()) como límite dentro del bloque; None quita el plazo."""
+    token = _limite.set(instante)
+    try:
+        yield
+    finally:
+        _limite.reset(token)
+
+
+@contextlib.contextmanager
+def con_plazo(segundos: Optional[float]):
+    """Plazo de `segundos` desde ahora para el bloque; nunca alarga un plazo ya vigente."""
+    instante = None if segundos is None else time.monotonic() + segundos
+    actual = _limite.get()
+    if actual is not None and (instante is None or actual < instante):
+        instante = actual
+    with fijar_limite(instante):
+        yield
+
+
+def sin_plazo() -> contextvars.Context:
+    """Copia del contexto actual sin plazo, para tareas compartidas por varios llamadores."""
+    contexto = contextvars.copy_context()
+    contexto.run(_limite.set, None)
+    return contexto
+
+
+def acotar(timeout: Optional[float]) -> Optional[float]:
+    """min(timeout, lo que queda del plazo); PlazoExcedido si ya no queda tiempo."""
+    queda = restante()
+    if queda is None:
+        return timeout
+    if queda <= 0:
+        raise PlazoExcedido()
+    return queda if timeout is None else min(timeout, queda)
+
+
+async def esperar(aguardable: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Espera `aguardable` a lo sumo min(timeout, lo que queda del plazo) y lo
+    cancela si no termina. Lanza PlazoExcedido si lo que venció fue el plazo y
+    asyncio.TimeoutError si fue el timeout propio del paso.
+    """
+    try:
+        tiempo = acotar(timeout)
+    except PlazoExcedido:
+        if asyncio.iscoroutine(aguardable):
+            aguardable.close()
+        raise
+    if tiempo is None:
+        return await aguardable
+    # El plazo es el que manda si recortó el timeout propio del paso
+    por_plazo = timeout is None or tiempo < timeout
+    limite_espera = asyncio.timeout(tiempo)
+    try:
+        async with limite_espera:
+            return await aguardable
+    except TimeoutError:
+        # Un TimeoutError de más adentro (otro paso, otro plazo) se propaga tal cual
+        if limite_espera.expired() and (por_plazo or agotado()):
+            raise PlazoExcedido() from None
+        raise
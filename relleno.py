@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Relleno de campos faltantes en respuestas tipadas.
+
+Cuando una respuesta (por ejemplo Respuesta_marcas) falla la validación por
+uno o dos campos vacíos, no hace falta pedirle todo de nuevo al agente de
+respaldo: se calcula qué campos faltan, se arma con pydantic.create_model un
+output_type que solo tiene esos campos, se le pide al agente únicamente eso
+(dándole lo que ya se sabe como contexto) y se mezcla con la respuesta parcial.
+La salida del modelo es mucho más corta y la llamada más rápida.
+"""
+import functools, json
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, create_model
+from agents import Agent
+
+from cache_agentes import CacheRespuestas, ejecutar_con_cache
+
+
+def _vacio(valor: Any) -> bool:
+    if valor is None:
+        return True
+    if isinstance(valor, (str, list, dict, tuple, set)):
+        return len(valor) == 0
+    return False
+
+
+def campos_faltantes(respuesta: BaseModel) -> List[str]:
+    """Campos del modelo que quedaron vacíos (None, texto vacío o lista vacía)."""
+    return [nombre for nombre in type(respuesta).model_fields if _vacio(getattr(respuesta, nombre))]
+
+
+@functools.lru_cache(maxsize=64)
+def modelo_parcial(modelo: Type[BaseModel], campos: Tuple[str, ...]) -> Type[BaseModel]:
+    """Modelo con solo `campos`, con los mismos tipos y descripciones que `modelo`."""
+    definiciones = {nombre: (modelo.model_fields[nombre].annotation, modelo.model_fields[nombre])
+                    for nombre in campos}
+    return create_model(f"{modelo.__name__}_faltantes", **definiciones)
+
+
+# Los Agent no son hashables: se indexan por id y se guarda el original para verificarlo
+_agentes_relleno: Dict[Tuple[int, Tuple[str, ...]], Tuple[Agent, Agent]] = {}
+
+
+def _agente_relleno(agente: Agent, modelo: Type[BaseModel], campos: Tuple[str, ...]) -> Agent:
+    clave = (id(agente), campos)
+    original, relleno = _agentes_relleno.get(clave, (None, None))
+    if original is not agente or relleno.output_type is not modelo_parcial(modelo, campos):
+        # Mismo modelo, instrucciones y herramientas; solo cambia la salida esperada
+        relleno = agente.clone(name=f"{agente.name} (relleno)", output_type=modelo_parcial(modelo, campos))
+        _agentes_relleno[clave] = (agente, relleno)
+    return relleno
+
+
+def entrada_relleno(pregunta: str, parcial: BaseModel, campos: List[str]) -> str:
+    conocidos = {k: v for k, v in parcial.model_dump().items() if k not in campos}
+    return (f"{pregunta}\n\n"
+            f"Ya se conocen estos datos (no los repitas):\n{json.dumps(conocidos, ensure_ascii=False, indent=2)}\n\n"
+            f"Completa ÚNICAMENTE los campos: {', '.join(campos)}.")
+
+
+async def rellenar(agente: Agent, pregunta: str, parcial: BaseModel,
+                   cache: Optional[CacheRespuestas] = None) -> BaseModel:
+    """
+    Pide al agente solo los campos vacíos de `parcial` y devuelve la respuesta
+    completa mezclada (los campos que ya tenían valor no se tocan).
+    """
+    campos = campos_faltantes(parcial)
+    if not campos:
+        return parcial
+    print(f"Se completan solo los campos faltantes con '{agente.name}': {campos}")
+    modelo = type(parcial)
+    relleno = _agente_relleno(agente, modelo, tuple(campos))
+    # Un relleno que deja campos vacíos no se guarda, para que el reintento no lo repita
+    salida = await ejecutar_con_cache(relleno, entrada_relleno(pregunta, parcial, campos), cache,
+                                      guardar_si=lambda s: not campos_faltantes(s))
+    return parcial.model_copy(update={nombre: getattr(salida, nombre) for nombre in campos})
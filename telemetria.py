@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación OpenTelemetry de agentes, llamadas al modelo y herramientas.
+
+Emite spans e histogramas de latencia por corrida de agente, llamada al modelo
+(con tokens de entrada y salida), herramienta (fetch_url, tavily_search,
+get_position, ...) y paso de validación, además de la espera en colas
+(semáforos y limitadores). Sin configurar nada, la API de OpenTelemetry no hace
+nada y el costo es despreciable; configurar() activa la exportación:
+  - OTLP, si está definida OTEL_EXPORTER_OTLP_ENDPOINT y está instalado
+    opentelemetry-exporter-otlp;
+  - un archivo JSONL local, con AGENTES_TELEMETRIA_ARCHIVO=ruta.
+"""
+import functools, inspect, json, os, time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+
+from opentelemetry import context as otel_context, metrics, trace
+from opentelemetry.trace import Status, StatusCode
+
+from agents import add_trace_processor
+from agents.tracing import TracingProcessor
+
+tracer = trace.get_tracer("agentes1")
+meter = metrics.get_meter("agentes1")
+
+duracion = meter.create_histogram("agentes.duracion", unit="s",
+                                  description="Duración por tipo de operación (agente, modelo, herramienta, validacion)")
+espera_cola = meter.create_histogram("agentes.espera_cola", unit="s",
+                                     description="Tiempo esperando un cupo (semáforo, límite de tasa)")
+tokens = meter.create_counter("agentes.tokens", unit="{token}",
+                              description="Tokens consumidos por el modelo, por dirección (entrada/salida)")
+
+_configurado = False
+
+
+def configurar(nombre_servicio: str = "agentes1", archivo: Optional[str] = None) -> bool:
+    """
+    Configura los proveedores de trazas y métricas y registra el procesador de
+    trazas del SDK de agentes. Devuelve False (sin hacer nada) si no hay destino.
+    """
+    global _configurado
+    if _configurado:
+        return True
+    archivo = archivo or os.getenv("AGENTES_TELEMETRIA_ARCHIVO")
+    otlp = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if not archivo and not otlp:
+        return False
+
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import ConsoleMetricExporter, PeriodicExportingMetricReader
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if otlp:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            exportador_spans, exportador_metricas = OTLPSpanExporter(), OTLPMetricExporter()
+        except ImportError:
+            print("opentelemetry-exporter-otlp no está instalado; se usa el archivo local")
+            otlp = None
+            archivo = archivo or "telemetria.jsonl"
+    if not otlp:
+        salida = open(archivo, "a", encoding="utf-8")
+        exportador_spans = ConsoleSpanExporter(out=salida, formatter=lambda s: s.to_json(indent=None) + "\n")
+        exportador_metricas = ConsoleMetricExporter(out=salida, formatter=lambda m: m.to_json(indent=None) + "\n")
+
+    recurso = Resource.create({"service.name": nombre_servicio})
+    proveedor_trazas = TracerProvider(resource=recurso)
+    proveedor_trazas.add_span_processor(BatchSpanProcessor(exportador_spans))
+    trace.set_tracer_provider(proveedor_trazas)
+    metrics.set_meter_provider(MeterProvider(
+        resource=recurso,
+        metric_readers=[PeriodicExportingMetricReader(exportador_metricas, export_interval_millis=10_000)],
+    ))
+    add_trace_processor(ProcesadorOTel())
+    _configurado = True
+    return True
+
+
+@contextmanager
+def medir(tipo: str, nombre: str, **atributos):
+    """Span + histograma de duración para un bloque (herramienta, validación, ...)."""
+    atributos = {"agentes.tipo": tipo, "agentes.nombre": nombre, **atributos}
+    inicio = time.perf_counter()
+    with tracer.start_as_current_span(f"{tipo} {nombre}", attributes=atributos) as span:
+        try:
+            yield span
+        except BaseException as e:
+            span.set_status(Status(StatusCode.ERROR, repr(e)))
+            duracion.record(time.perf_counter() - inicio, {**atributos, "agentes.error": True})
+            raise
+        duracion.record(time.perf_counter() - inicio, {**atributos, "agentes.error": False})
+
+
+def instrumentar(tipo: str, nombre: Optional[str] = None):
+    """Decorador de medir() para funciones (sync o async)."""
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__name__.lstrip("_")
+        if inspect.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura(*args, **kwargs):
+                with medir(tipo, etiqueta):
+                    return await funcion(*args, **kwargs)
+        else:
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with medir(tipo, etiqueta):
+                    return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def registrar_espera(cola: str, segundos: float):
+    """Tiempo que una operación esperó un cupo antes de ejecutarse."""
+    espera_cola.record(segundos, {"agentes.cola": cola})
+    trace.get_current_span().set_attribute("agentes.espera_cola", segundos)
+
+
+@asynccontextmanager
+async def cupo(semaforo, cola: str):
+    """async with semaforo, registrando cuánto se esperó el cupo."""
+    inicio = time.perf_counter()
+    async with semaforo:
+        registrar_espera(cola, time.perf_counter() - inicio)
+        yield
+
+
+def anotar(**atributos):
+    """Agrega atributos al span actual (por ejemplo, si hubo acierto de caché)."""
+    span = trace.get_current_span()
+    for clave, valor in atributos.items():
+        span.set_attribute(f"agentes.{clave}", valor)
+
+
+def evento(nombre: str, **atributos):
+    """Evento con marca de tiempo en el span actual (p. ej. una etapa lanzada en paralelo)."""
+    trace.get_current_span().add_event(nombre, {f"agentes.{clave}": valor for clave, valor in atributos.items()})
+
+
+def registrar_tokens(span, modelo: str, entrada: Optional[int], salida: Optional[int]):
+    for direccion, cantidad in (("entrada", entrada), ("salida", salida)):
+        if cantidad:
+            tokens.add(cantidad, {"agentes.modelo": modelo, "agentes.direccion": direccion})
+            span.set_attribute(f"agentes.tokens_{direccion}", cantidad)
+
+
+def _uso(datos) -> Dict[str, Any]:
+    """Modelo y tokens de un span del SDK de agentes (generation o response)."""
+    if datos.type == "generation":
+        uso = datos.usage or {}
+        return {"modelo": datos.model or "", "entrada": uso.get("input_tokens"), "salida": uso.get("output_tokens")}
+    respuesta = getattr(datos, "response", None)
+    uso = getattr(respuesta, "usage", None)
+    return {
+        "modelo": getattr(respuesta, "model", "") or "",
+        "entrada": getattr(uso, "input_tokens", None),
+        "salida": getattr(uso, "output_tokens", None),
+    }
+
+
+class ProcesadorOTel(TracingProcessor):
+    """
+    Traduce las trazas del SDK de agentes a spans de OpenTelemetry: corridas de
+    agente, llamadas al modelo (con tokens) y llamadas a function tools. Cada
+    span queda como span actual de OpenTelemetry hasta que termina, así que lo
+    que medir() o instrumentar() abren dentro de una herramienta (fetch, búsqueda,
+    geocodificación) cuelga de la herramienta y del agente que la llamó.
+    """
+
+    _TIPOS = {"agent": "agente", "generation": "modelo", "response": "modelo",
+              "function": "herramienta", "handoff": "handoff", "guardrail": "guardrail"}
+
+    def __init__(self):
+        self._spans: Dict[str, Any] = {}
+        self._inicios: Dict[str, float] = {}
+        self._contextos: Dict[str, object] = {}     # token de otel_context.attach por span
+
+    def _iniciar(self, clave: str, nombre: str, padre: Optional[str], atributos: dict):
+        contexto = trace.set_span_in_context(self._spans[padre]) if padre in self._spans else None
+        otel = self._spans[clave] = tracer.start_span(nombre, context=contexto, attributes=atributos)
+        self._inicios[clave] = time.perf_counter()
+        # El SDK abre y cierra cada span en la misma tarea, como un bloque with
+        self._contextos[clave] = otel_context.attach(trace.set_span_in_context(otel))
+
+    def _soltar(self, clave: str):
+        token = self._contextos.pop(clave, None)
+        if token is not None:
+            otel_context.detach(token)
+
+    def on_trace_start(self, traza):
+        self._iniciar(traza.trace_id, f"flujo {traza.name}", None, {"agentes.tipo": "flujo"})
+
+    def on_trace_end(self, traza):
+        span = self._spans.pop(traza.trace_id, None)
+        self._inicios.pop(traza.trace_id, None)
+        self._soltar(traza.trace_id)
+        if span is not None:
+            span.end()
+
+    def on_span_start(self, span):
+        datos = span.span_data
+        tipo = self._TIPOS.get(datos.type, datos.type)
+        nombre = getattr(datos, "name", None) or datos.type
+        self._iniciar(span.span_id, f"{tipo} {nombre}", span.parent_id or span.trace_id,
+                      {"agentes.tipo": tipo, "agentes.nombre": nombre})
+
+    def on_span_end(self, span):
+        otel = self._spans.pop(span.span_id, None)
+        inicio = self._inicios.pop(span.span_id, None)
+        self._soltar(span.span_id)
+        if otel is None:
+            return
+        datos = span.span_data
+        tipo = self._TIPOS.get(datos.type, datos.type)
+        atributos = {"agentes.tipo": tipo, "agentes.nombre": getattr(datos, "name", None) or datos.type,
+                     "agentes.error": span.error is not None}
+        if tipo == "modelo":
+            uso = _uso(datos)
+            atributos["agentes.modelo"] = uso["modelo"]
+            registrar_tokens(otel, uso["modelo"], uso["entrada"], uso["salida"])
+        if span.error is not None:
+            otel.set_status(Status(StatusCode.ERROR, json.dumps(span.error, default=str)))
+        duracion.record(time.perf_counter() - inicio, atributos)
+        otel.end()
+
+    def shutdown(self):
+        for span in self._spans.values():
+            span.end()
+        self._spans.clear()
+        self._contextos.clear()
+
+    def force_flush(self):
+        proveedor = trace.get_tracer_provider()
+        if hasattr(proveedor, "force_flush"):
+            proveedor.force_flush()
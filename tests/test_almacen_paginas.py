@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip("numpy")
+
+from almacen_paginas import AlmacenPaginas
+
+PLANTILLA = ("Maestría en {programa}. Facultad de {facultad}. Duración: cuatro semestres. "
+             "Modalidad presencial en la sede de Medellín. Inscripciones abiertas hasta el {fecha}. "
+             "El programa forma investigadores y profesionales con capacidad de liderar proyectos "
+             "en el sector público y privado, con énfasis en la región y en el trabajo interdisciplinario. "
+             "Valor del semestre: {precio} pesos. Requisitos: título profesional y entrevista. ")
+# Cuerpo largo común: entre páginas de la plantilla el SimHash cambia en uno o dos bits
+CURSOS = " ".join(f"El curso {i} trata temas de gestión, análisis y diseño de sistemas aplicados al territorio."
+                  for i in range(40))
+
+
+def pagina(programa="Ingeniería", facultad="Minas", fecha="30 de junio", precio="9.500.000"):
+    return PLANTILLA.format(programa=programa, facultad=facultad, fecha=fecha, precio=precio) + CURSOS
+
+
+def test_refetch_of_the_same_url_stores_the_new_text(tmp_path):
+    # Tras la vigencia, la URL vuelve a descargarse con una fecha cambiada:
+    # se guarda y se sirve el texto nuevo, no el registro vencido
+    almacen = AlmacenPaginas(str(tmp_path), vigencia=0)
+    url = "https://u.example/maestria"
+    viejo = almacen.guardar(url, pagina(), 4000, True)
+    nuevo = almacen.guardar(url, pagina(fecha="15 de diciembre"), 4000, True)
+
+    assert nuevo != viejo
+    almacen.vigencia = 3600
+    assert "15 de diciembre" in almacen.obtener(url, 4000)
+    assert almacen.duplicadas == 0
+
+
+def test_template_pages_on_different_urls_do_not_merge(tmp_path):
+    almacen = AlmacenPaginas(str(tmp_path))
+    a = almacen.guardar("https://u.example/ingenieria", pagina(), 4000, True)
+    b = almacen.guardar("https://u.example/geologia",
+                        pagina(programa="Geología", facultad="Ciencias"), 4000, True)
+
+    assert a != b
+    assert "Geología" in almacen.obtener("https://u.example/geologia", 4000)
+
+
+def test_mirror_on_another_url_points_to_the_stored_text(tmp_path):
+    almacen = AlmacenPaginas(str(tmp_path))
+    original = almacen.guardar("https://u.example/maestria", pagina(), 4000, True)
+    espejo = almacen.guardar("https://espejo.example/maestria", pagina().upper(), 4000, True)
+
+    assert espejo == original
+    assert almacen.duplicadas == 1
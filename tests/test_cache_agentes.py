@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import asyncio, types
+
+import pytest
+
+pytest.importorskip("agents")
+
+from agents import Agent, ModelSettings, RunConfig
+
+import cache_agentes
+from cache_agentes import CacheRespuestas, ejecutar_con_cache
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    # Runner falso: responde "respuesta N" en la N-ésima llamada y anota los kwargs
+    llamadas = []
+
+    async def run(agente, entrada, **kwargs):
+        llamadas.append(kwargs)
+        return types.SimpleNamespace(final_output=f"respuesta {len(llamadas)}")
+
+    monkeypatch.setattr(cache_agentes, "Runner", types.SimpleNamespace(run=run))
+    return llamadas
+
+
+def agente():
+    return Agent(name="a", instructions="responde", model="gpt-4.1",
+                 model_settings=ModelSettings(temperature=0.0))
+
+
+def test_rejected_answer_is_not_cached(tmp_path, runner):
+    cache = CacheRespuestas(str(tmp_path / "r.sqlite"))
+    a = agente()
+
+    async def correr():
+        primera = await ejecutar_con_cache(a, "pregunta", cache, guardar_si=lambda salida: False)
+        segunda = await ejecutar_con_cache(a, "pregunta", cache, guardar_si=lambda salida: True)
+        tercera = await ejecutar_con_cache(a, "pregunta", cache)
+        return primera, segunda, tercera
+
+    assert asyncio.run(correr()) == ("respuesta 1", "respuesta 2", "respuesta 2")
+    assert len(runner) == 2
+
+
+def test_run_config_model_is_part_of_the_key(tmp_path, runner):
+    cache = CacheRespuestas(str(tmp_path / "r.sqlite"))
+    a = agente()
+
+    async def correr():
+        return [await ejecutar_con_cache(a, "pregunta", cache, **kwargs) for kwargs in (
+            {},
+            {"run_config": RunConfig(model="gpt-4.1-mini")},
+            {"run_config": RunConfig(model_settings=ModelSettings(temperature=0.7))},
+            {"run_config": RunConfig(model="gpt-4.1-mini")},
+            {"run_config": RunConfig()},
+        )]
+
+    assert asyncio.run(correr()) == ["respuesta 1", "respuesta 2", "respuesta 3", "respuesta 2", "respuesta 1"]
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import asyncio, time
+
+import pytest
+
+pytest.importorskip("agents")
+
+from cascada import Etapa, ejecutar_cascada
+
+
+def test_hedge_winner_cancels_and_awaits_the_slow_stage():
+    # La etapa lenta queda cancelada y terminada cuando la cascada devuelve
+    cerrada = []
+
+    async def lenta():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            cerrada.append(True)
+
+    async def rapida():
+        return "respuesta"
+
+    async def correr():
+        resultado = await ejecutar_cascada([Etapa("barata", lenta), Etapa("respaldo", rapida)],
+                                           retardo_cobertura=0.05)
+        return resultado, cerrada[:]
+
+    resultado, cerrada_al_volver = asyncio.run(correr())
+    assert resultado.valor == "respuesta" and resultado.etapa == "respaldo"
+    assert resultado.etapas_lanzadas == ["barata", "respaldo"]
+    assert cerrada_al_volver == [True]
+
+
+def test_last_stage_hanging_past_the_deadline_returns_plazo_excedido(monkeypatch):
+    # asyncio.wait vuelve un poco antes del timeout pedido (como el reloj del
+    # loop); con todas las etapas ya en curso no hay nada más que lanzar
+    from plazo import PLAZO_EXCEDIDO, con_plazo
+
+    wait_real = asyncio.wait
+
+    async def wait_temprano(tareas, timeout=None, **kwargs):
+        return await wait_real(tareas, timeout=None if timeout is None else max(0.0, timeout - 0.05), **kwargs)
+
+    monkeypatch.setattr(asyncio, "wait", wait_temprano)
+
+    async def rechaza():
+        return None
+
+    async def cuelga():
+        await asyncio.sleep(10)
+
+    async def correr():
+        with con_plazo(0.3):
+            return await ejecutar_cascada([Etapa("barata", rechaza), Etapa("respaldo", cuelga)],
+                                          retardo_cobertura=0.05)
+
+    inicio = time.monotonic()
+    resultado = asyncio.run(correr())
+    transcurrido = time.monotonic() - inicio
+
+    assert resultado.estado == PLAZO_EXCEDIDO
+    assert resultado.valor is None
+    assert resultado.etapas_lanzadas == ["barata", "respaldo"]
+    assert transcurrido < 1.0
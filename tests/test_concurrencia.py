@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip("agents")
+
+from agents import Agent
+from agents.run import AgentRunner, get_default_agent_runner, set_default_agent_runner
+
+from concurrencia import RunnerConConfig, as_map_tool, instalar_runner
+
+
+@pytest.fixture
+def runner_original():
+    original = get_default_agent_runner()
+    set_default_agent_runner(AgentRunner())
+    yield
+    set_default_agent_runner(original)
+
+
+def test_as_map_tool_does_not_replace_the_default_runner(runner_original):
+    antes = get_default_agent_runner()
+    as_map_tool(Agent(name="sub"), "mapear", "Corre el sub-agente sobre cada entrada")
+    assert get_default_agent_runner() is antes
+
+
+def test_instalar_runner_installs_once_and_keeps_a_subclass(runner_original):
+    instalar_runner()
+    instalado = get_default_agent_runner()
+    assert isinstance(instalado, RunnerConConfig)
+    instalar_runner()
+    assert get_default_agent_runner() is instalado
+
+    class RunnerPropio(RunnerConConfig):
+        pass
+
+    propio = RunnerPropio()
+    set_default_agent_runner(propio)
+    instalar_runner()
+    assert get_default_agent_runner() is propio
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+pytest.importorskip("agents")
+
+from agents.run import CallModelData, ModelInputData
+
+from contexto import CompactadorContexto, estimar_tokens, resumir
+
+
+def conversacion(paginas, herramienta="fetch_url"):
+    items = [{"role": "user", "content": "Investiga el programa"}]
+    for n, texto in enumerate(paginas):
+        items.append({"type": "function_call", "call_id": f"c{n}", "name": herramienta,
+                      "arguments": json.dumps({"url": f"https://u.example/{n}"})})
+        items.append({"type": "function_call_output", "call_id": f"c{n}", "output": texto})
+    return items
+
+
+def salidas(items):
+    return [item["output"] for item in items if item.get("type") == "function_call_output"]
+
+
+def test_keeps_the_last_k_observations_and_summarises_older_ones_with_their_url():
+    paginas = [f"Página {n}. " + "texto largo " * 200 for n in range(4)]
+    items = conversacion(paginas)
+    compactado = CompactadorContexto(ultimas=2, presupuesto=None).compactar("instr", items)
+
+    viejas, recientes = salidas(compactado)[:2], salidas(compactado)[2:]
+    assert recientes == paginas[2:]
+    assert all(v.startswith(f"[Observación anterior resumida de https://u.example/{n}] Página {n}.")
+               for n, v in enumerate(viejas))
+    assert all(len(v) < 400 for v in viejas)
+    # La entrada original no se modifica
+    assert salidas(items) == paginas
+
+
+def test_over_budget_summarises_recent_ones_then_trims_the_last():
+    paginas = ["x " * 4000 for _ in range(3)]
+    compactador = CompactadorContexto(ultimas=2, presupuesto=600, max_resumen=100)
+    compactado = compactador.compactar(None, conversacion(paginas))
+
+    # Dentro del presupuesto, salvo los pocos tokens del sufijo " …[recortado]"
+    assert estimar_tokens("") + sum(estimar_tokens(item) for item in compactado) <= 600 + 5
+    *resumidas, ultima = salidas(compactado)
+    assert all(r.startswith("[Observación anterior resumida") for r in resumidas)
+    assert ultima.endswith(" …[recortado]") and ultima.startswith("x x")
+
+
+def test_only_listed_tools_are_compacted():
+    items = conversacion(["a " * 500] * 3, herramienta="get_position")
+    compactado = CompactadorContexto(ultimas=1, presupuesto=None, herramientas=["fetch_url"]).compactar(None, items)
+    assert salidas(compactado) == salidas(items)
+
+
+def test_summary_is_stable_across_turns_and_savings_are_counted():
+    compactador = CompactadorContexto(ultimas=1, presupuesto=None)
+    paginas = ["Primera frase. " + "relleno " * 300, "Segunda. " + "relleno " * 300]
+
+    def turno(items):
+        datos = CallModelData(model_data=ModelInputData(input=items, instructions="instr"), agent=None, context=None)
+        return compactador(datos).input
+
+    primero = salidas(turno(conversacion(paginas)))[0]
+    segundo = salidas(turno(conversacion(paginas + ["Tercera"])))[0]
+    assert primero == segundo
+    resumen = compactador.resumen()
+    assert resumen["turnos"] == 2 and 0 < resumen["tokens_enviados"] < resumen["tokens_originales"]
+
+
+def test_resumir_cuts_at_a_word_boundary():
+    texto = resumir("uno dos tres cuatro cinco seis siete ocho", "https://u.example", max_chars=20)
+    assert texto == "[Observación anterior resumida de https://u.example] uno dos tres cuatro …"
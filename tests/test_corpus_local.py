@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from corpus_local import IndiceBM25
+
+
+def lineas(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f]
+
+
+def test_load_keeps_the_latest_version_of_the_most_recent_urls(tmp_path):
+    ruta = tmp_path / "paginas.jsonl"
+    with open(ruta, "w", encoding="utf-8") as f:
+        for url, texto in [("u1", "uno viejo"), ("u2", "dos"), ("u1", "uno nuevo"), ("u3", "tres")]:
+            f.write(json.dumps({"url": url, "texto": texto}) + "\n")
+        f.write('{"url": "u4", "tex')     # línea a medio escribir
+
+    indice = IndiceBM25(str(ruta), max_documentos=2)
+
+    assert len(indice) == 2
+    assert [r.url for r in indice.consultar("nuevo tres")] and not indice.consultar("dos")
+    assert lineas(ruta) == [{"url": "u1", "texto": "uno nuevo"}, {"url": "u3", "texto": "tres"}]
+
+
+def test_file_is_compacted_when_it_doubles_the_cap(tmp_path):
+    ruta = tmp_path / "paginas.jsonl"
+    indice = IndiceBM25(str(ruta), max_documentos=3)
+    for i, numero in enumerate("cero uno dos tres cuatro cinco seis".split()):
+        indice.agregar(f"https://u.example/{i % 2}", f"versión {numero} de la página")
+
+    # 7 líneas superan 2 * 3: queda una por URL vigente
+    assert sorted(r["url"] for r in lineas(ruta)) == ["https://u.example/0", "https://u.example/1"]
+    recargado = IndiceBM25(str(ruta), max_documentos=3)
+    assert [r.url for r in recargado.consultar("seis")] == ["https://u.example/0"]
+    assert not recargado.consultar("cuatro")
+
+
+def corpus_sintetico(paginas=400, semilla=0):
+    import numpy as np
+    rng = np.random.default_rng(semilla)
+    indice = IndiceBM25()
+    for i in range(paginas):
+        ids = np.minimum(rng.zipf(1.3, 60), 300) - 1
+        indice.agregar(f"https://u.example/{i}", " ".join(f"t{j}" for j in ids))
+    return indice, rng
+
+
+@pytest.mark.parametrize("k", [1, 3, 10, 50])
+def test_top_k_matches_a_full_sort_of_the_scores(k):
+    # Términos densos (muy frecuentes), raros y mezclas: la cota por el término
+    # más raro no debe perder ningún documento del top-k
+    indice, rng = corpus_sintetico()
+    for _ in range(60):
+        consulta = " ".join(f"t{j}" for j in rng.integers(0, 300, rng.integers(1, 5)))
+        puntajes = indice.puntajes(consulta)
+        esperados = sorted(puntajes[puntajes > 0], reverse=True)[:k]
+        obtenidos = indice.buscar(consulta, k)
+        assert [p for _, p in obtenidos] == pytest.approx(esperados)
+        assert all(puntajes[doc] == pytest.approx(p) for doc, p in obtenidos)
+
+
+def test_bm25_ranks_term_frequency_and_rare_terms_higher():
+    indice = IndiceBM25()
+    indice.agregar("a", "maestría en ingeniería de minas " + "relleno " * 20)
+    indice.agregar("b", "maestría maestría maestría en ingeniería " + "relleno " * 20)
+    indice.agregar("c", "doctorado en minas " + "relleno " * 20)
+    assert [r.url for r in indice.consultar("maestría")] == ["b", "a"]
+    # "doctorado" aparece en un solo documento: pesa más que "ingeniería"
+    assert indice.consultar("doctorado ingeniería", k=1)[0].url == "c"
+    assert indice.consultar("inexistente") == []
+
+
+def test_readded_url_replaces_its_document_and_copies_are_merged():
+    indice = IndiceBM25()
+    indice.agregar("https://u.example/a", "programa de geología")
+    indice.agregar("https://u.example/a", "programa de química")
+    indice.agregar("https://espejo.example/a", "programa de química")
+
+    assert len(indice) == 1
+    assert indice.consultar("geología") == []
+    [resultado] = indice.consultar("química")
+    assert (resultado.url, resultado.otras_urls) == ("https://u.example/a", ["https://espejo.example/a"])
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from html_texto import TAM_TROZO, ExtractorTextoHTML, texto_visible
+
+
+def test_text_of_exactly_max_chars_stops_the_parser():
+    extractor = ExtractorTextoHTML(max_chars=10)
+    assert extractor.alimentar("<p>abcd</p><p>efghi</p>") is True     # "abcd\nefghi": 10
+    extractor.alimentar("<p>no se lee</p>")
+    assert extractor.texto() == "abcd\nefghi"
+
+
+def test_text_one_char_short_of_max_chars_keeps_reading():
+    extractor = ExtractorTextoHTML(max_chars=10)
+    assert extractor.alimentar("<p>abcd</p><p>efgh</p>") is False      # "abcd\nefgh": 9
+    assert extractor.alimentar("<p>ij</p>") is True
+    assert extractor.texto() == "abcd\nefgh\nij"[:10]
+
+
+def test_visible_text_skips_scripts_styles_and_navigation():
+    html = ("<html><head><style>p{color:red}</style><script>var x = '<p>no</p>';</script></head>"
+            "<body><nav><a>Inicio</a></nav><h1> Maestría </h1><p>Plan de <b>estudios</b></p>"
+            "<noscript>Active JS</noscript><br><img src=x><p>Créditos: 48 &amp; más</p></body></html>")
+    assert texto_visible(html) == "Maestría\nPlan de\nestudios\nCréditos: 48 & más"
+
+
+def test_unclosed_and_stray_tags_do_not_hide_the_rest_of_the_page():
+    # <nav> sin cerrar se cierra con su padre; un </div> suelto se ignora
+    html = "<div><nav><a>menú</a></div></div><p>contenido</p>"
+    assert texto_visible(html) == "contenido"
+
+
+def test_truncation_cuts_the_text_and_stops_parsing_early():
+    parrafo = "<p>" + "palabra " * 20 + "</p>"
+    html = parrafo * 5000      # ~800 KB de HTML
+    extractor = ExtractorTextoHTML(max_chars=500)
+    assert extractor.alimentar(html) is True
+    assert len(extractor.texto()) == 500
+    # Se detiene en el trozo (TAM_TROZO) donde llegó a max_chars, sin parsear el resto
+    assert extractor.getpos()[1] <= TAM_TROZO
+
+
+def test_chunks_split_inside_words_tags_and_entities_give_the_same_text():
+    # Un fragmento de la red puede cortar una palabra: no debe partirla en dos líneas
+    html = "<p>Inscripci&oacute;n abierta</p><script>no</script><p>Costo &#36;9</p>"
+    esperado = texto_visible(html)
+    for corte in range(1, len(html)):
+        extractor = ExtractorTextoHTML()
+        extractor.alimentar(html[:corte])
+        extractor.alimentar(html[corte:])
+        extractor.close()
+        assert extractor.texto() == esperado == "Inscripción abierta\nCosto $9"
+
+
+def test_long_text_node_stops_before_its_closing_tag():
+    extractor = ExtractorTextoHTML(max_chars=100)
+    assert extractor.alimentar("<p>" + "x" * 60) is False
+    assert extractor.alimentar("y" * 60) is True
+    assert extractor.texto() == "x" * 60 + "y" * 40
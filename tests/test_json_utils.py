@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import asyncio, json
+
+import pytest
+
+from json_utils import ExtractorJsonIncremental, JsonExtractionError, extract_json_obj, iter_json
+
+
+RESPUESTA = {"anio_separacion": "2019", "motivo": "Diferencias entre los socios",
+             "marca_original": "Postobón", "marcas_resultantes": [{"marca": "A", "dueños": ["x"]}]}
+
+
+def test_extract_from_a_fenced_block_with_text_around():
+    texto = 'Aquí está:\n```json\n{"a": 1, "b": [1, 2]}\n```\nEspero que sirva {ver anexo}.'
+    obj, raw = extract_json_obj(texto)
+    assert obj == {"a": 1, "b": [1, 2]}
+    assert raw == '{"a": 1, "b": [1, 2]}'
+
+
+def test_extract_unfenced_object_after_free_text_with_braces_and_links():
+    texto = 'Ver [fuente](https://x.example) y {nota}. Resultado: {"a": {"b": {"c": [1, {"d": null}]}}} fin'
+    obj, raw = extract_json_obj(texto)
+    assert obj == {"a": {"b": {"c": [1, {"d": None}]}}}
+    assert texto[texto.index(raw):].startswith(raw)
+
+
+def test_extract_keeps_escaped_quotes_and_braces_inside_strings():
+    texto = r'{"motivo": "dijo \"no\" y cerró {la} empresa [sic]", "ruta": "C:\\datos"}'
+    obj, _ = extract_json_obj(texto)
+    assert obj == {"motivo": 'dijo "no" y cerró {la} empresa [sic]', "ruta": "C:\\datos"}
+
+
+def test_extract_prefers_the_first_object_over_an_earlier_array():
+    obj, raw = extract_json_obj('[1, 2] y luego {"a": 1}')
+    assert obj == {"a": 1} and raw == '{"a": 1}'
+    assert extract_json_obj("solo [1, 2]")[0] == [1, 2]
+
+
+def test_extract_truncated_object_raises_with_context():
+    with pytest.raises(JsonExtractionError, match="Error al parsear JSON"):
+        extract_json_obj('```json\n{"a": 1, "b": "sin cerr')
+    with pytest.raises(JsonExtractionError, match="llave"):
+        extract_json_obj("sin json aquí")
+
+
+def test_iter_json_yields_top_level_values_with_exact_positions():
+    texto = 'x {"a": {"b": 1}} y [1, [2]] z {"c": 2}'
+    valores = list(iter_json(texto))
+    assert [v for _, _, v in valores] == [{"a": {"b": 1}}, [1, [2]], {"c": 2}]
+    assert [texto[i:f] for i, f, _ in valores] == ['{"a": {"b": 1}}', "[1, [2]]", '{"c": 2}']
+
+
+def test_iter_json_skips_a_truncated_candidate_and_finds_the_next():
+    assert [v for _, _, v in iter_json('{"a": [1, 2 ... {"b": true}')] == [{"b": True}]
+
+
+def test_incremental_extractor_yields_each_field_as_it_closes():
+    texto = "```json\n" + json.dumps(RESPUESTA, ensure_ascii=False, indent=2) + "\n```"
+    extractor = ExtractorJsonIncremental()
+    campos = [extractor.alimentar(ch) for ch in texto]
+    cerrados = [c for lote in campos for c in lote]
+    assert [clave for clave, _ in cerrados] == list(RESPUESTA)
+    assert extractor.objeto == RESPUESTA and extractor.terminado
+    # El primer campo sale antes de que llegue el resto del texto
+    primero = next(i for i, lote in enumerate(campos) if lote)
+    assert primero < texto.index("motivo")
+
+
+def campos_por_fragmentos(fragmentos):
+    extractor = ExtractorJsonIncremental()
+    return [c for f in fragmentos for c in extractor.alimentar(f)], extractor
+
+
+CORTADO = r'{"m": "a \"b\" \\ \u00f1 }", "n": {"x": [1, "]"]}, "z": 0}'
+
+
+@pytest.mark.parametrize("corte", range(1, len(CORTADO)))
+def test_incremental_extractor_handles_any_chunk_boundary(corte):
+    # Cada posición de corte: dentro de una cadena, entre '\\' y el carácter
+    # escapado, dentro de \u00f1, entre clave y ':' o en medio de un anidado
+    campos, extractor = campos_por_fragmentos([CORTADO[:corte], CORTADO[corte:]])
+    assert campos == [("m", 'a "b" \\ ñ }'), ("n", {"x": [1, "]"]}), ("z", 0)]
+    assert extractor.terminado
+
+
+def test_incremental_extractor_one_char_at_a_time_with_escapes():
+    texto = r'```json' + '\n' + r'{"a": "\\\"", "b": "{[", "c": ["\\", {"d": "}"}]}' + '\n```'
+    campos, extractor = campos_por_fragmentos(list(texto))
+    assert dict(campos) == {"a": '\\"', "b": "{[", "c": ["\\", {"d": "}"}]}
+    assert extractor.terminado
+
+
+def test_partial_object_at_end_of_stream():
+    # El stream se corta a mitad del segundo campo: el primero ya salió
+    campos, extractor = campos_por_fragmentos(['{"a": 1, "b": "sin ', 'cerrar'])
+    assert campos == [("a", 1)]
+    assert not extractor.terminado and extractor.objeto == {"a": 1}
+
+
+class _Delta:
+    type = "response.output_text.delta"
+
+    def __init__(self, delta):
+        self.delta = delta
+
+
+class _Evento:
+    type = "raw_response_event"
+
+    def __init__(self, delta):
+        self.data = _Delta(delta)
+
+
+class _ResultadoStreaming:
+    def __init__(self, deltas):
+        self.deltas = deltas
+
+    async def stream_events(self):
+        for delta in self.deltas:
+            yield _Evento(delta)
+
+
+def test_consumir_streaming_raises_when_the_stream_ends_inside_the_object():
+    async def consumir(deltas):
+        extractor = ExtractorJsonIncremental()
+        return [campo async for campo in extractor.consumir_streaming(_ResultadoStreaming(deltas))]
+
+    assert asyncio.run(consumir(['{"a"', ': [1,', ' 2]}'])) == [("a", [1, 2])]
+    with pytest.raises(JsonExtractionError, match="sin cerrar"):
+        asyncio.run(consumir(['{"a": [1,', " 2"]))
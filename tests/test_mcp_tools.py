@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import asyncio, time
+
+import pytest
+
+pytest.importorskip("strands")
+pytest.importorskip("httpx")
+pytest.importorskip("agents")
+
+import mcp_tools
+from plazo import PLAZO_EXCEDIDO, con_plazo
+
+
+def test_federated_search_backend_done_in_the_same_iteration_as_the_budget(monkeypatch):
+    # Un backend bloquea el loop más allá del presupuesto y termina en ese mismo paso:
+    # asyncio.wait vuelve por el timeout con la tarea ya terminada, antes de que
+    # corran sus callbacks de fin
+    async def backend(source, query):
+        if source == "tavily":
+            time.sleep(0.2)
+            return [{"title": "t", "url": "https://a.example/x", "snippet": ""}]
+        if source == "duckduckgo":
+            await asyncio.sleep(0.04)
+            return [{"title": "d", "url": "https://b.example/y", "snippet": ""}]
+        await asyncio.sleep(5)
+        return []
+
+    monkeypatch.setattr(mcp_tools, "_federated_backend", backend)
+    resultado = asyncio.run(mcp_tools._federated_search("consulta", budget=0.05))
+
+    assert resultado["backends"]["tavily"]["status"] == "ok"
+    assert resultado["backends"]["tavily"]["latency"] >= 0.2
+    assert resultado["backends"]["duckduckgo"]["status"] == "timeout"
+    assert resultado["backends"]["wikipedia"]["status"] == "timeout"
+    assert [r["source"] for r in resultado["results"]] == ["tavily"]
+
+
+def test_get_positions_rate_limit_wait_respects_the_deadline(monkeypatch):
+    # Con 1 consulta/s y 1.5 s de plazo caben dos lugares; los otros tres no
+    # deben dormir hasta su turno (antes: 4 s) y devuelven su turno al limitador
+    class CacheVacia:
+        def obtener(self, clave):
+            return None
+
+        def guardar(self, clave, valor, ttl=None):
+            pass
+
+    async def geocode(location):
+        return {"success": True, "latitude": 0.0, "longitude": 0.0, "display_name": location}
+
+    limiter = mcp_tools.TokenBucket(rate=1.0, capacity=1.0)
+    monkeypatch.setattr(mcp_tools, "NOMINATIM_LIMITER", limiter)
+    monkeypatch.setattr(mcp_tools, "geocode_cache", lambda: CacheVacia())
+    monkeypatch.setattr(mcp_tools, "_geocode", geocode)
+
+    async def correr():
+        with con_plazo(1.5):
+            return await mcp_tools._get_positions(["Medellín", "Bogotá", "Cali", "Quibdó", "Pasto"])
+
+    inicio = time.monotonic()
+    resultado = asyncio.run(correr())
+    transcurrido = time.monotonic() - inicio
+
+    exitos = [r["success"] for r in resultado["results"]]
+    assert transcurrido < 1.4
+    assert exitos == [True, True, False, False, False]
+    assert all(PLAZO_EXCEDIDO in r["error"] for r in resultado["results"][2:])
+    # Solo los dos turnos usados salieron del balde (lleno con 1 al empezar)
+    assert limiter._tokens == pytest.approx(-1.0, abs=0.05)
+
+
+def test_geocode_only_caches_an_empty_answer_as_not_found(monkeypatch):
+    # Una caída de Nominatim (503) o un 429 no es "Location not found": no se
+    # guarda, y la ciudad se vuelve a buscar en la siguiente llamada
+    import httpx
+
+    class CacheMemoria:
+        def __init__(self):
+            self.guardadas = {}
+
+        def obtener(self, clave):
+            return None
+
+        def guardar(self, clave, valor, ttl=None):
+            self.guardadas[clave] = (valor, ttl)
+
+    estados = {"Medellín": 503, "Bogotá": 429, "Xyzzy": 200}
+
+    def responder(request):
+        estado = estados[request.url.params["q"]]
+        return httpx.Response(estado, json=[] if estado == 200 else {"error": "unavailable"})
+
+    cache = CacheMemoria()
+    monkeypatch.setattr(mcp_tools, "NOMINATIM_LIMITER", mcp_tools.TokenBucket(rate=1000.0, capacity=10.0))
+    monkeypatch.setattr(mcp_tools, "geocode_cache", lambda: cache)
+    monkeypatch.setattr(mcp_tools, "cliente_http",
+                        lambda: httpx.AsyncClient(transport=httpx.MockTransport(responder)))
+
+    resultado = asyncio.run(mcp_tools._get_positions(list(estados)))
+
+    errores = {r["query"]: r["error"] for r in resultado["results"]}
+    assert "503" in errores["Medellín"] and "429" in errores["Bogotá"]
+    assert errores["Xyzzy"] == mcp_tools.GEOCODE_NOT_FOUND
+    assert list(cache.guardadas) == ["xyzzy"]
+    assert cache.guardadas["xyzzy"][1] == mcp_tools.GEOCODE_NEGATIVE_TTL
+
+
+@pytest.mark.parametrize("llamar", [
+    lambda: mcp_tools._wikipedia_page("Medellín", "es"),
+    lambda: mcp_tools._duckduckgo_search("Medellín"),
+    lambda: mcp_tools._geocode("Medellín"),
+])
+def test_tool_timeout_is_not_recorded_in_the_cassette(monkeypatch, tmp_path, llamar):
+    # El timeout llega a la herramienta como dict de error, pero no queda
+    # grabado: la siguiente ejecución vuelve a llamar a la red
+    import httpx
+    import casete
+
+    def responder(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    grabacion = casete.Casete(str(tmp_path / "casete.jsonl.gz"), "grabar")
+    monkeypatch.setattr(casete, "activar", lambda: grabacion)
+    monkeypatch.setattr(mcp_tools, "cliente_http",
+                        lambda: httpx.AsyncClient(transport=httpx.MockTransport(responder)))
+
+    resultado = asyncio.run(llamar())
+    grabacion.cerrar()
+
+    assert resultado["success"] is False
+    assert "timed out" in resultado["error"]
+    assert grabacion.nuevas == 0 and grabacion.grabadas == {}
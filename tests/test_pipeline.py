@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import asyncio, types
+
+import pytest
+
+pytest.importorskip("agents")
+
+from agents import Agent
+
+import pipeline
+from pipeline import Compuerta, Paso, Pipeline, PipelineError
+
+
+@pytest.fixture
+def corridas(monkeypatch):
+    # Runner falso: cada agente responde "<nombre>(<entrada>)"
+    corridas = []
+
+    async def run(agente, entrada, **kwargs):
+        corridas.append(agente.name)
+        await asyncio.sleep(0.05)
+        return types.SimpleNamespace(final_output=f"{agente.name}({entrada})")
+
+    monkeypatch.setattr(pipeline, "Runner", types.SimpleNamespace(run=run))
+    return corridas
+
+
+def paso(nombre, *deps, **kwargs):
+    return Paso(nombre, Agent(name=nombre), list(deps), **kwargs)
+
+
+def test_closed_gate_stops_its_dependents_and_reports_the_first_gate(corridas):
+    p = Pipeline([
+        paso("esquema"),
+        Compuerta("calidad", "esquema", lambda salida: False, mensaje="Esquema de baja calidad"),
+        paso("historia", "calidad"),
+        paso("revision", "historia"),
+        paso("resumen"),
+    ])
+    resultado = asyncio.run(p.ejecutar("tema"))
+
+    assert resultado.estados == {"esquema": "ok", "calidad": "detenido", "historia": "omitido",
+                                 "revision": "omitido", "resumen": "ok"}
+    assert resultado.detenido_por == "Esquema de baja calidad"
+    assert sorted(corridas) == ["esquema", "resumen"]
+    assert not resultado.completo
+
+
+def test_open_gate_passes_the_step_output_to_dependents(corridas):
+    p = Pipeline([
+        paso("esquema"),
+        Compuerta("calidad", "esquema", lambda salida: salida.startswith("esquema"), tipo=str),
+        paso("historia", "calidad", "esquema"),
+        paso("juntar", "historia", "esquema",
+             entrada=lambda d: f"{d['entrada']}|{d['esquema']}|{d['historia']}"),
+    ])
+    resultado = asyncio.run(p.ejecutar("tema"))
+
+    assert resultado.completo and resultado.detenido_por is None
+    assert resultado.salidas["historia"] == "historia(esquema(tema))"
+    assert resultado.salidas["juntar"] == "juntar(tema|esquema(tema)|historia(esquema(tema)))"
+
+
+def test_gate_type_mismatch_is_an_error_and_dependents_are_omitted(corridas):
+    p = Pipeline([paso("a"), Compuerta("g", "a", bool, tipo=int), paso("b", "g")])
+    resultado = asyncio.run(p.ejecutar("x"))
+    assert resultado.estados == {"a": "ok", "g": "error", "b": "omitido"}
+    assert "se esperaba int" in resultado.errores["g"]
+
+
+def test_independent_branches_run_in_parallel(corridas):
+    p = Pipeline([paso(f"rama{i}") for i in range(5)])
+
+    async def correr():
+        inicio = asyncio.get_running_loop().time()
+        await p.ejecutar("x")
+        return asyncio.get_running_loop().time() - inicio
+
+    # En serie serían 0.25 s
+    assert asyncio.run(correr()) < 0.15
+
+
+def test_step_timeout_is_reported_and_omits_dependents(monkeypatch):
+    async def run(agente, entrada, **kwargs):
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(pipeline, "Runner", types.SimpleNamespace(run=run))
+    p = Pipeline([paso("lento", timeout=0.01), paso("despues", "lento")])
+    assert asyncio.run(p.ejecutar("x")).estados == {"lento": "timeout", "despues": "omitido"}
+
+
+def test_cycles_unknown_dependencies_and_duplicate_names_are_rejected():
+    with pytest.raises(PipelineError, match="ciclo entre: \\['a', 'b', 'c'\\]"):
+        Pipeline([paso("a", "c"), paso("b", "a"), paso("c", "b"), paso("d")])
+    with pytest.raises(PipelineError, match="'b' depende de 'z'"):
+        Pipeline([paso("a"), paso("b", "z")])
+    with pytest.raises(PipelineError, match="repetidos"):
+        Pipeline([paso("a"), paso("a")])
+
+
+def test_topological_order_puts_dependencies_first():
+    p = Pipeline([paso("c", "b"), paso("b", "a"), paso("a")])
+    assert p.orden == ["a", "b", "c"]
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import asyncio, types
+from typing import List, Optional
+
+import pytest
+
+pytest.importorskip("agents")
+
+from agents import Agent
+from pydantic import BaseModel, Field
+
+import cache_agentes
+from relleno import campos_faltantes, entrada_relleno, modelo_parcial, rellenar
+
+
+class Respuesta(BaseModel):
+    anio: str = Field(..., description="Año de la separación")
+    motivo: str = ""
+    marcas: List[str] = Field(default_factory=list, description="Marcas resultantes")
+    duenos: Optional[dict] = None
+    empleados: int = 0
+
+
+def test_campos_faltantes_counts_none_empty_strings_and_empty_collections():
+    parcial = Respuesta(anio="2019", motivo="", marcas=[], duenos=None, empleados=0)
+    assert campos_faltantes(parcial) == ["motivo", "marcas", "duenos"]
+    assert campos_faltantes(Respuesta(anio="2019", motivo="m", marcas=["a"], duenos={"a": "x"})) == []
+
+
+def test_modelo_parcial_keeps_only_the_fields_with_types_and_descriptions():
+    Parcial = modelo_parcial(Respuesta, ("anio", "marcas"))
+    assert list(Parcial.model_fields) == ["anio", "marcas"]
+    assert Parcial.model_fields["marcas"].description == "Marcas resultantes"
+    assert Parcial.model_fields["anio"].is_required()
+    assert Parcial(anio="2019").marcas == []
+    with pytest.raises(ValueError):
+        Parcial(anio="2019", marcas="no es lista")
+    # Mismo modelo y campos: la misma clase (lru_cache), así el agente de relleno se reutiliza
+    assert modelo_parcial(Respuesta, ("anio", "marcas")) is Parcial
+
+
+def test_entrada_relleno_lists_known_fields_and_asks_only_for_the_missing():
+    parcial = Respuesta(anio="2019", motivo="", marcas=[])
+    texto = entrada_relleno("¿Qué pasó?", parcial, ["motivo", "marcas"])
+    assert texto.startswith("¿Qué pasó?")
+    assert '"anio": "2019"' in texto and '"motivo"' not in texto.split("Completa")[0]
+    assert texto.endswith("Completa ÚNICAMENTE los campos: motivo, marcas.")
+
+
+def test_rellenar_asks_only_for_missing_fields_and_merges(monkeypatch):
+    pedidos = []
+
+    async def run(agente, entrada, **kwargs):
+        pedidos.append(agente.output_type)
+        return types.SimpleNamespace(final_output=agente.output_type(motivo="Diferencias", marcas=["A", "B"]))
+
+    monkeypatch.setattr(cache_agentes, "Runner", types.SimpleNamespace(run=run))
+    agente = Agent(name="respaldo", output_type=Respuesta)
+    parcial = Respuesta(anio="2019", duenos={"A": "x"}, empleados=3)
+
+    completa = asyncio.run(rellenar(agente, "¿Qué pasó?", parcial))
+
+    assert list(pedidos[0].model_fields) == ["motivo", "marcas"]
+    assert completa == Respuesta(anio="2019", motivo="Diferencias", marcas=["A", "B"], duenos={"A": "x"},
+                                 empleados=3)
+    # Sin campos faltantes no se llama al agente
+    assert asyncio.run(rellenar(agente, "¿Qué pasó?", completa)) is completa
+    assert len(pedidos) == 1
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+pytest.importorskip("agents")
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from agents.tracing import agent_span, function_span, get_trace_provider, trace as traza_sdk
+
+import telemetria
+
+
+@pytest.fixture
+def exportador(monkeypatch):
+    # Proveedor de OTel propio y el ProcesadorOTel como único procesador del SDK
+    exportador = InMemorySpanExporter()
+    proveedor = TracerProvider()
+    proveedor.add_span_processor(SimpleSpanProcessor(exportador))
+    monkeypatch.setattr(telemetria, "tracer", proveedor.get_tracer("pruebas"))
+    sdk = get_trace_provider()
+    monkeypatch.setattr(sdk, "_disabled", False)
+    monkeypatch.setattr(sdk._multi_processor, "_processors", (telemetria.ProcesadorOTel(),))
+    return exportador
+
+
+def test_spans_opened_inside_a_tool_are_children_of_the_tool_and_agent(exportador):
+    async def herramienta(nombre):
+        with function_span(nombre):
+            await asyncio.sleep(0)
+            with telemetria.medir("herramienta", f"{nombre} http"):
+                pass
+
+    async def correr():
+        with traza_sdk("flujo"):
+            with agent_span("executor"):
+                # Herramientas en paralelo: cada una en su propia tarea
+                await asyncio.gather(herramienta("fetch_url"), herramienta("get_position"))
+        # Terminado el flujo, el contexto de OTel vuelve a quedar vacío
+        return telemetria.trace.get_current_span().get_span_context().is_valid
+
+    assert asyncio.run(correr()) is False
+
+    spans = {s.context.span_id: s for s in exportador.get_finished_spans()}
+    padre = {s.name: spans[s.parent.span_id].name if s.parent else None for s in spans.values()}
+    assert padre == {
+        "herramienta fetch_url http": "herramienta fetch_url",
+        "herramienta get_position http": "herramienta get_position",
+        "herramienta fetch_url": "agente executor",
+        "herramienta get_position": "agente executor",
+        "agente executor": "flujo flujo",
+        "flujo flujo": None,
+    }
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+Descarga de páginas web compartida por los agentes (ejemplo5, ejemplo6).
+
+Usa un httpx.AsyncClient con pool de conexiones por event loop (keep-alive,
+HTTP/2 si está instalado el paquete h2, límite de conexiones por host) para que
+muchas descargas concurrentes no bloqueen el loop ni repitan el handshake TLS.
+Las respuestas se guardan en un caché HTTP en disco que respeta Cache-Control,
+ETag y Last-Modified, y el texto visible se extrae en streaming (html_texto).
+El texto ya extraído se guarda además en el almacén de páginas
+(almacen_paginas), compartido entre corridas y procesos. Las descargas
+respetan el plazo de la solicitud (plazo.py): el timeout se recorta a lo que
+quede y, si vence, la petición en curso se cancela.
+"""
+import asyncio, atexit, codecs, email.utils, hashlib, json, os, threading, time, weakref
+from typing import Dict, Optional, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from cache_agentes import DIRECTORIO_CACHE
+from html_texto import ExtractorTextoHTML
+from almacen_paginas import AlmacenPaginas
+from plazo import acotar, esperar, fijar_limite, limite
+from telemetria import anotar, cupo, instrumentar
+from casete import grabable
+
+try:
+    import h2  # noqa: F401  (habilita HTTP/2 en httpx)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+MAX_CONEXIONES = 100          # conexiones totales del pool
+MAX_CONEXIONES_POR_HOST = 6   # como los navegadores, para no saturar un mismo sitio
+USER_AGENT = "agentes1/1.0 (+https://github.com/robertohincapie/agentes1)"
+
+
+class _EstadoRed:
+    """
+    Cliente y semáforos por host ligados a un event loop. El cliente se cierra
+    (aclose) cuando el loop cierra sus generadores asíncronos, como hace
+    asyncio.run al terminar: un generador que nunca avanza más allá de su
+    primer yield sirve de gancho para ese momento.
+    """
+
+    def __init__(self):
+        self.cliente = httpx.AsyncClient(
+            http2=HTTP2,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=MAX_CONEXIONES, max_keepalive_connections=MAX_CONEXIONES // 2),
+        )
+        self.por_host: Dict[str, asyncio.Semaphore] = {}
+        self._guardia = self._cerrar_al_terminar()
+        asyncio.ensure_future(self._guardia.__anext__())
+
+    async def _cerrar_al_terminar(self):
+        try:
+            yield
+        finally:
+            await self.cliente.aclose()
+
+    def semaforo(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self.por_host:
+            self.por_host[host] = asyncio.Semaphore(MAX_CONEXIONES_POR_HOST)
+        return self.por_host[host]
+
+
+# Un cliente por event loop: las conexiones de httpx no se pueden compartir entre loops
+_estados: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _EstadoRed]" = weakref.WeakKeyDictionary()
+
+
+def _estado() -> _EstadoRed:
+    loop = asyncio.get_running_loop()
+    estado = _estados.get(loop)
+    if estado is None:
+        estado = _estados[loop] = _EstadoRed()
+    return estado
+
+
+def cliente_http() -> httpx.AsyncClient:
+    """Cliente httpx compartido del event loop actual."""
+    return _estado().cliente
+
+
+_loop_fondo: Optional[asyncio.AbstractEventLoop] = None
+_lock_loop = threading.Lock()
+
+
+def _cerrar_loop_fondo():
+    """Al salir del proceso, cierra el cliente httpx del loop de fondo (que nunca termina)."""
+    if _loop_fondo is not None and _loop_fondo.is_running():
+        try:
+            asyncio.run_coroutine_threadsafe(_loop_fondo.shutdown_asyncgens(), _loop_fondo).result(timeout=5)
+        except Exception:
+            pass
+
+
+def ejecutar_sync(corrutina):
+    """
+    Ejecuta una corrutina desde código síncrono en un event loop de fondo de
+    larga vida. A diferencia de asyncio.run, no crea un loop (ni un cliente
+    httpx) por llamada y funciona aunque ya haya un loop corriendo en el hilo.
+    El plazo vigente del llamador se aplica también en el loop de fondo.
+    """
+    global _loop_fondo
+    with _lock_loop:
+        if _loop_fondo is None:
+            _loop_fondo = asyncio.new_event_loop()
+            threading.Thread(target=_loop_fondo.run_forever, name="web_fetch-loop", daemon=True).start()
+            atexit.register(_cerrar_loop_fondo)
+    instante = limite()
+
+    async def con_plazo_del_llamador():
+        with fijar_limite(instante):
+            return await esperar(corrutina)
+
+    return asyncio.run_coroutine_threadsafe(con_plazo_del_llamador(), _loop_fondo).result()
+
+
+class CacheHTTP:
+    """
+    Caché HTTP en disco: un archivo .json con metadatos y otro .body con el
+    contenido por URL. Respeta no-store, no-cache, max-age, Expires, ETag y
+    Last-Modified (revalidación con If-None-Match / If-Modified-Since).
+    No considera Vary: pensado para GET de páginas públicas.
+    """
+
+    def __init__(self, directorio: Optional[str] = None):
+        self.directorio = directorio or os.path.join(DIRECTORIO_CACHE, "http")
+        os.makedirs(self.directorio, exist_ok=True)
+        self.aciertos = 0
+        self.revalidados = 0
+        self.fallos = 0
+
+    def _rutas(self, url: str):
+        base = os.path.join(self.directorio, hashlib.sha256(url.encode("utf-8")).hexdigest())
+        return base + ".json", base + ".body"
+
+    def leer(self, url: str):
+        ruta_meta, ruta_cuerpo = self._rutas(url)
+        try:
+            with open(ruta_meta, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(ruta_cuerpo, "rb") as f:
+                cuerpo = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, cuerpo
+
+    def escribir(self, url: str, meta: dict, cuerpo: Optional[bytes] = None):
+        ruta_meta, ruta_cuerpo = self._rutas(url)
+        # Escritura atómica: primero a un temporal y luego os.replace
+        if cuerpo is not None:
+            with open(ruta_cuerpo + ".tmp", "wb") as f:
+                f.write(cuerpo)
+            os.replace(ruta_cuerpo + ".tmp", ruta_cuerpo)
+        with open(ruta_meta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(ruta_meta + ".tmp", ruta_meta)
+
+    @staticmethod
+    def directivas(headers) -> Dict[str, Optional[str]]:
+        resultado = {}
+        for parte in headers.get("cache-control", "").split(","):
+            nombre, _, valor = parte.strip().partition("=")
+            if nombre:
+                resultado[nombre.lower()] = valor.strip('"') or None
+        return resultado
+
+    @classmethod
+    def expiracion(cls, headers, ahora: float) -> Optional[float]:
+        """Instante hasta el cual la respuesta es fresca, o None si hay que revalidar."""
+        directivas = cls.directivas(headers)
+        if "no-cache" in directivas:
+            return None
+        edad_max = directivas.get("s-maxage") or directivas.get("max-age")
+        if edad_max is not None:
+            try:
+                return ahora + int(edad_max) - int(headers.get("age", 0) or 0)
+            except ValueError:
+                return None
+        if headers.get("expires"):
+            try:
+                return email.utils.parsedate_to_datetime(headers["expires"]).timestamp()
+            except (TypeError, ValueError):
+                return None
+        return None
+
+    @classmethod
+    def almacenable(cls, respuesta: httpx.Response) -> bool:
+        if respuesta.status_code != 200 or "no-store" in cls.directivas(respuesta.headers):
+            return False
+        h = respuesta.headers
+        return bool(h.get("etag") or h.get("last-modified") or cls.expiracion(h, time.time()))
+
+
+def _respuesta(url: str, meta: dict, cuerpo: bytes) -> httpx.Response:
+    return httpx.Response(meta["status"], headers=meta["headers"], content=cuerpo,
+                          request=httpx.Request("GET", url))
+
+
+_cache_http: Optional[CacheHTTP] = None
+
+
+def cache_http() -> CacheHTTP:
+    """Caché HTTP en disco compartido por el proceso."""
+    global _cache_http
+    if _cache_http is None:
+        _cache_http = CacheHTTP()
+    return _cache_http
+
+
+def _resolver_cache(cache) -> Optional[CacheHTTP]:
+    if cache is None:
+        return cache_http()
+    return None if cache is False else cache
+
+
+def _condicionales(meta: Optional[dict]) -> Dict[str, str]:
+    """Encabezados de revalidación para una entrada vencida del caché."""
+    headers = {}
+    if meta is not None:
+        if meta["headers"].get("etag"):
+            headers["If-None-Match"] = meta["headers"]["etag"]
+        if meta["headers"].get("last-modified"):
+            headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+    return headers
+
+
+def _fresca(meta: Optional[dict]) -> bool:
+    return meta is not None and meta.get("expira") is not None and meta["expira"] > time.time()
+
+
+def _revalidar(cache: CacheHTTP, url: str, meta: dict, respuesta: httpx.Response):
+    """Actualiza los metadatos de una entrada tras un 304 Not Modified."""
+    cache.revalidados += 1
+    meta["headers"].update({k.lower(): v for k, v in respuesta.headers.items()
+                            if k.lower() in ("etag", "last-modified", "cache-control", "expires", "date")})
+    meta["expira"] = CacheHTTP.expiracion(meta["headers"], time.time())
+    cache.escribir(url, meta)
+
+
+def _guardar(cache: CacheHTTP, url: str, respuesta: httpx.Response, cuerpo: bytes):
+    meta = {
+        "status": respuesta.status_code,
+        "headers": {k.lower(): v for k, v in respuesta.headers.items()
+                    if k.lower() not in ("content-encoding", "transfer-encoding", "content-length")},
+        "expira": CacheHTTP.expiracion(respuesta.headers, time.time()),
+    }
+    cache.escribir(url, meta, cuerpo)
+
+
+async def obtener(url: str, timeout: float = 20, cache: Union[CacheHTTP, bool, None] = None) -> httpx.Response:
+    """
+    GET asíncrono con el cliente compartido, respetando el límite por host y el
+    caché HTTP en disco (por defecto el compartido; cache=False lo desactiva).
+    """
+    cache = _resolver_cache(cache)
+    meta, cuerpo = cache.leer(url) if cache else (None, None)
+    if _fresca(meta):
+        cache.aciertos += 1
+        return _respuesta(url, meta, cuerpo)
+
+    estado = _estado()
+    async with cupo(estado.semaforo(url), "host"):
+        respuesta = await esperar(estado.cliente.get(url, headers=_condicionales(meta), timeout=acotar(timeout)))
+
+    if cache is None:
+        return respuesta
+    if respuesta.status_code == 304 and meta is not None:
+        _revalidar(cache, url, meta, respuesta)
+        return _respuesta(url, meta, cuerpo)
+    cache.fallos += 1
+    if CacheHTTP.almacenable(respuesta):
+        _guardar(cache, url, respuesta, respuesta.content)
+    return respuesta
+
+
+def _extraer(html: str, max_chars: int):
+    """(texto visible, True si se leyó el HTML completo sin llegar a max_chars)."""
+    extractor = ExtractorTextoHTML(max_chars)
+    extractor.alimentar(html)
+    extractor.close()
+    return extractor.texto(), not extractor.completo
+
+
+async def _descargar_texto(url: str, max_chars: int, timeout: float, cache: Optional[CacheHTTP]):
+    """
+    Texto visible de la página (vía el caché HTTP) y si corresponde a la página
+    completa o se cortó en max_chars.
+    """
+    meta, cuerpo = cache.leer(url) if cache else (None, None)
+    if _fresca(meta):
+        cache.aciertos += 1
+        anotar(cache="acierto")
+        return _extraer(_respuesta(url, meta, cuerpo).text, max_chars)
+
+    extractor = ExtractorTextoHTML(max_chars)
+    estado = _estado()
+    async with cupo(estado.semaforo(url), "host"):
+        async with estado.cliente.stream("GET", url, headers=_condicionales(meta), timeout=timeout) as respuesta:
+            if respuesta.status_code == 304 and meta is not None:
+                _revalidar(cache, url, meta, respuesta)
+                anotar(cache="revalidado")
+                return _extraer(_respuesta(url, meta, cuerpo).text, max_chars)
+            respuesta.raise_for_status()
+            if cache is not None:
+                cache.fallos += 1
+            guardar = cache is not None and CacheHTTP.almacenable(respuesta)
+            decodificador = codecs.getincrementaldecoder(respuesta.encoding or "utf-8")(errors="replace")
+            fragmentos = []
+            completa = True
+            async for fragmento in respuesta.aiter_bytes():
+                if guardar:
+                    fragmentos.append(fragmento)
+                if extractor.alimentar(decodificador.decode(fragmento)):
+                    completa = False
+                    break
+            anotar(cache="fallo", descarga_completa=completa)
+            if completa:
+                extractor.alimentar(decodificador.decode(b"", final=True))
+                if guardar:
+                    _guardar(cache, url, respuesta, b"".join(fragmentos))
+    extractor.close()
+    return extractor.texto(), completa and not extractor.completo
+
+
+_almacen: Optional[AlmacenPaginas] = None
+
+
+def almacen_paginas() -> AlmacenPaginas:
+    """Almacén de páginas en disco compartido por el proceso."""
+    global _almacen
+    if _almacen is None:
+        _almacen = AlmacenPaginas()
+    return _almacen
+
+
+@instrumentar("herramienta", "fetch_url")
+@grabable("fetch_text")
+async def fetch_text(url: str, max_chars: int = 4000, timeout: float = 20,
+                     cache: Union[CacheHTTP, bool, None] = None) -> str:
+    """
+    Descarga una página y retorna texto visible (recortado).
+
+    Primero se busca el texto ya extraído en el almacén de páginas; si no está,
+    el cuerpo se lee por fragmentos y se parsea a medida que llega, y en cuanto
+    se tienen max_chars de texto visible se cierra la conexión, sin descargar
+    ni parsear el resto. Solo las descargas completas se guardan en el caché
+    HTTP. cache=False desactiva tanto el caché HTTP como el almacén.
+    """
+    almacen = None if cache is False else almacen_paginas()
+    cache = _resolver_cache(cache)
+    anotar(host=urlsplit(url).netloc)
+    if almacen is not None:
+        texto = almacen.obtener(url, max_chars)
+        if texto is not None:
+            anotar(pagina="almacen")
+            return texto
+    texto, completa = await esperar(_descargar_texto(url, max_chars, acotar(timeout), cache))
+    if almacen is not None:
+        almacen.guardar(url, texto, max_chars, completa)
+    return texto